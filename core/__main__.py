@@ -0,0 +1,155 @@
+# --- Línea de comandos para cálculo por lote (sin Streamlit) ---
+# Uso (desde la raíz del repo):
+#   python -m core rate cartera.csv -o tasas.csv
+#   python -m core periods planes.parquet -o cuotas.jsonl
+#   cat cartera.csv | python -m core auto - > resultado.csv
+#   python -m core rate cartera.parquet -o tasas.arrow   # Arrow IPC: pyarrow.memory_map sin copiar
+# Solo importa el núcleo numérico (numpy/pandas); pyarrow solo si hay Parquet/Arrow.
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from core.lote import (
+    BlockWriter,
+    LoteResumen,
+    file_format,
+    iter_chunks,
+    normalize_frame,
+    price_frame,
+    read_arrow_chunks,
+)
+
+
+FORMATOS = ("csv", "jsonl", "parquet", "arrow")
+
+
+def detect_format(path, explicito=None, default="csv"):
+    """Formato del archivo: el indicado, o según la extensión; stdin/stdout usan default."""
+    if explicito:
+        return explicito
+    if path in (None, "-"):
+        return default
+    try:
+        fmt = file_format(path, default=None)
+    except ValueError as e:
+        raise SystemExit(str(e)) from None
+    if fmt not in FORMATOS:
+        raise SystemExit(f"No se reconoce el formato de {path!r} (usar --input-format/--output-format)")
+    return fmt
+
+
+# --- Lectura por bloques ---
+def iter_input(path, fmt, chunksize):
+    """Bloques (DataFrame) del archivo o de stdin ('-') en el formato indicado."""
+    if fmt == "arrow" and path != "-":
+        # Arrow desde archivo: memory_map, sin copiar
+        yield from read_arrow_chunks(path, chunksize=chunksize)
+        return
+    fh = sys.stdin.buffer if path == "-" else open(path, "rb")
+    try:
+        yield from iter_chunks(fh, fmt, chunksize=chunksize)
+    finally:
+        if fh is not sys.stdin.buffer:
+            fh.close()
+
+
+# --- Escritura por bloques ---
+class Writer(BlockWriter):
+    """BlockWriter sobre un archivo (o stdout) que se cierra con close()."""
+
+    def __init__(self, path, fmt):
+        super().__init__(sys.stdout.buffer if path in (None, "-") else open(path, "wb"), fmt)
+
+    def write(self, df):
+        super().write(df)
+        self.fh.flush()
+
+    def close(self):
+        super().close()
+        if self.fh is not sys.stdout.buffer:
+            self.fh.close()
+
+
+# --- Qué resolver ---
+def select_mode(df_norm, modo):
+    """
+    'rate' resuelve la tasa (ignora i_periodo), 'periods' las cuotas (ignora n);
+    'auto' decide fila a fila como el cargador de la app.
+    """
+    if modo == "rate":
+        df_norm["i_periodo"] = np.nan
+    elif modo == "periods":
+        df_norm["n"] = np.nan
+    return df_norm
+
+
+def run(args):
+    """Lee, resuelve y escribe bloque a bloque. Devuelve el resumen del lote."""
+    fmt_in = detect_format(args.input, args.input_format)
+    fmt_out = detect_format(args.output, args.output_format)
+    chunksize = args.chunksize
+    if args.workers and args.workers > 1:
+        from core.paralelo import parallel_chunksize
+        chunksize = parallel_chunksize(chunksize, args.workers)
+    resumen = LoteResumen()
+    out = Writer(args.output, fmt_out)
+    try:
+        for chunk in iter_input(args.input, fmt_in, chunksize):
+            df_norm = normalize_frame(chunk, args.adelantado, args.keep_columns)
+            res = price_frame(select_mode(df_norm, args.modo), tol=args.tol,
+                              max_iter=args.max_iter, workers=args.workers)
+            out.write(res)
+            resumen.add(res)
+    finally:
+        out.close()
+    return resumen.as_dict()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(
+        prog="python -m core",
+        description="Resuelve tasas o cantidad de cuotas para cada fila de un CSV/Parquet/Arrow/JSON Lines.",
+    )
+    ap.add_argument("modo", choices=("rate", "periods", "auto"),
+                    help="rate: tasa con pv, pmt y n · periods: cuotas con pv, pmt e i_periodo · auto: según cada fila")
+    ap.add_argument("input", nargs="?", default="-", help="Archivo de entrada ('-' = stdin, por defecto)")
+    ap.add_argument("-o", "--output", default="-", help="Archivo de salida ('-' = stdout, por defecto)")
+    ap.add_argument("--input-format", choices=FORMATOS, help="Formato de entrada (por defecto, según la extensión; stdin: csv)")
+    ap.add_argument("--output-format", choices=FORMATOS, help="Formato de salida (por defecto, según la extensión; stdout: csv)")
+    ap.add_argument("--chunksize", type=int, default=100_000, help="Filas por bloque (acota la memoria; con --workers se agranda hasta core.paralelo.MIN_PARALELO por proceso)")
+    ap.add_argument("--adelantado", action="store_true", help="Pago adelantado si la fila no trae tipo_pago")
+    ap.add_argument("--keep-columns", action="store_true", help="Conservar las demás columnas de la entrada (id, cliente, …)")
+    ap.add_argument("--workers", type=int, default=None, help="Procesos para repartir cada bloque (core.paralelo)")
+    ap.add_argument("--tol", type=float, default=1e-12, help="Tolerancia del solver")
+    ap.add_argument("--max-iter", type=int, default=80, help="Máximo de iteraciones del solver")
+    ap.add_argument("--quiet", action="store_true", help="No imprimir el resumen en stderr")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    try:
+        resumen = run(args)
+    except ImportError as e:
+        # Parquet/Arrow sin pyarrow instalado
+        raise SystemExit(str(e)) from None
+    except BrokenPipeError:
+        # p. ej. `python -m core rate big.csv | head`: el lector cerró la tubería.
+        # stdout pasa a /dev/null para que el flush al salir no vuelva a fallar.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        if args.workers and args.workers > 1:
+            from core.paralelo import shutdown_pool
+            shutdown_pool()
+    resumen["segundos"] = round(time.perf_counter() - t0, 3)
+    if not args.quiet:
+        print(json.dumps(resumen, ensure_ascii=False), file=sys.stderr)
+    return 0 if resumen["con_error"] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,23 @@
 # --- Explicación con IA ---
 # core/ai.py
 
+_clients = {}
+
+
+def get_client(api_key):
+    """
+    Cliente OpenAI para api_key (None si no hay clave). openai se importa
+    recién acá, al primer uso, y el cliente se reutiliza entre llamadas.
+    """
+    if not api_key:
+        return None
+    if api_key not in _clients:
+        from openai import OpenAI
+
+        _clients[api_key] = OpenAI(api_key=api_key)
+    return _clients[api_key]
+
+
 def explicar_con_ia(
     client,
     pv, pmt, n, adelantado, i_mensual,
@@ -0,0 +1,207 @@
+# --- Calendario de pagos: fechas por mes para muchos planes a la vez ---
+# core/calendario.py
+# Todo con aritmética de datetime64 (meses y días), sin DateOffset fila a fila:
+# un lote de 1M de planes se arma en bloques de BLOQUE_PLANES. Reglas de fin
+# de mes y corrimiento a día hábil con los feriados de un archivo local.
+
+import os
+
+import numpy as np
+import pandas as pd
+
+
+MESES_POR_PERIODO = {
+    "Mensual": 1, "Bimestral": 2, "Trimestral": 3,
+    "Cuatrimestral": 4, "Semestral": 6, "Anual": 12,
+}
+
+# Qué día del mes cae cada cuota cuando el mes no tiene el día de la fecha inicial
+#   acumulada:  como sumar un período a la cuota anterior (31/01 → 28/02 → 28/03);
+#               es la que usaba la app
+#   mismo_dia:  el día inicial, o el último del mes si no existe (31/01 → 28/02 → 31/03)
+#   fin_de_mes: igual, pero si la fecha inicial es fin de mes, todas van a fin de mes (30/04 → 31/05)
+REGLAS_FIN_DE_MES = ("acumulada", "mismo_dia", "fin_de_mes")
+
+# Corrimiento de fechas que caen en fin de semana o feriado (roll de np.busday_offset)
+#   siguiente / anterior: al primer día hábil después / antes
+#   *_modificado: igual, salvo que eso cambie de mes; entonces hacia el otro lado
+AJUSTES_HABIL = {
+    "ninguno": None,
+    "siguiente": "forward",
+    "siguiente_modificado": "modifiedfollowing",
+    "anterior": "backward",
+    "anterior_modificado": "modifiedpreceding",
+}
+
+# Feriados por defecto (se puede cambiar con la variable de entorno FERIADOS_CSV)
+DEFAULT_FERIADOS = os.environ.get(
+    "FERIADOS_CSV", os.path.join(os.path.dirname(__file__), "data", "feriados.csv")
+)
+
+BLOQUE_PLANES = 100_000
+
+_NAT = np.datetime64("NaT", "D")
+
+
+# --- Feriados ---
+_calendarios = {}
+
+
+def load_holidays(path=DEFAULT_FERIADOS):
+    """
+    Feriados de un CSV local (columna 'fecha' en formato AAAA-MM-DD; las
+    líneas con # son comentarios) como array datetime64[D] ordenado y sin
+    repetidos. Si el archivo no existe, no hay feriados (solo fines de semana).
+    """
+    if not path or not os.path.exists(path):
+        return np.array([], dtype="datetime64[D]")
+    df = pd.read_csv(path, comment="#", usecols=["fecha"], dtype=str)
+    fechas = pd.to_datetime(df["fecha"].str.strip(), format="%Y-%m-%d")
+    return np.unique(fechas.to_numpy().astype("datetime64[D]"))
+
+
+def business_calendar(path=DEFAULT_FERIADOS):
+    """
+    np.busdaycalendar (lunes a viernes menos los feriados de path), armado una
+    sola vez por archivo; se vuelve a leer si el archivo cambia.
+    """
+    marca = os.path.getmtime(path) if path and os.path.exists(path) else None
+    cal = _calendarios.get(path)
+    if cal is None or cal[0] != marca:
+        cal = (marca, np.busdaycalendar(holidays=load_holidays(path)))
+        _calendarios[path] = cal
+    return cal[1]
+
+
+# --- Cronograma por meses ---
+def month_schedule(inicio, n, paso=1, adelantado=False, regla="acumulada"):
+    """
+    Fechas de pago de muchos planes: inicio (fechas), n (cuotas), paso (meses
+    por período) y adelantado pueden ser escalares o arrays de un valor por
+    plan. En adelantado la 1ª cuota cae en la fecha inicial; en vencido, un
+    período después.
+    Devuelve un array datetime64[D] planes × max(n) con NaT de relleno (la
+    forma que usa core.xirr.xirr_batch); si todo es escalar, uno 1-D de n fechas.
+    """
+    if regla not in REGLAS_FIN_DE_MES:
+        raise ValueError(f"Regla de fin de mes desconocida: {regla!r} (usar {REGLAS_FIN_DE_MES})")
+    escalar = all(np.ndim(x) == 0 for x in (inicio, n, paso, adelantado))
+    inicio, n, paso, adelantado = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(inicio, dtype="datetime64[D]")),
+        np.atleast_1d(np.asarray(n, dtype=np.int64)),
+        np.atleast_1d(np.asarray(paso, dtype=np.int64)),
+        np.atleast_1d(np.asarray(adelantado, dtype=bool)),
+    )
+    m = len(inicio)
+    ancho = int(max(n.max(initial=0), 0))
+    out = np.full((m, ancho), _NAT)
+    for a in range(0, m, BLOQUE_PLANES):
+        b = min(a + BLOQUE_PLANES, m)
+        out[a:b] = _schedule_block(inicio[a:b], n[a:b], paso[a:b], adelantado[a:b], ancho, regla)
+    return out[0] if escalar else out
+
+
+def _schedule_block(inicio, n, paso, adelantado, ancho, regla):
+    """
+    month_schedule para un bloque de planes. Los meses van como enteros
+    (meses desde 1970) y el primer día y el largo de cada mes salen de una
+    tabla del rango del bloque: sin conversiones de calendario por celda.
+    """
+    validos = ~np.isnat(inicio)
+    ini = np.where(validos, inicio, np.datetime64("1970-01-01", "D"))
+    mes0 = ini.astype("datetime64[M]").astype(np.int64)
+    dia0 = (ini - ini.astype("datetime64[M]")).astype(np.int64) + 1
+    k = np.arange(ancho, dtype=np.int64)
+    mes = mes0[:, None] + (k[None, :] + (~adelantado)[:, None]) * paso[:, None]
+
+    # Tabla: primer día (días desde 1970) y largo de cada mes del rango
+    lo = int(mes.min(initial=mes0.min()))
+    hi = int(mes.max(initial=mes0.max())) + 2
+    inicios = np.arange(lo, hi).astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    largos = np.diff(inicios)
+
+    dias_mes = largos[mes - lo]
+    dia = np.minimum(dia0[:, None], dias_mes)
+    if regla == "fin_de_mes":
+        fin0 = dia0 == largos[mes0 - lo]
+        dia = np.where(fin0[:, None], dias_mes, dia)
+    elif regla == "acumulada":
+        # Sin el día en un mes, las siguientes quedan en ese día (como DateOffset cuota a cuota)
+        dia = np.minimum.accumulate(dia, axis=1)
+
+    fechas = (inicios[mes - lo] + dia - 1).astype("datetime64[D]")
+    fechas[(k[None, :] >= n[:, None]) | ~validos[:, None]] = _NAT
+    return fechas
+
+
+def adjust_business_days(fechas, ajuste="ninguno", feriados=DEFAULT_FERIADOS):
+    """
+    Corre a día hábil las fechas que caen en fin de semana o feriado, según
+    ajuste (AJUSTES_HABIL). feriados es la ruta del CSV o un np.busdaycalendar.
+    Acepta cualquier forma; los NaT quedan NaT.
+    """
+    if ajuste not in AJUSTES_HABIL:
+        raise ValueError(f"Ajuste de día hábil desconocido: {ajuste!r} (usar {tuple(AJUSTES_HABIL)})")
+    fechas = np.asarray(fechas, dtype="datetime64[D]")
+    roll = AJUSTES_HABIL[ajuste]
+    if roll is None:
+        return fechas
+    cal = feriados if isinstance(feriados, np.busdaycalendar) else business_calendar(feriados)
+    out = fechas.copy()
+    ok = ~np.isnat(fechas)
+    out[ok] = np.busday_offset(fechas[ok], 0, roll=roll, busdaycal=cal)
+    return out
+
+
+def payment_schedule(inicio, n, paso=1, adelantado=False, regla="acumulada",
+                     ajuste="ninguno", feriados=DEFAULT_FERIADOS):
+    """month_schedule y, si corresponde, el corrimiento a día hábil (ver ambas)."""
+    fechas = month_schedule(inicio, n, paso, adelantado, regla)
+    return adjust_business_days(fechas, ajuste, feriados)
+
+
+def payment_dates(fecha_inicial, n, adelantado, periodicidad="Mensual",
+                  regla="acumulada", ajuste="ninguno", feriados=DEFAULT_FERIADOS):
+    """Fechas de pago (datetime64[D]) de un plan, con la periodicidad por nombre."""
+    paso = MESES_POR_PERIODO.get(periodicidad, 1)
+    return payment_schedule(np.datetime64(pd.Timestamp(fecha_inicial).date(), "D"), int(n), paso,
+                            bool(adelantado), regla, ajuste, feriados)
+
+
+# --- Días y flujos para la TIR con fechas ---
+def day_counts(fechas, inicio):
+    """
+    Días reales desde inicio (una fecha por plan, o escalar) hasta cada fecha,
+    como int64; -1 en el relleno NaT.
+    """
+    fechas = np.asarray(fechas, dtype="datetime64[D]")
+    inicio = np.asarray(inicio, dtype="datetime64[D]")
+    if fechas.ndim == 2 and inicio.ndim == 1:
+        inicio = inicio[:, None]
+    dias = (fechas - inicio).astype(np.int64)
+    return np.where(np.isnat(fechas), -1, dias)
+
+
+def xirr_flows(pv, cuotas, inicio, fechas):
+    """
+    Flujos fechados para core.xirr.xirr_batch: -pv en la fecha inicial y las
+    cuotas en sus fechas de pago. cuotas es una por plan (escalar o array 1-D)
+    o una por cuota (array planes × cuotas, como fechas).
+    Devuelve (montos, fechas) planes × (1 + cuotas), con 0 / NaT de relleno.
+    """
+    fechas = np.atleast_2d(np.asarray(fechas, dtype="datetime64[D]"))
+    m = fechas.shape[0]
+    pv = np.broadcast_to(np.asarray(pv, dtype=float), (m,))
+    cuotas = np.asarray(cuotas, dtype=float)
+    if cuotas.ndim == 1:
+        cuotas = cuotas[:, None]
+    cuotas = np.broadcast_to(cuotas, fechas.shape)
+    inicio = np.broadcast_to(np.asarray(inicio, dtype="datetime64[D]"), (m,))
+
+    montos = np.empty((m, fechas.shape[1] + 1))
+    montos[:, 0] = -pv
+    montos[:, 1:] = np.where(np.isnat(fechas), 0.0, cuotas)
+    todas = np.empty(montos.shape, dtype="datetime64[D]")
+    todas[:, 0] = inicio
+    todas[:, 1:] = fechas
+    return montos, todas
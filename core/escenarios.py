@@ -0,0 +1,235 @@
+# --- Escenarios guardados (SQLite local, persistente entre sesiones) ---
+# core/escenarios.py
+
+import json
+import os
+import sqlite3
+from contextlib import closing
+from datetime import date, datetime
+
+import pandas as pd
+
+from core.lote import MODO_N, normalize_frame, price_frame
+
+
+# Base por defecto (se puede cambiar con la variable de entorno ESCENARIOS_DB)
+DEFAULT_DB = os.environ.get(
+    "ESCENARIOS_DB", os.path.join(os.path.dirname(__file__), "data", "escenarios.db")
+)
+
+# Columnas del listado (sin el resultado completo)
+COLUMNAS_LISTADO = ("nombre", "modo", "tipo_pago", "pv", "n", "pmt", "i", "TEA", "creado", "actualizado")
+
+# Datos que definen un escenario (lo que se compara)
+COLUMNAS_ENTRADA = ("nombre", "modo", "tipo_pago", "pv", "n", "pmt", "i_periodo")
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS escenarios (
+    id            INTEGER PRIMARY KEY,
+    nombre        TEXT NOT NULL COLLATE NOCASE UNIQUE,
+    modo          TEXT NOT NULL,
+    tipo_pago     TEXT NOT NULL,
+    periodicidad  TEXT NOT NULL,
+    pv            REAL NOT NULL,
+    n             INTEGER NOT NULL,
+    pmt           REAL NOT NULL,
+    i_periodo     REAL NOT NULL,
+    fecha_inicial TEXT,
+    regla_fin_de_mes TEXT NOT NULL DEFAULT 'acumulada',
+    ajuste_habil  TEXT NOT NULL DEFAULT 'ninguno',
+    i             REAL,
+    TEA           REAL,
+    resultado     TEXT,
+    creado        TEXT NOT NULL,
+    actualizado   TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_escenarios_modo ON escenarios (modo, creado);
+CREATE INDEX IF NOT EXISTS ix_escenarios_creado ON escenarios (creado);
+"""
+
+# Columnas agregadas después de la primera versión: (nombre, tipo, valor para las filas viejas)
+_MIGRACIONES = (
+    ("actualizado", "TEXT", "creado"),
+    ("regla_fin_de_mes", "TEXT NOT NULL DEFAULT 'acumulada'", "'acumulada'"),
+    ("ajuste_habil", "TEXT NOT NULL DEFAULT 'ninguno'", "'ninguno'"),
+)
+
+
+def _resultado_json(resultado):
+    """Resultado sin la traza de iteraciones (se recalcula al cargar) como JSON."""
+    if not resultado:
+        return None
+    return json.dumps({k: v for k, v in resultado.items() if k != "trace"},
+                      default=lambda v: v.item() if hasattr(v, "item") else str(v))
+
+
+def _like(texto):
+    """Patrón LIKE 'empieza con' (escapando % y _): usa el índice de nombre."""
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+class ScenarioStore:
+    """
+    Escenarios en una base SQLite: nombre único (sin distinguir mayúsculas),
+    índices por nombre, modo y fecha de creación, y listado paginado. Cada
+    operación abre su propia conexión, así que sirve desde cualquier hilo.
+    """
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as con:
+            con.execute("PRAGMA journal_mode=WAL")     # los lectores no bloquean al que guarda
+            con.executescript(_ESQUEMA)
+            self._migrate(con)
+
+    def _migrate(self, con):
+        """Agrega a una base vieja las columnas de _MIGRACIONES que le falten."""
+        existentes = {r["name"] for r in con.execute("PRAGMA table_info(escenarios)")}
+        with con:
+            for columna, tipo, valor in _MIGRACIONES:
+                if columna not in existentes:
+                    con.execute(f"ALTER TABLE escenarios ADD COLUMN {columna} {tipo}")
+                    con.execute(f"UPDATE escenarios SET {columna} = {valor}")
+
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=10)
+        con.row_factory = sqlite3.Row
+        return con
+
+    def save(self, nombre, datos, resultado=None):
+        """
+        Guarda un escenario. Si el nombre ya existe (sin distinguir mayúsculas)
+        reemplaza sus datos y resultado, pero conserva el nombre guardado y la
+        fecha de creación; actualizado queda con la fecha de ahora.
+        """
+        ahora = datetime.now().isoformat(timespec="seconds")
+        i = (resultado or {}).get("i")
+        fecha = datos.get("fecha_inicial")
+        fila = {
+            "nombre": nombre.strip(),
+            "modo": datos["modo"],
+            "tipo_pago": datos["tipo_pago"],
+            "periodicidad": datos.get("periodicidad", "Mensual"),
+            "pv": float(datos["pv"]),
+            "n": int(datos["n"]),
+            "pmt": float(datos["pmt"]),
+            "i_periodo": float(datos.get("i_periodo", 0.0)),
+            "fecha_inicial": fecha.isoformat() if isinstance(fecha, date) else fecha,
+            "regla_fin_de_mes": datos.get("regla_fin_de_mes", "acumulada"),
+            "ajuste_habil": datos.get("ajuste_habil", "ninguno"),
+            "i": i,
+            "TEA": (1 + i) ** 12 - 1 if i is not None else None,
+            "resultado": _resultado_json(resultado),
+            "creado": ahora,
+            "actualizado": ahora,
+        }
+        cols = ", ".join(fila)
+        marcas = ", ".join(f":{c}" for c in fila)
+        update = ", ".join(f"{c} = excluded.{c}" for c in fila if c not in ("nombre", "creado"))
+        with closing(self._connect()) as con, con:
+            con.execute(f"INSERT INTO escenarios ({cols}) VALUES ({marcas}) "
+                        f"ON CONFLICT (nombre) DO UPDATE SET {update}", fila)
+
+    def stored_name(self, nombre):
+        """Nombre tal como está guardado (puede diferir en mayúsculas), o None si no existe."""
+        with closing(self._connect()) as con:
+            row = con.execute("SELECT nombre FROM escenarios WHERE nombre = ?", (nombre.strip(),)).fetchone()
+        return row["nombre"] if row is not None else None
+
+    def get(self, nombre):
+        """Escenario por nombre (dict con fecha_inicial como date), o None."""
+        with closing(self._connect()) as con:
+            row = con.execute("SELECT * FROM escenarios WHERE nombre = ?", (nombre,)).fetchone()
+        if row is None:
+            return None
+        e = dict(row)
+        if e["fecha_inicial"]:
+            e["fecha_inicial"] = date.fromisoformat(e["fecha_inicial"])
+        e["resultado"] = json.loads(e["resultado"]) if e["resultado"] else None
+        return e
+
+    def delete(self, nombre):
+        with closing(self._connect()) as con, con:
+            con.execute("DELETE FROM escenarios WHERE nombre = ?", (nombre,))
+
+    def _filtro(self, buscar=None, modo=None):
+        where, params = [], []
+        if buscar:
+            where.append("nombre LIKE ? ESCAPE '\\'")
+            params.append(_like(buscar))
+        if modo:
+            where.append("modo = ?")
+            params.append(modo)
+        return (" WHERE " + " AND ".join(where) if where else ""), params
+
+    def count(self, buscar=None, modo=None):
+        """Cantidad de escenarios que cumplen el filtro."""
+        where, params = self._filtro(buscar, modo)
+        with closing(self._connect()) as con:
+            return con.execute(f"SELECT COUNT(*) FROM escenarios{where}", params).fetchone()[0]
+
+    def page(self, pagina=1, por_pagina=50, buscar=None, modo=None):
+        """
+        Una página del listado (DataFrame con COLUMNAS_LISTADO), del más nuevo
+        al más viejo. buscar filtra por nombre que empieza con ese texto.
+        """
+        where, params = self._filtro(buscar, modo)
+        offset = max(int(pagina) - 1, 0) * int(por_pagina)
+        sql = (f"SELECT {', '.join(COLUMNAS_LISTADO)} FROM escenarios{where} "
+               f"ORDER BY creado DESC, id DESC LIMIT ? OFFSET ?")
+        with closing(self._connect()) as con:
+            rows = con.execute(sql, params + [int(por_pagina), offset]).fetchall()
+        return pd.DataFrame([tuple(r) for r in rows], columns=list(COLUMNAS_LISTADO))
+
+    def inputs(self, buscar=None, modo=None):
+        """Datos de entrada de todos los escenarios del filtro (sin resultados), en un DataFrame."""
+        where, params = self._filtro(buscar, modo)
+        with closing(self._connect()) as con:
+            return pd.read_sql_query(
+                f"SELECT {', '.join(COLUMNAS_ENTRADA)} FROM escenarios{where} ORDER BY nombre",
+                con, params=params,
+            )
+
+
+# --- Comparación: todos los escenarios resueltos en un solo lote ---
+def compare_scenarios(df_inputs, tol=1e-12, max_iter=80):
+    """
+    Resuelve todos los escenarios de una vez (core.lote.price_frame; tasa o
+    cuotas según el modo de cada uno) y los ordena por TEA, de la más baja a
+    la más alta. Los que no tienen solución quedan al final sin ranking.
+    """
+    base = df_inputs.copy()
+    # Cada escenario se resuelve según su modo: el otro dato no se usa
+    modo_n = (base["modo"] == MODO_N).to_numpy()
+    base["n"] = base["n"].where(~modo_n)
+    base["i_periodo"] = base["i_periodo"].where(modo_n)
+    res = price_frame(normalize_frame(base), tol=tol, max_iter=max_iter)
+
+    out = pd.DataFrame({
+        "nombre": base["nombre"],
+        "modo": base["modo"],
+        "tipo_pago": base["tipo_pago"],
+        "precio_contado": res["pv"],
+        "monto_cuota": res["pmt"],
+        "n (redondeado)": res["n_redondeado"],
+        "tasa mensual (%)": res["i"] * 100,
+        "TEA (%)": res["TEA"] * 100,
+        "TNA (%)": res["TNA"] * 100,
+        "ultima_cuota_ajustada": res["ultima_cuota"],
+        "ok": res["ok"],
+    })
+    out = out.sort_values(["ok", "TEA (%)"], ascending=[False, True], kind="stable", ignore_index=True)
+    ok = out["ok"]
+    out.insert(0, "ranking", ok.cumsum().astype("Int64").where(ok))
+    return out
+
+
+_stores = {}
+
+
+def open_store(path=DEFAULT_DB):
+    """ScenarioStore para path, creado (con su esquema) una sola vez por proceso."""
+    if path not in _stores:
+        _stores[path] = ScenarioStore(path)
+    return _stores[path]
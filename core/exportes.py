@@ -0,0 +1,542 @@
+# --- Descargas del resultado: CSV, Excel y PDF ---
+# core/exportes.py
+
+import re
+import zipfile
+from io import BytesIO
+from itertools import chain
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+from core.cache import TTLCache, content_hash
+from core.lote import iter_chunks
+
+
+# Formatos numéricos por columna (hoja 'Resumen')
+FORMATOS_RESUMEN = {
+    # Monedas
+    "precio_contado": "#,##0.00",
+    "monto_cuota": "#,##0.00",
+    "PV de cuotas (VP)": "#,##0.00",
+    "Diferencia (VP - contado)": "#,##0.00",
+    "ultima_cuota_ajustada": "#,##0.00",
+    # Fechas
+    "fecha_inicial": "DD/MM/YYYY",
+    # Cantidades
+    "n (real)": "0.000",
+    "n (redondeado)": "0",
+    # Fracciones (tanto por uno)
+    "tasa mensual (fracción)": "0.000000",
+    "TEA (fracción)": "0.000000",
+    "TNA (fracción)": "0.000000",
+    # Porcentaje como número 0–100 (sin símbolo %)
+    "tasa mensual (%)": "0.000",
+    "TEA (%)": "0.00",
+    "TNA (%)": "0.00",
+}
+
+# Formatos de la hoja 'Flujo' (columnas típicas)
+FORMATOS_FLUJO = {
+    "fecha_pago": "DD/MM/YYYY",
+    "cuota": "#,##0.00",
+    "vp_cuota": "#,##0.00",
+    "factor_descuento": "0.000000",
+}
+
+
+# Formatos del resultado del lote (columnas de core.lote.price_frame)
+FORMATOS_LOTE = {
+    "pv": "#,##0.00",
+    "pmt": "#,##0.00",
+    "n": "0",
+    "i_periodo": "0.000000",
+    "i": "0.000000",
+    "TEA": "0.000000",
+    "TNA": "0.000000",
+    "n_real": "0.000",
+    "n_redondeado": "0",
+    "ultima_cuota": "#,##0.00",
+}
+
+# Formatos de la comparación de escenarios (core.escenarios.compare_scenarios)
+FORMATOS_COMPARACION = {
+    "ranking": "0",
+    "precio_contado": "#,##0.00",
+    "monto_cuota": "#,##0.00",
+    "n (redondeado)": "0",
+    "tasa mensual (%)": "0.000",
+    "TEA (%)": "0.00",
+    "TNA (%)": "0.00",
+    "ultima_cuota_ajustada": "#,##0.00",
+}
+
+# Filas de datos por hoja: Excel admite 1.048.576 filas y una es el encabezado
+EXCEL_MAX_FILAS = 1_048_575
+
+
+# --- CSV ---
+def export_csv(df_resumen):
+    """Resumen como CSV (bytes UTF-8)."""
+    return df_resumen.to_csv(index=False).encode("utf-8")
+
+
+# --- Excel (escritura por filas, memoria acotada) ---
+# Dos motores con la misma salida: "xml" (por defecto) escribe el .xlsx directo
+# (zip + XML), comprime cada bloque apenas llega y pone el formato de número en
+# el estilo de cada celda; "openpyxl" usa un Workbook write_only (unas 9 veces
+# más lento, queda como alternativa al escritor propio).
+MOTORES_EXCEL = ("xml", "openpyxl")
+_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_XML = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_EPOCA = pd.Timestamp("1899-12-30")        # día 0 de las fechas de Excel
+_NO_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _frames(datos):
+    """Un DataFrame o un iterable de DataFrames (bloques) → iterable de bloques."""
+    return (datos,) if isinstance(datos, pd.DataFrame) else datos
+
+
+def _sheet_title(nombre, parte):
+    """Título de hoja (máx. 31 caracteres); desde la segunda parte: 'Flujo (2)', …"""
+    sufijo = f" ({parte})" if parte > 1 else ""
+    return nombre[:31 - len(sufijo)] + sufijo
+
+
+def _col_letter(k):
+    """Letra de la columna k (0 → A, 26 → AA)."""
+    letras = ""
+    k += 1
+    while k:
+        k, r = divmod(k - 1, 26)
+        letras = chr(65 + r) + letras
+    return letras
+
+
+def _texto(v):
+    """Texto apto para XML (escapado y sin caracteres de control)."""
+    return escape(_NO_XML.sub("", str(v)), {'"': "&quot;"})
+
+
+def _cells(serie, letra, filas, estilo):
+    """XML de las celdas de una columna (una cadena por fila); NaN/None → celda vacía."""
+    s = f' s="{estilo}"' if estilo else ""
+    vacia = [f'<c r="{letra}{r}"{s}/>' for r in filas]
+    if pd.api.types.is_bool_dtype(serie):
+        return [f'<c r="{letra}{r}"{s} t="b"><v>{int(v)}</v></c>' for r, v in zip(filas, serie.tolist())]
+    if serie.dtype == object and pd.api.types.infer_dtype(serie, skipna=True) in ("date", "datetime"):
+        serie = pd.to_datetime(serie)
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        # Fechas como número de serie de Excel (días desde 1899-12-30)
+        serie = (serie - _EPOCA) / pd.Timedelta(days=1)
+    if pd.api.types.is_numeric_dtype(serie):
+        ok = np.isfinite(serie.to_numpy(dtype=float, na_value=np.nan)).tolist()
+        return [f'<c r="{letra}{r}"{s}><v>{v!r}</v></c>' if o else e
+                for r, v, o, e in zip(filas, serie.tolist(), ok, vacia)]
+    return [f'<c r="{letra}{r}"{s} t="inlineStr"><is><t xml:space="preserve">{_texto(v)}</t></is></c>'
+            if v is not None and v == v else e
+            for r, v, e in zip(filas, serie.tolist(), vacia)]
+
+
+class _LibroXML:
+    """Motor "xml": el .xlsx se escribe directo en un zip, hoja por hoja."""
+
+    def __init__(self, out):
+        self.zf = zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1)
+        self.titulos = []
+        self.numfmts = {}           # formato → índice de estilo (0 normal, 1 encabezado)
+        self.fh = None
+
+    def new_sheet(self, titulo, header, formatos):
+        self._close_sheet()
+        self.titulos.append(titulo)
+        self.fh = self.zf.open(f"xl/worksheets/sheet{len(self.titulos)}.xml", "w", force_zip64=True)
+        self.letras = [_col_letter(k) for k in range(len(header))]
+        self.estilos = [self.numfmts.setdefault(formatos[h], len(self.numfmts) + 2) if h in formatos else 0
+                        for h in header]
+        self.fila = 2
+        cols = "".join(f'<col min="{k}" max="{k}" width="{max(len(h) + 2, 12)}" customWidth="1"/>'
+                       for k, h in enumerate(header, start=1))
+        head = "".join(f'<c r="{letra}1" s="1" t="inlineStr"><is><t>{_texto(h)}</t></is></c>'
+                       for letra, h in zip(self.letras, header))
+        self._write(f'{_XML}<worksheet xmlns="{_NS}">' + (f"<cols>{cols}</cols>" if cols else "")
+                    + f'<sheetData><row r="1">{head}</row>')
+
+    def append(self, df):
+        filas = [str(r) for r in range(self.fila, self.fila + len(df))]
+        columnas = [[f'<row r="{r}">' for r in filas]]
+        columnas += [_cells(df.iloc[:, k], self.letras[k], filas, self.estilos[k]) for k in range(df.shape[1])]
+        columnas.append(["</row>"] * len(filas))
+        self._write("".join(chain.from_iterable(zip(*columnas))))
+        self.fila += len(df)
+
+    def save(self):
+        self._close_sheet()
+        self._write_package()
+        self.zf.close()
+
+    def _write(self, txt):
+        self.fh.write(txt.encode("utf-8"))
+
+    def _close_sheet(self):
+        if self.fh is not None:
+            self._write("</sheetData></worksheet>")
+            self.fh.close()
+            self.fh = None
+
+    def _write_package(self):
+        """Libro, relaciones, tipos de contenido y estilos (se escriben al final)."""
+        zf, n = self.zf, len(self.titulos)
+        zf.writestr("[Content_Types].xml", (
+            f'{_XML}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            + "".join(f'<Override PartName="/xl/worksheets/sheet{k}.xml" '
+                      'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                      for k in range(1, n + 1))
+            + "</Types>"))
+        zf.writestr("_rels/.rels", (
+            f'{_XML}<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{_NS_R}/officeDocument" Target="xl/workbook.xml"/>'
+            "</Relationships>"))
+        zf.writestr("xl/workbook.xml", (
+            f'{_XML}<workbook xmlns="{_NS}" xmlns:r="{_NS_R}"><sheets>'
+            + "".join(f'<sheet name="{_texto(t)}" sheetId="{k}" r:id="rId{k}"/>'
+                      for k, t in enumerate(self.titulos, start=1))
+            + "</sheets></workbook>"))
+        zf.writestr("xl/_rels/workbook.xml.rels", (
+            f'{_XML}<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + "".join(f'<Relationship Id="rId{k}" Type="{_NS_R}/worksheet" Target="worksheets/sheet{k}.xml"/>'
+                      for k in range(1, n + 1))
+            + f'<Relationship Id="rId{n + 1}" Type="{_NS_R}/styles" Target="styles.xml"/>'
+            "</Relationships>"))
+        # Estilos: 0 normal, 1 encabezado en negrita, 2.. un formato de número cada uno
+        numfmts = self.numfmts
+        fmts = "".join(f'<numFmt numFmtId="{164 + k}" formatCode="{_texto(f)}"/>' for k, f in enumerate(numfmts))
+        xfs = "".join(f'<xf numFmtId="{164 + k}" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+                      for k in range(len(numfmts)))
+        zf.writestr("xl/styles.xml", (
+            f'{_XML}<styleSheet xmlns="{_NS}">'
+            + (f'<numFmts count="{len(numfmts)}">{fmts}</numFmts>' if numfmts else "")
+            + '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+            '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+            '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+            '<fill><patternFill patternType="gray125"/></fill></fills>'
+            '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+            '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+            f'<cellXfs count="{len(numfmts) + 2}">'
+            '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+            '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+            f"{xfs}</cellXfs>"
+            '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+            "</styleSheet>"))
+
+
+def _column_values(serie):
+    """Valores de una columna para openpyxl (lista); NaN/NaT/inf → celda vacía."""
+    if pd.api.types.is_bool_dtype(serie):
+        return serie.tolist()
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return [None if v is pd.NaT else v.to_pydatetime() for v in serie.tolist()]
+    if pd.api.types.is_numeric_dtype(serie):
+        ok = np.isfinite(serie.to_numpy(dtype=float, na_value=np.nan))
+        return serie.astype(object).where(ok, None).tolist()
+    return [None if v is None or v != v else _NO_XML.sub("", v) if isinstance(v, str) else v
+            for v in serie.tolist()]
+
+
+class _LibroOpenpyxl:
+    """Motor "openpyxl": Workbook en modo write_only (cada fila va a disco al agregarla)."""
+
+    def __init__(self, out):
+        from openpyxl import Workbook
+
+        self.out = out
+        self.wb = Workbook(write_only=True)
+
+    def new_sheet(self, titulo, header, formatos):
+        """Hoja nueva con el encabezado en negrita y una WriteOnlyCell por columna con formato."""
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+        from openpyxl.utils import get_column_letter
+
+        ws = self.ws = self.wb.create_sheet(titulo)
+        for k, h in enumerate(header, start=1):
+            ws.column_dimensions[get_column_letter(k)].width = max(len(h) + 2, 12)
+        negrita = Font(bold=True)
+        fila = []
+        for h in header:
+            celda = WriteOnlyCell(ws, _NO_XML.sub("", h))
+            celda.font = negrita
+            fila.append(celda)
+        ws.append(fila)
+        self.plantillas = []
+        for k, h in enumerate(header):
+            if h in formatos:
+                celda = WriteOnlyCell(ws)
+                celda.number_format = formatos[h]
+                self.plantillas.append((k, celda))
+
+    def append(self, df):
+        """La celda con formato de cada columna se reutiliza cambiando su valor."""
+        columnas = [_column_values(df.iloc[:, k]) for k in range(df.shape[1])]
+        for valores in zip(*columnas):
+            fila = list(valores)
+            for k, celda in self.plantillas:
+                celda.value = fila[k]
+                fila[k] = celda
+            self.ws.append(fila)
+
+    def save(self):
+        self.wb.save(self.out)
+
+
+def write_excel_streaming(out, hojas, max_filas=EXCEL_MAX_FILAS, motor="xml"):
+    """
+    Escribe un .xlsx en out (ruta o archivo binario) sin armar el libro en
+    memoria: cada bloque se escribe apenas llega.
+    hojas: iterable de (nombre, datos, formatos), con datos un DataFrame o un
+    iterable de DataFrames (bloques) y formatos {columna: number_format}.
+    Una hoja con más de max_filas filas sigue en 'nombre (2)', 'nombre (3)', …
+    motor: "xml" (directo, el rápido) u "openpyxl" (ver MOTORES_EXCEL).
+    """
+    if motor not in MOTORES_EXCEL:
+        raise ValueError(f"Motor de Excel desconocido: {motor!r} (use {', '.join(MOTORES_EXCEL)})")
+    libro = _LibroXML(out) if motor == "xml" else _LibroOpenpyxl(out)
+    for nombre, datos, formatos in hojas:
+        header, parte, filas = None, 0, 0
+        for df in _frames(datos):
+            if header is None:
+                header = [str(c) for c in df.columns]
+            inicio = 0
+            while inicio < len(df):
+                if parte == 0 or filas == max_filas:
+                    parte += 1
+                    libro.new_sheet(_sheet_title(nombre, parte), header, formatos)
+                    filas = 0
+                tramo = df.iloc[inicio:inicio + max_filas - filas]
+                libro.append(tramo)
+                filas += len(tramo)
+                inicio += len(tramo)
+        if parte == 0:
+            # Sin filas: la hoja queda solo con el encabezado
+            libro.new_sheet(_sheet_title(nombre, 1), header or [], formatos)
+    libro.save()
+
+
+def export_excel(df_resumen, df_flujo, df_iter=None, explicacion=None):
+    """
+    Libro .xlsx (bytes) con hojas Resumen, Flujo y, si hay, Iteraciones y
+    Explicación IA; aplica los formatos de FORMATOS_RESUMEN / FORMATOS_FLUJO.
+    df_flujo puede ser un DataFrame o bloques (p. ej. de iter_cashflow_table).
+    """
+    hojas = [("Resumen", df_resumen, FORMATOS_RESUMEN), ("Flujo", df_flujo, FORMATOS_FLUJO)]
+    if df_iter is not None:
+        hojas.append(("Iteraciones", df_iter, {}))
+    if explicacion:
+        hojas.append(("Explicación IA", pd.DataFrame([{"explicacion": explicacion}]), {}))
+    buffer = BytesIO()
+    write_excel_streaming(buffer, hojas)
+    return buffer.getvalue()
+
+
+def export_lote_excel(fh, out, chunksize=100_000, fmt="csv"):
+    """
+    Pasa el resultado de un lote (core.lote.price_file, en formato fmt) a
+    .xlsx en out, leyendo y escribiendo de a chunksize filas.
+    """
+    fh.seek(0)
+    bloques = iter_chunks(fh, fmt, chunksize=chunksize)
+    write_excel_streaming(out, [("Lote", bloques, FORMATOS_LOTE)])
+
+
+def export_comparacion_excel(df_comparacion):
+    """Comparación de escenarios como libro .xlsx (bytes) con una hoja 'Comparación'."""
+    buffer = BytesIO()
+    write_excel_streaming(buffer, [("Comparación", df_comparacion, FORMATOS_COMPARACION)])
+    return buffer.getvalue()
+
+
+# --- PDF (informe paginado; el flujo se dibuja por bloques) ---
+# Columnas del flujo que suman en los subtotales por página y el total final
+TOTALES_FLUJO = ("cuota", "vp_cuota")
+
+_MARGEN = 50
+_FILA = 11                 # alto de un renglón de la tabla (puntos)
+_RENGLON = 13              # alto de un renglón de texto
+
+
+def _pdf_formatter(formato):
+    """number_format de Excel (FORMATOS_*) → función valor → texto para el PDF."""
+    if formato == "DD/MM/YYYY":
+        return lambda v: v.strftime("%d/%m/%Y")
+    if formato:
+        dec = len(formato.split(".")[1]) if "." in formato else 0
+        patron = ("{:,.%df}" if "," in formato else "{:.%df}") % dec
+        return patron.format
+    return lambda v: f"{v:.6g}" if isinstance(v, float) else str(v)
+
+
+def _pdf_column(serie, fmt):
+    """Textos de una columna; NaN/None → ''."""
+    vacio = serie.isna().tolist()
+    return ["" if na else fmt(v) for v, na in zip(serie.tolist(), vacio)]
+
+
+class _PdfInforme:
+    """Canvas con un cursor vertical: agrega renglones y pasa de página cuando no entran."""
+
+    def __init__(self, out, titulo=""):
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib.utils import simpleSplit
+        from reportlab.pdfgen import canvas
+
+        self.c = canvas.Canvas(out, pagesize=letter, pageCompression=1)
+        self.ancho, self.alto = letter
+        self.util = self.ancho - 2 * _MARGEN
+        self.titulo = titulo
+        self.pagina = 1
+        self.y = self.alto - _MARGEN
+        self._split = simpleSplit
+
+    def entra(self, alto):
+        return self.y - alto >= _MARGEN + _RENGLON
+
+    def nueva_pagina(self):
+        """Pie (título y número de página) y página nueva."""
+        self.c.setFont("Helvetica", 8)
+        self.c.drawString(_MARGEN, _MARGEN - 10, self.titulo)
+        self.c.drawRightString(self.ancho - _MARGEN, _MARGEN - 10, f"Página {self.pagina}")
+        self.c.showPage()
+        self.pagina += 1
+        self.y = self.alto - _MARGEN
+
+    def texto(self, txt, fuente="Helvetica", size=10):
+        """Texto en renglones (markdown simple: sin '**', viñetas '- ' → '• '), cortado al ancho."""
+        for linea in txt.split("\n"):
+            linea = linea.strip().replace("**", "")
+            if linea.startswith("- "):
+                linea = "• " + linea[2:]
+            for trozo in self._split(linea, fuente, size, self.util) or [""]:
+                if not self.entra(_RENGLON):
+                    self.nueva_pagina()
+                self.c.setFont(fuente, size)
+                self.c.drawString(_MARGEN, self.y, trozo)
+                self.y -= _RENGLON
+
+    def fila(self, celdas, alineacion, fuente="Helvetica", linea=False):
+        """Un renglón de la tabla; números a la derecha de su columna."""
+        self.c.setFont(fuente, 8)
+        ancho = self.util / len(celdas)
+        for k, (txt, derecha) in enumerate(zip(celdas, alineacion)):
+            if derecha:
+                self.c.drawRightString(_MARGEN + (k + 1) * ancho - 4, self.y, txt)
+            else:
+                self.c.drawString(_MARGEN + k * ancho + 2, self.y, txt)
+        if linea:
+            self.c.line(_MARGEN, self.y - 3, _MARGEN + self.util, self.y - 3)
+        self.y -= _FILA
+
+    def tabla(self, bloques, formatos, totales=()):
+        """
+        Tabla por bloques: encabezado en cada página, subtotal de las columnas
+        totales al pie de cada página y total general al final.
+        """
+        header = fmts = derecha = None
+        suma_pag = suma = None
+
+        def cierre(etiqueta, valores):
+            celdas = [etiqueta] + [fmts[k](valores[k]) if header[k] in totales else ""
+                                   for k in range(1, len(header))]
+            self.fila(celdas, derecha, "Helvetica-Bold")
+
+        for df in _frames(bloques):
+            if header is None:
+                header = [str(c) for c in df.columns]
+                fmts = [_pdf_formatter(formatos.get(c)) for c in header]
+                derecha = [pd.api.types.is_numeric_dtype(df[c]) for c in df.columns]
+                suma_pag, suma = [0.0] * len(header), [0.0] * len(header)
+                if not self.entra(3 * _FILA):
+                    self.nueva_pagina()
+                self.fila(header, derecha, "Helvetica-Bold", linea=True)
+            textos = [_pdf_column(df.iloc[:, k], fmts[k]) for k in range(len(header))]
+            sumables = {k: df.iloc[:, k].fillna(0).tolist() for k, h in enumerate(header) if h in totales}
+            for j, celdas in enumerate(zip(*textos)):
+                if not self.entra(2 * _FILA):
+                    # Subtotal de la página; la tabla sigue con encabezado en la siguiente
+                    cierre("Subtotal", suma_pag)
+                    self.nueva_pagina()
+                    self.fila(header, derecha, "Helvetica-Bold", linea=True)
+                    suma_pag = [0.0] * len(header)
+                self.fila(celdas, derecha)
+                for k, vals in sumables.items():
+                    suma_pag[k] += vals[j]
+                    suma[k] += vals[j]
+        if header is not None and any(h in totales for h in header):
+            self.c.line(_MARGEN, self.y + _FILA - 3, _MARGEN + self.util, self.y + _FILA - 3)
+            cierre("Total", suma)
+
+    def cerrar(self):
+        self.nueva_pagina()
+        self.c.save()
+
+
+def write_pdf_report(out, secciones):
+    """
+    Escribe un informe PDF en out (ruta o archivo binario), en páginas carta.
+    secciones: iterable de (titulo, texto, flujo); flujo puede ser None, un
+    DataFrame o un iterable de DataFrames (bloques) y se dibuja como tabla con
+    encabezado en cada página, subtotales por página y total (TOTALES_FLUJO).
+    Cada sección después de la primera empieza en una página nueva.
+    """
+    informe = None
+    for titulo, texto, flujo in secciones:
+        if informe is None:
+            informe = _PdfInforme(out, titulo)
+        else:
+            informe.nueva_pagina()
+            informe.titulo = titulo
+        if titulo:
+            informe.texto(titulo, "Helvetica-Bold", 13)
+            informe.y -= 4
+        if texto:
+            informe.texto(texto)
+        if flujo is not None:
+            informe.y -= _RENGLON
+            informe.tabla(flujo, FORMATOS_FLUJO, TOTALES_FLUJO)
+    if informe is None:
+        informe = _PdfInforme(out)
+    informe.cerrar()
+
+
+def export_pdf(informe_pdf, df_flujo=None):
+    """Informe (texto) y, si hay, tabla de flujo en un PDF carta paginado (bytes)."""
+    buffer = BytesIO()
+    write_pdf_report(buffer, [("Informe de tasa", informe_pdf, df_flujo)])
+    return buffer.getvalue()
+
+
+# --- Descargas memoizadas por contenido ---
+# Compartida entre sesiones: los bytes se arman una vez por resultado
+export_cache = TTLCache(maxsize=64, ttl=3600.0)
+
+
+def cached_export(builder, *args):
+    """
+    builder(*args) (export_csv, export_excel, export_pdf) memoizado por el
+    hash del contenido de args: si el resultado y la explicación no cambian,
+    devuelve los mismos bytes sin volver a armarlos.
+    """
+    key = (builder.__name__, content_hash(*args))
+    data = export_cache.get(key)
+    if data is None:
+        data = builder(*args)
+        export_cache.put(key, data)
+    return data
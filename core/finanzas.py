@@ -1,3 +1,11 @@
+import json
+import math
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import numpy as np
 import pandas as pd
 
 
@@ -12,85 +20,673 @@ def present_value_annuity(pmt, i, n, adelantado=False):
         pv *= (1 + i)
     return pv
 
+# --- Instrumentación opcional (contadores y tiempos por fase) ---
+class SolverStats:
+    """
+    Contadores y tiempos acumulados de los solvers mientras está activa
+    (ver instrument). evaluaciones_vp cuenta evaluaciones del VP / factor de
+    renta (en lote, una por fila y paso); aciertos_cache, las resoluciones
+    servidas por una caché (sin evaluaciones); as_dict() da la vista agregada.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.resoluciones = 0
+        self.aciertos_cache = 0
+        self.sin_convergencia = 0
+        self.evaluaciones_vp = 0
+        self.pasos_newton = 0       # pasos de Newton/Halley aceptados
+        self.pasos_biseccion = 0    # pasos de bisección (respaldo o fuera del intervalo)
+        self.tiempos = {}           # fase -> [llamadas, segundos]
+
+    def record(self, resoluciones=1, sin_convergencia=0, evaluaciones=0, newton=0, biseccion=0):
+        self.resoluciones += resoluciones
+        self.sin_convergencia += sin_convergencia
+        self.evaluaciones_vp += evaluaciones
+        self.pasos_newton += newton
+        self.pasos_biseccion += biseccion
+
+    def record_cache_hit(self, resoluciones=1):
+        self.resoluciones += resoluciones
+        self.aciertos_cache += resoluciones
+
+    def add_time(self, fase, segundos):
+        t = self.tiempos.setdefault(fase, [0, 0.0])
+        t[0] += 1
+        t[1] += segundos
+
+    def as_dict(self):
+        return {
+            "resoluciones": self.resoluciones,
+            "aciertos_cache": self.aciertos_cache,
+            "sin_convergencia": self.sin_convergencia,
+            "evaluaciones_vp": self.evaluaciones_vp,
+            "pasos_newton": self.pasos_newton,
+            "pasos_biseccion": self.pasos_biseccion,
+            "tiempos": {f: {"llamadas": c, "segundos": t} for f, (c, t) in self.tiempos.items()},
+        }
+
+
+# Colector activo en el hilo/contexto actual (None = sin instrumentar, costo ~nulo)
+_stats = ContextVar("solver_stats", default=None)
+
+def activate_instrumentation(stats):
+    """
+    Activa `stats` (SolverStats) para el contexto actual, o la desactiva con None.
+    Para scripts que no pueden envolver su código en `with instrument()` (Streamlit).
+    """
+    return _stats.set(stats)
+
+@contextmanager
+def instrument(stats=None, callback=None):
+    """
+    Instrumenta los solvers dentro del bloque y devuelve el SolverStats (nuevo
+    o el pasado, que acumula). callback(stats), si se da, se llama al salir.
+    No cruza procesos: core.paralelo no reporta lo que resuelven sus workers.
+    """
+    stats = SolverStats() if stats is None else stats
+    token = _stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _stats.reset(token)
+        if callback is not None:
+            callback(stats)
+
+def record_cache_hit():
+    """Cuenta una resolución servida desde una caché si hay instrumentación activa."""
+    st = _stats.get()
+    if st is not None:
+        st.record_cache_hit()
+
+@contextmanager
+def phase(nombre):
+    """Mide el bloque como la fase `nombre` si hay instrumentación activa."""
+    st = _stats.get()
+    if st is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        st.add_time(nombre, time.perf_counter() - t0)
+
+
 # --- Cálculo de tasa implícita ---
 def baily_initial_guess(pv, pmt, n):
     """Semilla tipo Baily para arrancar Newton."""
     return max(((pmt * n / pv) - 1) * 2.0 / (n + 1.0), 1e-6)
 
-# --- Tasa mensual que iguala PV y PMT en n cuotas ---
-def solve_monthly_rate(pv, pmt, n, adelantado=False, tol=1e-12, max_iter=80):
-    """Halla i mensual tal que VP(cuotas)=pv. Newton con fallback bisección."""
-    i = baily_initial_guess(pv, pmt, n)
-
-    # --- Newton-Raphson ---
-    for _ in range(max_iter):
-        if i <= 0:
-            i = 1e-6
-        a = (1 + i) ** (-n)
-        f = present_value_annuity(pmt, i, n, adelantado) - pv
-        # derivada aproximada clásica para renta vencida/adelantada
-        df = pmt * ((i * n * a) / (1 + i) + (a - 1)) / (i ** 2)
-        if df == 0:
-            break
-        i_new = i - f / df
+# --- Grilla precalculada de tasas (semillas y modo aproximado) ---
+# Guarda log(i) de renta vencida sobre u = ln(n) y z = ln(pmt·n/pv - 1); en esas
+# coordenadas log(i) es casi lineal en ambos extremos (i→0 y perpetuidad).
+# Adelantado usa la misma grilla: (pv, pmt, n) adelantado ≡ (pv-pmt, pmt, n-1) vencido.
+# La generan `python -m scripts.build_rate_grid` y se carga (mmap) al primer uso.
+GRID_DIR = os.path.join(os.path.dirname(__file__), "data")
+_grid = None
+
+def load_rate_grid():
+    """Devuelve (grilla, meta) de la grilla precalculada, o None si no está generada."""
+    global _grid
+    if _grid is None:
+        try:
+            with open(os.path.join(GRID_DIR, "rate_grid.json"), encoding="utf-8") as fh:
+                meta = json.load(fh)
+            # ndarray sobre el mmap: sin el costo de la subclase memmap al indexar
+            _grid = (np.asarray(np.load(os.path.join(GRID_DIR, "rate_grid.npy"), mmap_mode="r")), meta)
+        except (OSError, ValueError):
+            _grid = False
+    return _grid or None
+
+def _grid_coords(pv, pmt, n, adelantado):
+    """Pasa a renta vencida equivalente: devuelve (n, x) con x = pmt·n/pv."""
+    adelantado = np.asarray(adelantado, dtype=bool)
+    pv = pv - pmt * adelantado
+    n = n - adelantado
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return n, pmt * n / pv
+
+def interp_log_rate(grid, meta, n, x):
+    """
+    Interpolación bilineal de log(i) en la grilla (arrays con n >= 1 y x > 1;
+    fuera del rango generado extrapola linealmente). Indexa la grilla
+    aplanada: un solo gather por esquina de la celda.
+    """
+    fu = np.log(n) * (1 / meta["du"])
+    fz = (np.log(x - 1) - meta["z_min"]) * (1 / meta["dz"])
+    nz = meta["nz"]
+    # Se recorta en float y se trunca (= floor en [0, ...]): más rápido que recortar enteros
+    iu = np.clip(fu, 0, meta["nu"] - 2).astype(np.intp)
+    iz = np.clip(fz, 0, nz - 2).astype(np.intp)
+    a, b = fu - iu, fz - iz
+    plana = grid.reshape(-1)
+    k = iu * nz + iz
+    g0 = plana[k]
+    g0 += b * (plana[k + 1] - g0)                   # borde iu (interpolado en z)
+    k += nz
+    g1 = plana[k]
+    g1 += b * (plana[k + 1] - g1)                   # borde iu + 1
+    g0 += a * (g1 - g0)
+    return g0
+
+def _grid_in_domain(meta, n, x):
+    """Filas dentro del rango generado (donde vale la cota de error de la grilla)."""
+    with np.errstate(invalid="ignore"):
+        return ((n >= 1) & (n <= meta["n_max"]) & (x > 1)
+                & (x - 1 >= math.exp(meta["z_min"])) & (x - 1 <= math.exp(meta["z_max"])))
+
+def grid_initial_guess(pv, pmt, n, adelantado=False):
+    """Semilla interpolada de la grilla (1–2 pasos de Halley); Baily si no hay grilla o cae afuera."""
+    g = load_rate_grid()
+    pv_v, n_v = (pv - pmt, n - 1) if adelantado else (pv, n)
+    if g is not None and pv_v > 0 and pmt * n_v > pv_v:
+        grid, meta = g
+        # Versión escalar de interp_log_rate (evita el costo de NumPy por llamada)
+        fu = math.log(n_v) / meta["du"]
+        fz = (math.log(pmt * n_v / pv_v - 1) - meta["z_min"]) / meta["dz"]
+        if n_v <= meta["n_max"] and fz <= meta["nz"] - 1:
+            iu = min(max(int(fu), 0), meta["nu"] - 2)      # n < 1: extrapola desde la primera celda
+            iz = min(max(math.floor(fz), 0), meta["nz"] - 2)
+            a, b = fu - iu, fz - iz
+            g00, g01 = grid.item(iu, iz), grid.item(iu, iz + 1)
+            g10, g11 = grid.item(iu + 1, iz), grid.item(iu + 1, iz + 1)
+            return math.exp((1 - a) * ((1 - b) * g00 + b * g01) + a * ((1 - b) * g10 + b * g11))
+    return baily_initial_guess(pv, pmt, n)
+
+def _grid_seed_vec(pv, pmt, n, adelantado):
+    """Como grid_initial_guess, sobre arrays."""
+    g = load_rate_grid()
+    if g is not None:
+        grid, meta = g
+        nv, x = _grid_coords(pv, pmt, n, adelantado)
+        x_max = 1 + math.exp(meta["z_max"])
+        # Caso común: todo el bloque dentro de la grilla (reducciones, sin máscaras)
+        if nv.size and nv.min() >= 1 and nv.max() <= meta["n_max"] and x.min() > 1 and x.max() <= x_max:
+            return np.exp(interp_log_rate(grid, meta, nv, x))
+        ok = (nv >= 1) & (nv <= meta["n_max"]) & (x > 1) & (x <= x_max)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        baily = np.maximum(((pmt * n / pv) - 1) * 2.0 / (n + 1.0), 1e-6)
+    if g is not None and ok.any():
+        baily[ok] = np.exp(interp_log_rate(grid, meta, nv[ok], x[ok]))
+    return baily
+
+# --- Tasa aproximada leída directo de la grilla ---
+def solve_monthly_rate_approx(pv, pmt, n, adelantado=False):
+    """
+    Tasa leída de la grilla sin iterar (escalares o arrays). Devuelve (i, cota_rel):
+    dentro del dominio de la grilla |i - i_exacta| <= cota_rel·i_exacta (cota medida
+    al generarla); afuera, o sin grilla, se resuelve exacto y la cota es 0.
+    """
+    pv, pmt, n, adel = np.broadcast_arrays(
+        np.asarray(pv, dtype=float), np.asarray(pmt, dtype=float),
+        np.asarray(n, dtype=float), np.asarray(adelantado, dtype=bool),
+    )
+    i = np.full(pv.shape, np.nan)
+    cota = np.zeros(pv.shape)
+    g = load_rate_grid()
+    ok = np.zeros(pv.shape, dtype=bool)
+    if g is not None:
+        grid, meta = g
+        nv, x = _grid_coords(pv, pmt, n, adel)
+        ok = _grid_in_domain(meta, nv, x) & (pv > 0) & (pmt > 0)
+        i[ok] = np.exp(interp_log_rate(grid, meta, nv[ok], x[ok]))
+        cota[ok] = meta["cota_rel"]
+    if not ok.all():
+        i[~ok], _, _ = solve_monthly_rate_batch(pv[~ok], pmt[~ok], n[~ok], adel[~ok])
+    return i, cota
+
+# --- Factor de renta y sus derivadas exactas ---
+def _annuity_factor_derivs(i, n, adelantado=False):
+    """
+    Factor de renta a(i) (VP de n cuotas de 1) y sus derivadas a'(i), a''(i),
+    exactas para pago vencido y adelantado. Usa log1p/expm1 y, para n·i chico,
+    la serie de Taylor en 0 (las fórmulas cerradas pierden dígitos ahí).
+    """
+    if abs(i * n) < 1e-5:
+        c1 = n * (n + 1) / 2
+        c2 = c1 * (n + 2) / 3
+        c3 = c2 * (n + 3) / 4
+        a = n - c1 * i + c2 * i * i - c3 * i ** 3
+        da = -c1 + 2 * c2 * i - 3 * c3 * i * i
+        d2a = 2 * c2 - 6 * c3 * i
+    else:
+        ln1p = math.log1p(i)
+        vn = math.exp(-n * ln1p)                 # (1+i)^-n
+        a = -math.expm1(-n * ln1p) / i           # (1 - (1+i)^-n) / i
+        da = (n * vn / (1 + i) - a) / i
+        d2a = (-n * (n + 1) * vn / (1 + i) ** 2 - 2 * da) / i
+    if adelantado:
+        a, da, d2a = a * (1 + i), da * (1 + i) + a, d2a * (1 + i) + 2 * da
+    return a, da, d2a
+
+# --- Intervalo inicial que encierra la tasa ---
+def _rate_bracket(pv, pmt, n, adelantado=False):
+    """
+    Devuelve (lo, hi) con VP(lo) >= pv >= VP(hi), o None si no hay tasa >= 0.
+    Cota superior: perpetuidad (vencido i < pmt/pv; adelantado i < pmt/(pv-pmt)),
+    con un margen porque para n grande la raíz coincide con ella en punto flotante.
+    """
+    if not (pv > 0 and pmt > 0 and n > 0) or pmt * n < pv:
+        return None
+    if adelantado:
+        if pv <= pmt:
+            return None
+        return 0.0, pmt / (pv - pmt) * (1 + 1e-6)
+    return 0.0, pmt / pv * (1 + 1e-6)
+
+# --- Motor de tasa: Halley con derivadas exactas dentro de un intervalo ---
+def solve_monthly_rate_halley(pv, pmt, n, adelantado=False, tol=1e-12, max_iter=50, trace=None):
+    """
+    Halla i mensual tal que VP(cuotas)=pv con pasos de Halley y derivadas exactas.
+    Mantiene un intervalo [lo, hi] con la raíz adentro: si un paso sale de él,
+    se biseca ese paso (Newton-en-intervalo), así que no hace falta un respaldo.
+    Devuelve (i, iters); i es NaN si no existe una tasa >= 0. Si se pasa trace
+    (lista), se le agrega un dict por iteración (ver solve_monthly_rate_trace).
+    """
+    bracket = _rate_bracket(pv, pmt, n, adelantado)
+    if bracket is None:
+        return math.nan, 0
+    lo, hi = bracket
+    if pmt * n == pv:
+        return 0.0, 0
+
+    st = _stats.get()
+    if st is not None:
+        t0 = time.perf_counter()
+    # Semilla recortada al intervalo (para n grande la raíz queda pegada a hi)
+    i = min(max(grid_initial_guess(pv, pmt, n, adelantado), lo), hi)
+    if st is None:
+        return _halley_loop(pv, pmt, n, adelantado, i, lo, hi, tol, max_iter, trace)[:2]
+    t1 = time.perf_counter()
+    i, k, biseccion, convergio = _halley_loop(pv, pmt, n, adelantado, i, lo, hi, tol, max_iter, trace)
+    st.add_time("semilla", t1 - t0)
+    st.add_time("iteracion", time.perf_counter() - t1)
+    st.record(sin_convergencia=int(not convergio), evaluaciones=k, newton=k - biseccion, biseccion=biseccion)
+    return i, k
+
+def _halley_loop(pv, pmt, n, adelantado, i, lo, hi, tol, max_iter, trace=None):
+    """Iteraciones de solve_monthly_rate_halley: (i, iters, pasos_biseccion, convergio)."""
+    biseccion = 0
+    for k in range(1, max_iter + 1):
+        a, da, d2a = _annuity_factor_derivs(i, n, adelantado)
+        f = pmt * a - pv
+        if f == 0:
+            if trace is not None:
+                trace.append({"iter": k, "method": "halley", "i": i, "f": f, "df": pmt * da, "lo": lo, "hi": hi})
+            return i, k, biseccion, True
+        if f > 0:
+            lo = i
+        else:
+            hi = i
+        df, d2f = pmt * da, pmt * d2a
+        den = 2 * df * df - f * d2f
+        i_new = i - (2 * f * df / den if den != 0 else f / df)
+        metodo = "halley"
+        if not lo < i_new < hi:
+            i_new = (lo + hi) / 2
+            biseccion += 1
+            metodo = "bisect"
+        if trace is not None:
+            trace.append({"iter": k, "method": metodo, "i": i, "f": f, "df": df, "lo": lo, "hi": hi})
         if abs(i_new - i) < tol:
-            i = i_new
-            return i
+            return i_new, k, biseccion, True
         i = i_new
+    return i, max_iter, biseccion, False
 
-    # --- Bisección robusta, si Newton no fue suficiente ---
-    lo, hi = 1e-12, 10.0
-    mid = (lo + hi) / 2
-    for _ in range(200):
-        mid = (lo + hi) / 2
-        fmid = present_value_annuity(pmt, mid, n, adelantado) - pv
-        if abs(fmid) < 1e-10:
-            return mid
-        flo = present_value_annuity(pmt, lo, n, adelantado) - pv
-        if flo * fmid <= 0:
-            hi = mid
-        else:
-            lo = mid
-    return mid
+# --- Tasa mensual que iguala PV y PMT en n cuotas ---
+def solve_monthly_rate(pv, pmt, n, adelantado=False, tol=1e-12, max_iter=80):
+    """Halla i mensual tal que VP(cuotas)=pv (motor de Halley con intervalo)."""
+    i, _ = solve_monthly_rate_halley(pv, pmt, n, adelantado, tol=tol, max_iter=max_iter)
+    return i
 
 # --- Tasa mensual con traza (pasos) ---
 def solve_monthly_rate_trace(pv, pmt, n, adelantado=False, tol=1e-12, max_iter=80):
-    """Como solve_monthly_rate pero devolviendo (i, trace) con pasos de Newton y Bisección."""
+    """
+    Como solve_monthly_rate (mismo motor: semilla de la grilla y Halley en
+    intervalo) pero devolviendo (i, trace): un dict por iteración con iter,
+    method ('halley', o 'bisect' si el paso salió del intervalo), i, f, df y
+    el intervalo lo, hi. i es NaN (traza vacía) si no existe una tasa >= 0.
+    """
     trace = []
-    # --- Newton-Raphson con semilla tipo Baily ---
-    i = baily_initial_guess(pv, pmt, n)
+    i, _ = solve_monthly_rate_halley(pv, pmt, n, adelantado, tol=tol, max_iter=max_iter, trace=trace)
+    return i, trace
 
-    # Newton
-    for k in range(1, max_iter + 1):
-        if i <= 0:
-            i = 1e-6
-        a = (1 + i) ** (-n)
-        f = present_value_annuity(pmt, i, n, adelantado) - pv
-
-        df = pmt * ((i * n * a) / (1 + i) + (a - 1)) / (i ** 2)
-        trace.append({"iter": k, "method": "newton", "i": i, "f": f, "df": df})
-        if df == 0:
-            break
-        i_new = i - f / df
-        if abs(i_new - i) < tol:
-            i = i_new
-            return i, trace
-        i = i_new
+# --- Versión vectorizada de _annuity_factor_derivs ---
+def _annuity_factor_derivs_vec(i, n, adelantado):
+    """Como _annuity_factor_derivs, pero sobre arrays NumPy."""
+    chico = np.abs(i * n) < 1e-5
+    hay_chico = chico.any()
+    ii = np.where(chico, 1.0, i) if hay_chico else i   # evita 0/0 en la rama cerrada
+    ln1p = np.log1p(ii)
+    vn_v = np.exp(-(n + 1) * ln1p)               # (1+i)^-(n+1)
+    a = -np.expm1(-n * ln1p) / ii
+    da = (n * vn_v - a) / ii
+    d2a = (-n * (n + 1) * vn_v / (1 + ii) - 2 * da) / ii
+    if hay_chico:
+        ic, nc = i[chico], n[chico]
+        c1 = nc * (nc + 1) / 2
+        c2 = c1 * (nc + 2) / 3
+        c3 = c2 * (nc + 3) / 4
+        a[chico] = nc - c1 * ic + c2 * ic * ic - c3 * ic ** 3
+        da[chico] = -c1 + 2 * c2 * ic - 3 * c3 * ic * ic
+        d2a[chico] = 2 * c2 - 6 * c3 * ic
+    if adelantado.any():
+        d2a = np.where(adelantado, d2a * (1 + i) + 2 * da, d2a)
+        da = np.where(adelantado, da * (1 + i) + a, da)
+        a = np.where(adelantado, a * (1 + i), a)
+    return a, da, d2a
+
+# --- Tasa mensual para carteras completas (vectorizado) ---
+_BLOQUE = 1 << 15   # filas por bloque: los temporales entran en caché
+
+def solve_monthly_rate_batch(pv, pmt, n, adelantado=False, tol=1e-12, max_iter=80):
+    """
+    Versión vectorizada de solve_monthly_rate: resuelve todas las filas a la vez.
+    Acepta arrays (o escalares) de pv, pmt, n y adelantado; las filas salen del
+    lote apenas convergen. Filas inválidas o sin tasa >= 0 quedan en NaN.
+    Devuelve (i, iters, convergio) con la forma de los datos de entrada.
+    """
+    pv, pmt, n, adel = np.broadcast_arrays(
+        np.asarray(pv, dtype=float), np.asarray(pmt, dtype=float),
+        np.asarray(n, dtype=float), np.asarray(adelantado, dtype=bool),
+    )
+    shape = pv.shape
+    pv, pmt, n, adel = (x.ravel() for x in (pv, pmt, n, adel))
+
+    i = np.full(pv.size, np.nan)
+    iters = np.zeros(pv.size, dtype=np.int64)
+    convergio = np.zeros(pv.size, dtype=bool)
+
+    st = _stats.get()
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for s in range(0, pv.size, _BLOQUE):
+            b = slice(s, s + _BLOQUE)
+            _solve_rate_block(pv[b], pmt[b], n[b], adel[b], tol, max_iter,
+                              i[b], iters[b], convergio[b], st)
+
+    return i.reshape(shape), iters.reshape(shape), convergio.reshape(shape)
+
+def _halley_checked(pv, pmt, n, adelantado, i0, hi, tol):
+    """
+    Paso rápido del lote: un Halley desde la semilla y la corrección de Newton
+    con el residuo en el punto nuevo (solo el factor, sin derivadas).
+    Devuelve (i, bueno): bueno marca las filas cuya corrección ya es < tol
+    con 0 < i < min(hi, 1) y fuera de la zona de la serie de Taylor; las
+    demás siguen con el bucle en intervalo (arriba del 100% por período el
+    redondeo del VP ya mueve la raíz más que tol y conviene el mismo camino
+    que el escalar).
+    """
+    ln1p = np.log1p(i0)
+    em = np.expm1(-n * ln1p)                      # (1+i)^-n - 1
+    a = -em / i0
+    vn_v = (1 + em) / (1 + i0)                    # (1+i)^-(n+1)
+    da = (n * vn_v - a) / i0
+    d2a = (-n * (n + 1) * vn_v / (1 + i0) - 2 * da) / i0
+    g = 1 + i0 * adelantado                       # adelantado: factor·(1+i)
+    d2a = d2a * g + 2 * da * adelantado
+    da = da * g + a * adelantado
+    f = pmt * a * g - pv
+    df = pmt * da
+    i1 = i0 - 2 * f * df / (2 * df * df - f * pmt * d2a)
+    f1 = pmt * (-np.expm1(-n * np.log1p(i1)) / i1) * (1 + i1 * adelantado) - pv
+    corr = f1 / df
+    bueno = (np.abs(corr) < tol) & (i1 > 0) & (i1 < hi) & (i1 < 1) & (i1 * n >= 1e-5)
+    return i1 - corr, bueno
+
+# --- Bloque completo en la grilla: camino rápido sin máscaras ---
+_tabla = None
 
-    # Bisección de respaldo
-    lo, hi = 1e-12, 10.0
-    for k in range(1, 201):
-        mid = (lo + hi) / 2
-        fmid = present_value_annuity(pmt, mid, n, adelantado) - pv
-        trace.append({"iter": k, "method": "bisect", "lo": lo, "hi": hi, "mid": mid, "fmid": fmid})
-        if abs(fmid) < 1e-10:
-            return mid, trace
-        flo = present_value_annuity(pmt, lo, n, adelantado) - pv
-        if flo * fmid <= 0:
-            hi = mid
+def _grid_table():
+    """
+    Coeficientes bilineales por celda de la grilla (g00, g10-g00, g01-g00,
+    g11-g10-g01+g00) en float32: a la semilla le basta ~1e-4 de precisión
+    (la cota de la grilla) y float32 reduce a la mitad el costo. La grilla se
+    extiende una celda en cada eje para que floor() nunca quede afuera.
+    """
+    global _tabla
+    if _tabla is None:
+        g = load_rate_grid()
+        if g is None:
+            _tabla = False
+            return None
+        grid, meta = g
+        nu, nz = meta["nu"], meta["nz"]
+        gp = np.empty((nu + 1, nz + 1))
+        gp[:nu, :nz] = grid
+        gp[nu, :nz] = grid[-1]
+        gp[:, nz] = gp[:, nz - 1]
+        g00, g10, g01, g11 = gp[:-1, :-1], gp[1:, :-1], gp[:-1, 1:], gp[1:, 1:]
+        coef = (g00, g10 - g00, g01 - g00, g11 - g10 - g01 + g00)
+        _tabla = {
+            "coef": tuple(np.ascontiguousarray(x.reshape(-1), dtype=np.float32) for x in coef),
+            "nz": nz, "n_max": meta["n_max"],
+            "z_min": np.float32(meta["z_min"]),
+            "inv_du": np.float32(1 / meta["du"]), "inv_dz": np.float32(1 / meta["dz"]),
+            "xm1_min": math.exp(meta["z_min"]), "xm1_max": math.exp(meta["z_max"]),
+        }
+    return _tabla or None
+
+def _halley_block_fast(pv, pmt, n, adel, tol):
+    """
+    Semilla + Halley + residuo para un bloque entero en renta vencida
+    equivalente (pv-pmt·adel, pmt, n-adel), con los chequeos de
+    _halley_checked hechos por reducciones. Devuelve el array de tasas, o
+    None si alguna fila no cumple (queda para el camino por filas).
+    """
+    t = _grid_table()
+    if t is None:
+        return None
+    d = pmt * n
+    d -= pv                                       # pmt·n - pv (> 0 con tasa > 0)
+    c = pmt * adel
+    np.subtract(pv, c, out=c)                     # VP vencido equivalente
+    nv = n - adel
+    n_min = nv.min()
+    # c > 0 y d > 0 implican pmt > 0; NaN e inf no pasan las comparaciones
+    if not (c.min() > 0 and d.min() > 0 and n_min >= 1 and nv.max() <= t["n_max"]):
+        return None
+    d /= c                                        # x - 1
+    if not (d.min() >= t["xm1_min"] and d.max() <= t["xm1_max"]):
+        return None
+    c /= pmt                                      # raíz de a(i) = c
+    # Semilla en float32: log(i) interpolado en la celda (floor + resta, sin modf)
+    fu = np.log(nv, dtype=np.float32)
+    fu *= t["inv_du"]
+    fz = np.log(d, dtype=np.float32)
+    fz -= t["z_min"]
+    fz *= t["inv_dz"]
+    k = np.floor(fu)
+    a = fu - k
+    k *= t["nz"]
+    fu = np.floor(fz)
+    b = fz - fu
+    k += fu
+    k = k.astype(np.intp)
+    c00, c10, c01, c11 = t["coef"]
+    g = c11.take(k, mode="clip")
+    g *= a
+    g += c01.take(k, mode="clip")
+    g *= b
+    a *= c10.take(k, mode="clip")
+    a += c00.take(k, mode="clip")
+    g += a
+    i0 = np.exp(g, out=g).astype(np.float64)
+    # Halley sobre F(i) = c - a(i); s = -a(i), w va tomando v^n, a', a''
+    nneg = -nv
+    w = np.log1p(i0)
+    w *= nneg
+    np.expm1(w, out=w)                            # v^n - 1
+    s = w / i0
+    ip1 = i0 + 1
+    w += 1
+    w /= ip1
+    w *= nv                                       # n·v^(n+1)
+    da = w + s
+    da /= i0                                      # -a'
+    nv += 1
+    w *= nv
+    w /= ip1                                      # n(n+1)·v^(n+2)
+    twoda = da + da
+    w += twoda
+    w /= i0                                       # -a''
+    s += c                                        # F
+    den = twoda * da
+    w *= s
+    den -= w
+    s *= twoda
+    s /= den
+    i1 = s
+    i1 += i0
+    # Residuo en el punto nuevo: corrección de Newton, debe ser < tol
+    w = np.log1p(i1)
+    w *= nneg
+    np.expm1(w, out=w)
+    w /= i1
+    w += c
+    w /= da
+    c *= i1                                       # i < hi de _rate_bracket
+    i_min = i1.min()
+    # i·n >= 1e-5 (fuera de la zona de Taylor) con el n más chico del bloque
+    if not (w.max() < tol and w.min() > -tol and i_min > 0 and i1.max() < 1
+            and c.max() < 1 + 1e-6 and i_min * n_min >= 1e-5):
+        return None
+    i1 += w
+    return i1
+
+def _solve_rate_block(pv, pmt, n, adel, tol, max_iter, i, iters, convergio, st=None):
+    """
+    Halley en intervalo sobre un bloque; escribe en i, iters y convergio (vistas).
+    Si todo el bloque cae en la grilla y converge en el paso rápido lo
+    resuelve _halley_block_fast; si no, paso rápido por filas
+    (_halley_checked, dos evaluaciones por fila) y las filas que no quedan
+    resueltas ahí siguen con el bucle desde la semilla.
+    Con st (SolverStats) acumula evaluaciones, pasos y tiempos del bloque.
+    """
+    if st is not None:
+        t0 = time.perf_counter()
+    if max_iter >= 2 and pv.size:
+        rapido = _halley_block_fast(pv, pmt, n, adel, tol)
+        if rapido is not None:
+            i[:], iters[:], convergio[:] = rapido, 2, True
+            if st is not None:
+                st.add_time("iteracion", time.perf_counter() - t0)
+                st.record(resoluciones=pv.size, sin_convergencia=0,
+                          evaluaciones=2 * pv.size, newton=2 * pv.size, biseccion=0)
+            return
+    # Mismo intervalo que _rate_bracket; filas sin tasa >= 0 quedan en NaN
+    pn = pmt * n
+    valido = (np.isfinite(pn * pv) & (pv > 0) & (pmt > 0) & (n > 0)
+              & (pn >= pv) & ~(adel & (pv <= pmt)))
+    cero = valido & (pn == pv)
+    resolver = valido & ~cero
+    if resolver.all():
+        act, pa, na, ad, va = np.arange(pv.size), pmt, n, adel, pv
+    else:
+        i[cero] = 0.0
+        convergio[cero] = True
+        act = np.flatnonzero(resolver)
+        pa, na, ad, va = pmt[act], n[act], adel[act], pv[act]
+    hi = pa / (va - pa * ad) * (1 + 1e-6)
+    seed = _grid_seed_vec(va, pa, na, ad)
+    np.minimum(seed, hi, out=seed)
+    if st is not None:
+        filas, evaluaciones, biseccion = act.size, 0, 0
+        t1 = time.perf_counter()
+
+    k0 = 0
+    if max_iter >= 2 and act.size:
+        ir, bueno = _halley_checked(va, pa, na, ad, seed, hi, tol)
+        if st is not None:
+            evaluaciones += 2 * act.size
+        if bueno.all():
+            i[act], iters[act], convergio[act] = ir, 2, True
+            act = act[:0]
         else:
-            lo = mid
-    return mid, trace
+            listas = act[bueno]
+            i[listas], iters[listas], convergio[listas] = ir[bueno], 2, True
+            sigue = ~bueno
+            act, seed, pa, na, ad, va, hi = (x[sigue] for x in (act, seed, pa, na, ad, va, hi))
+            k0 = 2
+
+    # Bucle en intervalo (filas que el paso rápido no resolvió)
+    ia, lo = seed, np.zeros(act.size)
+    iters[act] = max_iter
+    for k in range(k0 + 1, max_iter + 1):
+        if act.size == 0:
+            break
+        if st is not None:
+            evaluaciones += act.size
+        a, da, d2a = _annuity_factor_derivs_vec(ia, na, ad)
+        f = pa * a - va
+        np.copyto(lo, ia, where=f > 0)
+        np.copyto(hi, ia, where=f < 0)
+        df, d2f = pa * da, pa * d2a
+        den = 2 * df * df - f * d2f
+        i_new = ia - np.where(den != 0, 2 * f * df / den, f / df)
+        fuera = ~((i_new > lo) & (i_new < hi))
+        i_new[fuera] = ((lo + hi) / 2)[fuera]
+        if st is not None:
+            biseccion += int(fuera.sum())
+        sale = (f == 0) | (np.abs(i_new - ia) < tol)
+        i_new[f == 0] = ia[f == 0]
+        i[act] = i_new
+        if sale.any():
+            iters[act[sale]] = k
+            convergio[act[sale]] = True
+            sigue = ~sale
+            act, ia, pa, na, ad, va, lo, hi = (x[sigue] for x in (act, i_new, pa, na, ad, va, lo, hi))
+        else:
+            ia = i_new
+    if st is not None:
+        st.add_time("semilla", t1 - t0)
+        st.add_time("iteracion", time.perf_counter() - t1)
+        st.record(resoluciones=filas, sin_convergencia=act.size, evaluaciones=evaluaciones,
+                  newton=evaluaciones - biseccion, biseccion=biseccion)
+
+# --- Cantidad de cuotas n (fórmula cerrada) ---
+def solve_periods(pv, pmt, i, adelantado=False):
+    """
+    n tal que VP(cuotas)=pv a la tasa i: n = -ln(1 - i·PV/PMT) / ln(1+i) (vencido;
+    en adelantado se trae PV a vencido). Devuelve (n_real, n_redondeado,
+    ultima_cuota, factible); ultima_cuota es la última cuota ajustada para
+    equivalencia exacta con n_redondeado cuotas.
+    """
+    if not (i > 0 and pmt > 0 and pv > 0):
+        return math.nan, 0, math.nan, False
+    pv_v = pv / (1 + i) if adelantado else pv
+    x = i * pv_v / pmt
+    if not 0 < x < 1:
+        return math.nan, 0, math.nan, False
+    n_real = -math.log1p(-x) / math.log1p(i)
+    n_red = max(math.ceil(n_real - 1e-9), 1)    # tolera el ruido de 12.0000000001
+    factor_last = (1 + i) ** (-(n_red - 1 if adelantado else n_red))
+    pv_first = present_value_annuity(pmt, i, n_red - 1, adelantado=adelantado) if n_red > 1 else 0.0
+    return n_real, n_red, (pv - pv_first) / factor_last, True
+
+# --- Cantidad de cuotas para carteras completas (vectorizado) ---
+def solve_periods_batch(pv, pmt, i, adelantado=False):
+    """
+    Versión vectorizada de solve_periods. Devuelve (n_real, n_redondeado,
+    ultima_cuota, factible) como arrays; filas no factibles: NaN / 0 / NaN / False.
+    """
+    pv, pmt, i, adel = np.broadcast_arrays(
+        np.asarray(pv, dtype=float), np.asarray(pmt, dtype=float),
+        np.asarray(i, dtype=float), np.asarray(adelantado, dtype=bool),
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ln1p = np.log1p(i)
+        x = i * np.where(adel, pv / (1 + i), pv) / pmt
+        factible = (i > 0) & (pmt > 0) & (pv > 0) & (x > 0) & (x < 1)
+        n_real = np.where(factible, -np.log1p(-x) / ln1p, np.nan)
+        n_red = np.where(factible, np.maximum(np.ceil(n_real - 1e-9), 1), 0).astype(np.int64)
+        # VP de las primeras n-1 cuotas y factor de la última (exponente n-1 si adelantado)
+        k_last = n_red - adel
+        pv_first = pmt * -np.expm1(-(n_red - 1) * ln1p) / i * np.where(adel, 1 + i, 1.0)
+        ultima = np.where(factible, (pv - pv_first) * np.exp(k_last * ln1p), np.nan)
+    return n_real, n_red, ultima, factible
 
 # --- Tasa anual efectiva desde tasa mensual ---
 def annual_effective(i_m):
@@ -102,18 +698,48 @@ def cashflow_table(pmt, n, adelantado, i):
     """
     Devuelve (df_flujo, total_vp) con columnas: periodo, cuota, factor_descuento, vp_cuota.
     """
-    rows = []
-    for k in range(1, n + 1):
-        # Pago vencido: descuenta k períodos; adelantado: k-1
-        exp = (k - 1) if adelantado else k
-        factor = (1 + i) ** (-exp)
-        vp = pmt * factor
-        rows.append({
+    st = _stats.get()
+    if st is not None:
+        t0 = time.perf_counter()
+    # Factores v, v², …, vⁿ como producto acumulado; adelantado descuenta k-1 períodos
+    factor = np.cumprod(np.full(n, 1 / (1 + i)))
+    if adelantado:
+        factor *= (1 + i)
+    vp = pmt * factor
+    df = pd.DataFrame({
+        "periodo": np.arange(1, n + 1),
+        "cuota": np.full(n, pmt),
+        "factor_descuento": factor,
+        "vp_cuota": vp,
+    })
+    if st is not None:
+        st.add_time("flujo", time.perf_counter() - t0)
+    return df, float(vp.sum())
+
+# --- Tabla de flujo por bloques (cronogramas muy largos o muchos planes) ---
+def iter_cashflow_table(pmt, n, adelantado, i, chunk_size=100_000):
+    """
+    Como cashflow_table, pero genera DataFrames de a chunk_size filas sin armar
+    la tabla completa. Con arrays de pmt/n/adelantado/i recorre varios planes
+    seguidos y agrega la columna 'plan' (índice del plan en los arrays).
+    """
+    multi = any(np.ndim(x) > 0 for x in (pmt, n, adelantado, i))
+    pmt, n, adel, i = (np.atleast_1d(x) for x in np.broadcast_arrays(
+        np.asarray(pmt, dtype=float), np.asarray(n, dtype=np.int64),
+        np.asarray(adelantado, dtype=bool), np.asarray(i, dtype=float),
+    ))
+    fin = np.cumsum(n)                  # fila (exclusiva) donde termina cada plan
+    ln1p = np.log1p(i)
+    for s in range(0, int(fin[-1]) if fin.size else 0, chunk_size):
+        fila = np.arange(s, min(s + chunk_size, int(fin[-1])))
+        plan = np.searchsorted(fin, fila, side="right")
+        k = fila - (fin[plan] - n[plan]) + 1
+        factor = np.exp(-(k - adel[plan]) * ln1p[plan])
+        cols = {"plan": plan} if multi else {}
+        cols.update({
             "periodo": k,
-            "cuota": pmt,
+            "cuota": pmt[plan],
             "factor_descuento": factor,
-            "vp_cuota": vp,
+            "vp_cuota": pmt[plan] * factor,
         })
-    total_vp = sum(r["vp_cuota"] for r in rows)
-    df = pd.DataFrame(rows)
-    return df, total_vp
+        yield pd.DataFrame(cols)
@@ -0,0 +1,106 @@
+# --- Datos para gráficos: agregados o reducidos en el servidor ---
+# core/graficos.py
+# Altair manda todas las filas al navegador (y corta en 5.000): arriba de
+# MAX_PUNTOS_GRAFICO el flujo se agrupa por año o, si aun así son muchos, se
+# reduce con LTTB (conserva la forma de la curva con pocos puntos).
+
+import numpy as np
+import pandas as pd
+
+from core.cache import TTLCache, content_hash
+
+
+MAX_PUNTOS_GRAFICO = 1000
+
+
+# --- LTTB (Largest-Triangle-Three-Buckets) ---
+def lttb_indices(x, y, puntos):
+    """
+    Índices de los puntos que conserva LTTB: el primero, el último y, en cada
+    uno de los puntos-2 tramos, el que forma el triángulo más grande con el
+    elegido antes y el promedio del tramo siguiente.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if puntos >= n or puntos < 3:
+        return np.arange(n)
+    bordes = np.linspace(1, n - 1, puntos - 1).astype(np.int64)   # puntos-2 tramos
+    elegidos = np.empty(puntos, dtype=np.int64)
+    elegidos[0], elegidos[-1] = 0, n - 1
+    a = 0
+    for k in range(puntos - 2):
+        ini, fin = bordes[k], bordes[k + 1]
+        sig_ini, sig_fin = fin, (bordes[k + 2] if k + 2 < len(bordes) else n)
+        cx, cy = x[sig_ini:sig_fin].mean(), y[sig_ini:sig_fin].mean()
+        areas = np.abs((x[a] - cx) * (y[ini:fin] - y[a]) - (x[a] - x[ini:fin]) * (cy - y[a]))
+        a = ini + int(areas.argmax())
+        elegidos[k + 1] = a
+    return elegidos
+
+
+# --- Flujo de pagos ---
+def flow_chart_data(df_flujo, pv, max_puntos=MAX_PUNTOS_GRAFICO):
+    """
+    Datos de los gráficos del flujo: fecha_pago, cuota, acum_vp y contado.
+    Devuelve (df, nivel) con nivel 'periodo' (todas las filas), 'año' (cuota
+    = suma de cuotas del año, acum_vp al cierre del año) o 'lttb' (filas
+    elegidas por LTTB sobre acum_vp).
+    """
+    fechas = pd.to_datetime(df_flujo["fecha_pago"])
+    acum = df_flujo["vp_cuota"].cumsum()
+    df = pd.DataFrame({"fecha_pago": fechas, "cuota": df_flujo["cuota"], "acum_vp": acum})
+    nivel = "periodo"
+    if len(df) > max_puntos:
+        anual = df.groupby(fechas.dt.year.to_numpy(), sort=True).agg(
+            fecha_pago=("fecha_pago", "last"), cuota=("cuota", "sum"), acum_vp=("acum_vp", "last"))
+        if len(anual) <= max_puntos:
+            df, nivel = anual, "año"
+        else:
+            idx = lttb_indices(fechas.to_numpy().astype(np.int64), acum.to_numpy(), max_puntos)
+            df, nivel = df.iloc[idx], "lttb"
+    df = df.reset_index(drop=True)
+    df["contado"] = float(pv)
+    return df, nivel
+
+
+# --- Distribución (histograma por bloques) ---
+def histogram_frame(bloques, columna, desde, hasta, bins=50):
+    """
+    Histograma de columna sobre bloques (DataFrames) con bins fijos entre
+    desde y hasta: nunca se juntan todos los valores en memoria. Si los
+    bloques traen ok (resultado del lote) solo cuentan esas filas. Los
+    valores a unos ulp de [desde, hasta] van al intervalo del extremo (un
+    mínimo o máximo que volvió de un CSV puede correrse); más afuera no cuentan.
+    Devuelve un DataFrame con desde, hasta y filas por intervalo.
+    """
+    if not np.isfinite(desde) or not np.isfinite(hasta):
+        return pd.DataFrame(columns=["desde", "hasta", "filas"])
+    if hasta <= desde:
+        hasta = desde + 1e-9
+    bordes = np.linspace(desde, hasta, bins + 1)
+    margen = 4 * np.finfo(float).eps * max(abs(desde), abs(hasta))
+    filas = np.zeros(bins, dtype=np.int64)
+    for df in bloques:
+        if "ok" in df.columns:
+            ok = df["ok"]
+            df = df[ok.to_numpy(bool) if ok.dtype == bool
+                    else ok.astype("string").str.lower().eq("true").fillna(False).to_numpy(bool)]
+        valores = pd.to_numeric(df[columna], errors="coerce").to_numpy(dtype=float)
+        valores = valores[(valores >= desde - margen) & (valores <= hasta + margen)]
+        filas += np.histogram(np.clip(valores, desde, hasta), bins=bordes)[0]
+    return pd.DataFrame({"desde": bordes[:-1], "hasta": bordes[1:], "filas": filas})
+
+
+# --- Memoizado por resultado ---
+chart_cache = TTLCache(maxsize=128, ttl=3600.0)
+
+
+def cached_flow_chart_data(df_flujo, pv, max_puntos=MAX_PUNTOS_GRAFICO):
+    """flow_chart_data memoizado por el contenido del flujo (un cálculo por resultado)."""
+    key = ("flujo", content_hash(df_flujo, pv, max_puntos))
+    data = chart_cache.get(key)
+    if data is None:
+        data = flow_chart_data(df_flujo, pv, max_puntos)
+        chart_cache.put(key, data)
+    return data
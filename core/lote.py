@@ -0,0 +1,414 @@
+# --- Cálculo por lote (todas las filas de un CSV/Excel) ---
+# core/lote.py
+
+import csv
+import io
+import re
+
+import numpy as np
+import pandas as pd
+
+from core.finanzas import annual_effective, solve_monthly_rate_batch, solve_periods_batch
+
+
+# Nombres aceptados por columna (mismo orden de preferencia que el cargador de una fila)
+ALIAS = {
+    "pv":        ("precio_contado", "contado", "precio", "pv"),
+    "n":         ("CANT C", "cant_c", "cuotas", "n"),
+    "pmt":       ("monto_cuota", "cuota", "pmt"),
+    "tipo_pago": ("tipo_pago",),
+    "i_periodo": ("tasa_periodo", "i_periodo", "tasa", "i"),
+}
+
+_NOMBRES_ALIAS = {name for names in ALIAS.values() for name in names}
+
+MODO_I = "Calcular tasa (i)"
+MODO_N = "Calcular cuotas (n)"
+
+
+# --- Números con coma o punto decimal, en bloque ---
+def to_float_series(s):
+    """
+    Versión vectorizada del to_float del cargador: '1.234,56' → 1234.56,
+    '1234,56' → 1234.56, '1234.56' → 1234.56; lo que no se puede leer queda NaN.
+    """
+    if pd.api.types.is_numeric_dtype(s):
+        return s.astype(float)
+    txt = s.astype("string").str.strip().str.replace(" ", "", regex=False)
+    miles = (txt.str.count(",") == 1) & (txt.str.count(r"\.") >= 1)
+    txt = txt.where(~miles, txt.str.replace(".", "", regex=False))
+    txt = txt.str.replace(",", ".", regex=False)
+    return pd.to_numeric(txt, errors="coerce").astype(float)
+
+
+# --- Columnas canónicas ---
+def normalize_frame(df_in, adelantado_default=False, keep_columns=False):
+    """
+    Devuelve un DataFrame con pv, n, pmt, i_periodo (float, NaN si falta) y
+    adelantado (bool), tomando la primera columna presente de cada ALIAS.
+    Con keep_columns, las demás columnas de la entrada (id, cliente, …) van
+    adelante tal cual y price_frame las conserva; las que se llaman como una
+    columna de la salida (ok, TEA, modo, …) pasan como 'entrada_<nombre>'.
+    """
+    cols = {str(c).strip(): c for c in df_in.columns}
+    out = pd.DataFrame(index=df_in.index)
+    if keep_columns:
+        for nombre, c in cols.items():
+            if nombre not in _NOMBRES_ALIAS:
+                destino = nombre
+                while destino in TIPOS_SALIDA or (destino != nombre and destino in cols):
+                    destino = "entrada_" + destino
+                out[destino] = df_in[c]
+    for canon, names in ALIAS.items():
+        serie = None
+        for name in names:
+            if name in cols:
+                col = df_in[cols[name]]
+                serie = col if serie is None else serie.where(serie.notna(), col)
+        if canon == "tipo_pago":
+            if serie is None:
+                out["adelantado"] = adelantado_default
+            else:
+                t = serie.astype("string").str.strip().str.lower()
+                out["adelantado"] = t.str.startswith("adel").fillna(adelantado_default).astype(bool)
+        else:
+            out[canon] = np.nan if serie is None else to_float_series(serie)
+    return out
+
+
+# --- Precio de todas las filas ---
+def price_frame(df_norm, tol=1e-12, max_iter=80, workers=None):
+    """
+    Resuelve cada fila según los datos que trae (como el cargador de una fila):
+    pv, pmt y n → tasa i; pv, pmt e i_periodo → cuotas n. Devuelve df_norm
+    (con las columnas extra que traiga) más modo, i, TEA, TNA, n_real, n (redondeado), ultima_cuota, iters y ok.
+    Con workers > 1 reparte el cálculo en procesos (core.paralelo).
+    """
+    solve_rate, solve_n = solve_monthly_rate_batch, solve_periods_batch
+    if workers and workers > 1:
+        from core.paralelo import solve_monthly_rate_parallel, solve_periods_parallel
+        solve_rate = lambda *a, **k: solve_monthly_rate_parallel(*a, workers=workers, **k)
+        solve_n = lambda *a: solve_periods_parallel(*a, workers=workers)
+
+    pv = df_norm["pv"].to_numpy(float)
+    pmt = df_norm["pmt"].to_numpy(float)
+    n = df_norm["n"].to_numpy(float)
+    i_in = df_norm["i_periodo"].to_numpy(float)
+    adel = df_norm["adelantado"].to_numpy(bool)
+
+    base = ~np.isnan(pv) & ~np.isnan(pmt)
+    modo_i = base & ~np.isnan(n)
+    modo_n = base & ~modo_i & ~np.isnan(i_in)
+
+    i = np.full(len(df_norm), np.nan)
+    n_real = np.full(len(df_norm), np.nan)
+    n_red = np.full(len(df_norm), np.nan)
+    ultima = np.full(len(df_norm), np.nan)
+    iters = np.zeros(len(df_norm), dtype=np.int64)
+    ok = np.zeros(len(df_norm), dtype=bool)
+
+    if modo_i.any():
+        ri, it, conv = solve_rate(pv[modo_i], pmt[modo_i], n[modo_i], adel[modo_i],
+                                  tol=tol, max_iter=max_iter)
+        i[modo_i], iters[modo_i], ok[modo_i] = ri, it, conv
+        n_red[modo_i] = np.where(conv, n[modo_i], np.nan)
+    if modo_n.any():
+        nr, nn, ul, fac = solve_n(pv[modo_n], pmt[modo_n], i_in[modo_n], adel[modo_n])
+        i[modo_n] = np.where(fac, i_in[modo_n], np.nan)
+        n_real[modo_n], ultima[modo_n], ok[modo_n] = nr, ul, fac
+        n_red[modo_n] = np.where(fac, nn, np.nan)
+
+    out = df_norm.copy()
+    out["modo"] = np.select([modo_i, modo_n], [MODO_I, MODO_N], default="")
+    out["i"] = i
+    out["TEA"] = annual_effective(i)
+    out["TNA"] = i * 12
+    out["n_real"] = n_real
+    out["n_redondeado"] = n_red
+    out["ultima_cuota"] = ultima
+    out["iters"] = iters
+    out["ok"] = ok
+    return out
+
+
+# --- Resumen del lote (acumulable por bloques) ---
+class LoteResumen:
+    """Acumula conteos y sumas de bloques resueltos; as_dict() da el resumen final."""
+
+    def __init__(self):
+        self.filas = self.resueltas = self.modo_i = self.modo_n = 0
+        self._suma_i = self._suma_tea = 0.0
+        self.tea_min, self.tea_max = float("inf"), float("-inf")
+
+    def add(self, df_res):
+        ok = df_res["ok"].to_numpy(bool)
+        self.filas += len(df_res)
+        self.resueltas += int(ok.sum())
+        self.modo_i += int((df_res["modo"] == MODO_I).sum())
+        self.modo_n += int((df_res["modo"] == MODO_N).sum())
+        self._suma_i += float(df_res["i"].to_numpy()[ok].sum())
+        tea = df_res["TEA"].to_numpy()[ok]
+        self._suma_tea += float(tea.sum())
+        if tea.size:
+            self.tea_min = min(self.tea_min, float(tea.min()))
+            self.tea_max = max(self.tea_max, float(tea.max()))
+        return self
+
+    def as_dict(self):
+        media = (lambda x: x / self.resueltas) if self.resueltas else (lambda x: float("nan"))
+        return {
+            "filas": self.filas,
+            "resueltas": self.resueltas,
+            "con_error": self.filas - self.resueltas,
+            "modo_i": self.modo_i,
+            "modo_n": self.modo_n,
+            "tasa_mensual_media": media(self._suma_i),
+            "TEA_media": media(self._suma_tea),
+            "TEA_min": self.tea_min if self.resueltas else float("nan"),
+            "TEA_max": self.tea_max if self.resueltas else float("nan"),
+        }
+
+
+def summarize(df_res):
+    """Conteos y estadísticas básicas del lote resuelto (dict para mostrar)."""
+    return LoteResumen().add(df_res).as_dict()
+
+
+# --- Lectura por bloques ---
+def sniff_csv(sample):
+    """
+    Detecta (separador, decimal) a partir de una muestra de texto del CSV.
+    Decimal ',' solo si el separador no es ',' y la muestra tiene números '12,5'.
+    """
+    try:
+        sep = csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+    except csv.Error:
+        sep = ","
+    decimal = "," if sep != "," and re.search(r"\d,\d", sample) else "."
+    return sep, decimal
+
+
+class _Prefixed(io.RawIOBase):
+    """Flujo binario que entrega primero `prefix` y luego el resto de `fh`."""
+
+    def __init__(self, prefix, fh):
+        self._prefix = memoryview(prefix)
+        self._fh = fh
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if self._prefix:
+            k = min(len(b), len(self._prefix))
+            b[:k] = self._prefix[:k]
+            self._prefix = self._prefix[k:]
+            return k
+        data = self._fh.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+
+def read_csv_chunks(fh, chunksize=100_000, sample_size=1 << 16, **kwargs):
+    """
+    Lee un CSV (archivo binario o de texto) en bloques de chunksize filas.
+    Separador y decimal se detectan una sola vez de los primeros sample_size bytes.
+    """
+    head = fh.read(sample_size)
+    if fh.seekable():
+        fh.seek(0)
+    else:
+        # stdin / tuberías: se vuelve a anteponer la muestra ya leída
+        fh = io.BufferedReader(_Prefixed(head, fh))
+    if isinstance(head, bytes):
+        head = head.decode("utf-8", errors="replace")
+    sample = head[: head.rfind("\n") + 1] or head      # solo líneas completas
+    sep, decimal = sniff_csv(sample)
+    return pd.read_csv(fh, sep=sep, decimal=decimal, chunksize=chunksize, **kwargs)
+
+
+def read_excel_chunks(fh, chunksize=100_000):
+    """Lee la primera hoja de un .xlsx en bloques (openpyxl en modo solo lectura)."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(fh, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else "" for h in next(rows, ())]
+        bloque = []
+        for row in rows:
+            bloque.append(row)
+            if len(bloque) == chunksize:
+                yield pd.DataFrame(bloque, columns=header)
+                bloque = []
+        if bloque:
+            yield pd.DataFrame(bloque, columns=header)
+    finally:
+        wb.close()
+
+
+# --- Formatos columnares (pyarrow es opcional: solo para Parquet/Arrow) ---
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Para Parquet/Arrow hace falta pyarrow (pip install pyarrow)") from None
+    return pa, pq
+
+
+def _seekable(fh):
+    """Parquet y Arrow necesitan acceso aleatorio: desde stdin/tuberías se lee entero."""
+    return fh if fh.seekable() else io.BytesIO(fh.read())
+
+
+def read_parquet_chunks(fh, chunksize=100_000):
+    """Lee un Parquet en bloques de hasta chunksize filas (por row groups)."""
+    _, pq = _pyarrow()
+    for batch in pq.ParquetFile(_seekable(fh)).iter_batches(batch_size=chunksize):
+        yield batch.to_pandas()
+
+
+def read_arrow_chunks(src, chunksize=100_000):
+    """
+    Lee un archivo Arrow IPC (Feather v2) en bloques. src puede ser una ruta:
+    se abre con memory_map y los lotes se leen sin copiar el archivo.
+    """
+    pa, _ = _pyarrow()
+    src = pa.memory_map(src) if isinstance(src, str) else _seekable(src)
+    reader = pa.ipc.open_file(src)
+    for k in range(reader.num_record_batches):
+        batch = reader.get_batch(k)
+        for ini in range(0, batch.num_rows, chunksize):
+            yield batch.slice(ini, chunksize).to_pandas()
+
+
+# Formato según la extensión del archivo
+EXTENSIONES = {
+    ".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl",
+    ".parquet": "parquet", ".pq": "parquet",
+    ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow",
+    ".xlsx": "excel",
+}
+
+# Excel 97-2003: openpyxl solo lee .xlsx
+NO_SOPORTADAS = {".xls": "Los .xls (Excel 97-2003) no se pueden leer: guardarlo como .xlsx o CSV"}
+
+
+def file_format(name, default="excel"):
+    """Formato de un archivo según su extensión (EXTENSIONES); ValueError si no se puede leer."""
+    for ext, motivo in NO_SOPORTADAS.items():
+        if name.lower().endswith(ext):
+            raise ValueError(motivo)
+    for ext, fmt in EXTENSIONES.items():
+        if name.lower().endswith(ext):
+            return fmt
+    return default
+
+
+def iter_chunks(fh, fmt, chunksize=100_000):
+    """Bloques (DataFrame) de un archivo en formato csv, jsonl, parquet, arrow o excel."""
+    if fmt == "csv":
+        return read_csv_chunks(fh, chunksize=chunksize)
+    if fmt == "jsonl":
+        return pd.read_json(fh, lines=True, chunksize=chunksize)
+    if fmt == "parquet":
+        return read_parquet_chunks(fh, chunksize=chunksize)
+    if fmt == "arrow":
+        return read_arrow_chunks(fh, chunksize=chunksize)
+    return read_excel_chunks(fh, chunksize=chunksize)
+
+
+def iter_file_chunks(fh, name, chunksize=100_000):
+    """Bloques de un CSV, Parquet, Arrow o Excel según la extensión de name."""
+    return iter_chunks(fh, file_format(name), chunksize=chunksize)
+
+
+# --- Escritura por bloques ---
+# Tipos Arrow de las columnas que escribe price_frame (Parquet/Arrow). Las
+# columnas que vienen de la entrada se infieren bloque a bloque (una toda
+# vacía en un bloque, enteros en uno y texto en otro), así que van como texto.
+TIPOS_SALIDA = {
+    "pv": "double", "n": "double", "pmt": "double", "i_periodo": "double",
+    "adelantado": "bool", "modo": "string", "i": "double", "TEA": "double",
+    "TNA": "double", "n_real": "double", "n_redondeado": "double",
+    "ultima_cuota": "double", "iters": "int64", "ok": "bool",
+}
+
+
+class BlockWriter:
+    """
+    Escribe bloques resueltos en un archivo binario como CSV, JSON Lines,
+    Parquet o Arrow IPC (sin compresión, para poder mapearlo en memoria).
+    En Parquet/Arrow el esquema sale de TIPOS_SALIDA; las demás columnas
+    se escriben como large_string (nulos conservados).
+    close() termina el archivo (pie de Parquet/Arrow) sin cerrar fh.
+    """
+
+    def __init__(self, fh, fmt="csv"):
+        self.fh = fh
+        self.fmt = fmt
+        self._writer = None
+        self._schema = None
+        self._primero = True
+
+    def write(self, df):
+        if self.fmt == "csv":
+            self.fh.write(df.to_csv(index=False, header=self._primero).encode("utf-8"))
+        elif self.fmt == "jsonl":
+            # 15 decimales (el máximo de pandas; por defecto son 10 y se pierden tasas)
+            txt = df.to_json(orient="records", lines=True, double_precision=15)
+            if txt and not txt.endswith("\n"):     # según la versión de pandas
+                txt += "\n"
+            self.fh.write(txt.encode("utf-8"))
+        else:
+            pa, pq = _pyarrow()
+            if self._writer is None:
+                self._schema = pa.schema([
+                    (str(c), pa.type_for_alias(TIPOS_SALIDA[c]) if c in TIPOS_SALIDA else pa.large_string())
+                    for c in df.columns])
+                self._writer = (pq.ParquetWriter(self.fh, self._schema) if self.fmt == "parquet"
+                                else pa.ipc.new_file(self.fh, self._schema))
+            self._writer.write_table(self._table(pa, df))
+        self._primero = False
+
+    def _table(self, pa, df):
+        """Bloque como tabla Arrow con el esquema fijo (el del primer bloque)."""
+        columnas = []
+        for campo in self._schema:
+            serie = df[campo.name]
+            if campo.name not in TIPOS_SALIDA:
+                serie = serie.astype("string")
+            columnas.append(pa.array(serie, type=campo.type, from_pandas=True))
+        return pa.Table.from_arrays(columnas, schema=self._schema)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+# --- Lote por bloques: leer, resolver y escribir sin cargar todo ---
+def price_file(fh, name, out, chunksize=100_000, adelantado_default=False,
+               tol=1e-12, max_iter=80, preview_rows=200, fmt="csv", keep_columns=True):
+    """
+    Resuelve un CSV/Parquet/Arrow/Excel bloque a bloque y escribe el resultado
+    en out (archivo binario) en el formato fmt (ver BlockWriter). La memoria
+    queda acotada por chunksize. Con keep_columns (por defecto) el resultado
+    conserva las columnas de la entrada que no son datos del plan (id, …).
+    Devuelve (resumen, preview) con las primeras preview_rows filas.
+    """
+    resumen = LoteResumen()
+    preview = None
+    writer = BlockWriter(out, fmt)
+    try:
+        for chunk in iter_file_chunks(fh, name, chunksize=chunksize):
+            df_norm = normalize_frame(chunk, adelantado_default, keep_columns)
+            res = price_frame(df_norm, tol=tol, max_iter=max_iter)
+            writer.write(res)
+            resumen.add(res)
+            if preview is None:
+                preview = res.head(preview_rows)
+    finally:
+        writer.close()
+    return resumen.as_dict(), preview
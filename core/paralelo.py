@@ -0,0 +1,166 @@
+# --- Ejecución en paralelo (varios procesos) para carteras grandes ---
+# core/paralelo.py
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from core.finanzas import solve_monthly_rate_batch, solve_periods_batch
+
+
+# Por debajo de este tamaño no conviene repartir: se resuelve en el proceso actual
+MIN_PARALELO = 200_000
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+
+def workers_default():
+    """Procesos a usar: los núcleos disponibles para este proceso."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def get_pool(workers=None):
+    """
+    Pool de procesos compartido (se crea al primer uso y se reutiliza mientras
+    se pida la misma cantidad de procesos; si cambia, se arma uno nuevo y el
+    anterior termina lo que tiene pendiente).
+    Usa 'spawn': Streamlit atiende sesiones en hilos y fork con hilos no es seguro.
+    """
+    global _pool, _pool_workers
+    workers = workers or workers_default()
+    with _pool_lock:
+        if _pool is not None and _pool_workers != workers:
+            _pool.shutdown(wait=False)
+            _pool = None
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers,
+                                        mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool():
+    """Cierra el pool compartido (p. ej. al terminar un proceso batch)."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = _pool_workers = None
+
+
+def parallel_chunksize(chunksize, workers=None):
+    """
+    Filas por bloque para leer un archivo con `workers` procesos: price_frame
+    reparte cada bloque, así que tiene que llegar a MIN_PARALELO por proceso
+    (si no, todo se resuelve en el proceso actual).
+    """
+    workers = workers or 1
+    return chunksize if workers <= 1 else max(chunksize, MIN_PARALELO * workers)
+
+
+# --- Arrays en memoria compartida ---
+def _attach(name):
+    """
+    Abre un bloque de memoria compartida creado por el proceso principal.
+    Los hijos comparten el resource_tracker del padre: quien hace unlink es el padre.
+    """
+    return shared_memory.SharedMemory(name=name)
+
+
+# Qué resolver en cada fragmento: función, entradas y salidas (nombre, dtype)
+_TAREAS = {
+    "rate": (
+        solve_monthly_rate_batch,
+        ("pv", "pmt", "n", "adelantado"),
+        (("i", np.float64), ("iters", np.int64), ("convergio", np.bool_)),
+    ),
+    "periods": (
+        solve_periods_batch,
+        ("pv", "pmt", "i", "adelantado"),
+        (("n_real", np.float64), ("n", np.int64), ("ultima_cuota", np.float64), ("factible", np.bool_)),
+    ),
+}
+
+
+def _worker(tarea, specs_in, specs_out, inicio, fin, kwargs):
+    """Resuelve las filas [inicio, fin) leyendo y escribiendo en memoria compartida."""
+    func = _TAREAS[tarea][0]
+    specs = specs_in + specs_out
+    shms = [_attach(name) for name, _, _ in specs]
+    try:
+        arrays = [np.ndarray(shape, dtype, buffer=shm.buf) for shm, (_, shape, dtype) in zip(shms, specs)]
+        res = func(*(a[inicio:fin] for a in arrays[:len(specs_in)]), **kwargs)
+        for out, r in zip(arrays[len(specs_in):], res):
+            out[inicio:fin] = r
+        arrays = res = None          # sueltan los buffers antes de cerrar
+    finally:
+        for shm in shms:
+            shm.close()
+    return fin - inicio
+
+
+def run_sharded(tarea, inputs, workers=None, shard_size=None, **kwargs):
+    """
+    Reparte `tarea` ('rate' o 'periods') en fragmentos contiguos sobre un pool
+    de procesos. Entradas y salidas viven en memoria compartida (sin serializar
+    arrays); cada fragmento escribe su rango, así el orden se conserva.
+    Devuelve las salidas de la función batch correspondiente.
+    """
+    func, nombres_in, salidas = _TAREAS[tarea]
+    arrays = np.broadcast_arrays(*(np.asarray(inputs[k]) for k in nombres_in))
+    size = arrays[0].size
+    workers = workers or workers_default()
+    if workers <= 1 or size < MIN_PARALELO:
+        return func(*arrays, **kwargs)
+
+    shape = arrays[0].shape
+    shms, specs_in, specs_out, outs = [], [], [], []
+    try:
+        for a in arrays:
+            a = np.ascontiguousarray(a)
+            shm = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+            shms.append(shm)
+            np.ndarray(a.shape, a.dtype, buffer=shm.buf)[...] = a
+            specs_in.append((shm.name, (size,), a.dtype))
+        for _, dtype in salidas:
+            shm = shared_memory.SharedMemory(create=True, size=max(size * np.dtype(dtype).itemsize, 1))
+            shms.append(shm)
+            specs_out.append((shm.name, (size,), dtype))
+
+        shard_size = shard_size or -(-size // (workers * 4))   # ~4 fragmentos por proceso
+        pool = get_pool(workers)
+        futuros = [pool.submit(_worker, tarea, specs_in, specs_out, s, min(s + shard_size, size), kwargs)
+                   for s in range(0, size, shard_size)]
+        for f in futuros:
+            f.result()
+        for name, shape_, dtype in specs_out:
+            shm = shms[len(specs_in) + len(outs)]
+            outs.append(np.ndarray(shape_, dtype, buffer=shm.buf).copy().reshape(shape))
+    finally:
+        for shm in shms:
+            shm.close()
+            shm.unlink()
+    return tuple(outs)
+
+
+# --- Atajos con la misma firma que las funciones batch ---
+def solve_monthly_rate_parallel(pv, pmt, n, adelantado=False, tol=1e-12, max_iter=80,
+                                workers=None, shard_size=None):
+    """solve_monthly_rate_batch repartido en varios procesos: (i, iters, convergio)."""
+    return run_sharded("rate", {"pv": pv, "pmt": pmt, "n": n, "adelantado": adelantado},
+                       workers=workers, shard_size=shard_size, tol=tol, max_iter=max_iter)
+
+
+def solve_periods_parallel(pv, pmt, i, adelantado=False, workers=None, shard_size=None):
+    """solve_periods_batch repartido en varios procesos: (n_real, n, ultima_cuota, factible)."""
+    return run_sharded("periods", {"pv": pv, "pmt": pmt, "i": i, "adelantado": adelantado},
+                       workers=workers, shard_size=shard_size)
@@ -0,0 +1,134 @@
+# --- Resultado derivado: cronograma, fechas y resumen de un cálculo ---
+# core/resultado.py
+# Se arma una vez por cálculo (y por ajuste de última cuota, periodicidad,
+# fecha inicial y calendario); los reruns de la app solo leen de acá.
+
+import numpy as np
+import pandas as pd
+
+from core.cache import TTLCache
+from core.calendario import day_counts, payment_dates, xirr_flows
+from core.finanzas import annual_effective, cashflow_table
+from core.lote import MODO_I, MODO_N
+from core.xirr import xirr
+
+
+class ResultadoDerivado:
+    """
+    Todo lo que se muestra o exporta de un resultado: tasas, cronograma
+    (cuota, factor y VP por período, con la última cuota ya ajustada si
+    corresponde), fechas de pago (core.calendario: regla de fin de mes y
+    ajuste a día hábil), días desde la fecha inicial, totales y el resumen.
+    El flujo se guarda como arrays; flujo() arma el DataFrame una sola vez.
+    """
+
+    def __init__(self, r, periodicidad, fecha_inicial, ajustar_ultima=True,
+                 regla="acumulada", ajuste="ninguno"):
+        self.modo = r.get("modo", MODO_I)
+        self.pv, self.n, self.pmt = float(r["pv"]), int(r["n"]), float(r["pmt"])
+        self.adelantado, self.i = bool(r["adelantado"]), float(r["i"])
+        self.n_real = float(r.get("n_real", self.n))
+        self.periodicidad, self.fecha_inicial = periodicidad, fecha_inicial
+        self.regla, self.ajuste = regla, ajuste
+
+        # Tasas (fracción); TNA: nominal anual con capitalización mensual
+        self.tea = float(annual_effective(self.i))
+        self.tna = self.i * 12
+
+        # Cronograma; en modo n la última cuota se ajusta para la equivalencia exacta
+        df, _ = cashflow_table(self.pmt, self.n, self.adelantado, self.i)
+        self.cuota = np.array(df["cuota"], dtype=float)
+        self.factor = np.array(df["factor_descuento"], dtype=float)
+        self.vp = np.array(df["vp_cuota"], dtype=float)
+        self.ultima_cuota = None
+        if self.modo == MODO_N and ajustar_ultima and self.n >= 1:
+            self.ultima_cuota = float(r["ultima_cuota"])
+            self.cuota[-1] = self.ultima_cuota
+            self.vp[-1] = self.ultima_cuota * self.factor[-1]
+        self.fechas = payment_dates(fecha_inicial, self.n, self.adelantado, periodicidad, regla, ajuste)
+        self.inicio = np.datetime64(pd.Timestamp(fecha_inicial).date(), "D")
+        self.dias = day_counts(self.fechas, self.inicio)
+
+        self.total_vp = float(self.vp.sum())
+        self.diferencia = self.total_vp - self.pv
+        self.tipo_pago = "Adelantado (inicio de período)" if self.adelantado else "Vencido (fin de período)"
+        self.resumen = self._resumen(r)
+        self.iteraciones = None
+        if self.modo == MODO_I and r.get("trace"):
+            self.iteraciones = pd.DataFrame(r["trace"])
+            self.iteraciones["i_%"] = self.iteraciones["i"] * 100
+        self._flujo = None
+        self._tea_fechas = None
+
+    def tea_fechas(self):
+        """
+        TEA por las fechas reales de pago (XIRR act/365: contado en la fecha
+        inicial, cuotas en sus fechas); NaN si no hay solución.
+        """
+        if self._tea_fechas is None:
+            montos, fechas = xirr_flows(self.pv, self.cuota[None, :], self.inicio, self.fechas[None, :])
+            self._tea_fechas = xirr(montos[0], fechas[0])
+        return self._tea_fechas
+
+    def flujo(self):
+        """Cronograma como DataFrame: periodo, fecha_pago, cuota, factor_descuento, vp_cuota."""
+        if self._flujo is None:
+            self._flujo = pd.DataFrame({
+                "periodo": np.arange(1, self.n + 1),
+                "fecha_pago": pd.DatetimeIndex(self.fechas).date,
+                "cuota": self.cuota,
+                "factor_descuento": self.factor,
+                "vp_cuota": self.vp,
+            })
+        return self._flujo
+
+    def _resumen(self, r):
+        """Resumen de una fila (CSV/Excel)."""
+        return pd.DataFrame([{
+            "fecha_inicial": self.fecha_inicial,
+            "precio_contado": self.pv,
+            "CANT C": self.n,
+            "monto_cuota": self.pmt,
+            "tipo_pago": self.tipo_pago,
+            "periodicidad": self.periodicidad,
+            "regla_fin_de_mes": self.regla,
+            "ajuste_dia_habil": self.ajuste,
+            "tasa mensual (fracción)": round(self.i, 6),
+            "TEA (fracción)":          round(self.tea, 6),
+            "tasa mensual (%)":        round(self.i * 100, 3),      # número 0-100
+            "TEA (%)":                 round(self.tea * 100, 2),    # número 0-100
+            "TNA (fracción)":          round(self.tna, 6),
+            "TNA (%)":                 round(self.tna * 100, 2),
+            "PV de cuotas (VP)":       round(self.total_vp, 2),
+            "Diferencia (VP - contado)": round(self.diferencia, 2),
+            "ultima_cuota_ajustada":  round(self.ultima_cuota, 2) if self.ultima_cuota is not None else None,
+            "modo": self.modo,
+            "n (real)": round(self.n_real, 3),
+            "n (redondeado)": self.n,
+            "tolerancia": r.get("tol", None),
+            "max_iter":   r.get("max_iter", None),
+        }])
+
+
+# --- Memoizado por cálculo ---
+derived_cache = TTLCache(maxsize=256, ttl=3600.0)
+
+
+def derive_result(r, periodicidad, fecha_inicial, ajustar_ultima=True,
+                  regla="acumulada", ajuste="ninguno"):
+    """
+    ResultadoDerivado de r, memoizado por los datos del cálculo más
+    periodicidad, fecha inicial, ajuste de última cuota y calendario (regla de
+    fin de mes y día hábil). Es compartido: no modificar sus arrays ni el
+    DataFrame de flujo().
+    """
+    key = (
+        r.get("modo"), float(r["pv"]), int(r["n"]), float(r["pmt"]), bool(r["adelantado"]),
+        float(r["i"]), r.get("n_real"), r.get("ultima_cuota"), r.get("tol"), r.get("max_iter"),
+        periodicidad, str(fecha_inicial), bool(ajustar_ultima), regla, ajuste,
+    )
+    res = derived_cache.get(key)
+    if res is None:
+        res = ResultadoDerivado(r, periodicidad, fecha_inicial, ajustar_ultima, regla, ajuste)
+        derived_cache.put(key, res)
+    return res
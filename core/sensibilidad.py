@@ -0,0 +1,47 @@
+# --- Sensibilidad: tasa sobre una grilla de cuota × cantidad de cuotas ---
+# core/sensibilidad.py
+
+import numpy as np
+import pandas as pd
+
+from core.finanzas import annual_effective, solve_monthly_rate_batch
+
+
+# Tope por eje: 500 × 500 = 250.000 celdas se resuelven en ~0,1 s
+MAX_PUNTOS = 500
+
+
+def pmt_values(desde, hasta, pasos):
+    """pasos montos de cuota equiespaciados entre desde y hasta (inclusive)."""
+    pasos = int(min(max(pasos, 1), MAX_PUNTOS))
+    return np.linspace(float(desde), float(hasta), pasos)
+
+
+def n_values(desde, hasta, paso=1):
+    """Cantidades de cuotas desde, desde+paso, … hasta (enteros >= 1, a lo sumo MAX_PUNTOS)."""
+    desde, hasta, paso = max(int(desde), 1), max(int(hasta), 1), max(int(paso), 1)
+    valores = np.arange(desde, max(desde, hasta) + 1, paso)
+    if valores.size > MAX_PUNTOS:
+        valores = np.unique(np.linspace(desde, hasta, MAX_PUNTOS).round().astype(np.int64))
+    return valores
+
+
+def sensitivity_grid(pv, pmts, ns, adelantado=False, tol=1e-12, max_iter=80):
+    """
+    Tasa mensual y TEA para cada combinación (n, cuota), en una sola llamada
+    vectorizada. Devuelve (i, tea) con forma (len(ns), len(pmts)); las celdas
+    sin tasa >= 0 (p. ej. pmt·n < pv) quedan en NaN.
+    """
+    pmts = np.asarray(pmts, dtype=float)
+    ns = np.asarray(ns, dtype=float)
+    i, _, convergio = solve_monthly_rate_batch(pv, pmts[None, :], ns[:, None], adelantado,
+                                               tol=tol, max_iter=max_iter)
+    i = np.where(convergio, i, np.nan)
+    return i, annual_effective(i)
+
+
+def grid_to_frame(pmts, ns, valores):
+    """Grilla como tabla: una fila por cantidad de cuotas (CANT C), una columna por monto de cuota."""
+    df = pd.DataFrame(valores, index=pd.Index(ns, name="CANT C"),
+                      columns=[f"{p:.2f}" for p in pmts])
+    return df.reset_index()
@@ -0,0 +1,114 @@
+# --- TIR con fechas (tipo XIRR) ---
+# core/xirr.py
+
+import numpy as np
+
+
+CONVENCIONES = ("act/365", "30/360")
+
+
+# --- Fracciones de año entre fechas ---
+def year_fractions(fechas, base=None, convencion="act/365"):
+    """
+    Fracción de año de cada fecha respecto de base (por defecto, la primera
+    fecha de cada fila). Acepta arrays 1-D (un plan) o 2-D (planes × flujos);
+    las fechas NaT (relleno) devuelven 0.
+    Convenciones: 'act/365' (días reales / 365) y '30/360' (europea, 30E/360).
+    """
+    if convencion not in CONVENCIONES:
+        raise ValueError(f"Convención desconocida: {convencion!r} (usar {CONVENCIONES})")
+    d = np.asarray(fechas, dtype="datetime64[D]")
+    if base is None:
+        d0 = d[..., :1]
+    else:
+        d0 = np.asarray(base, dtype="datetime64[D]")
+        if d.ndim == 2 and d0.ndim == 1:
+            d0 = d0[:, None]
+
+    if convencion == "act/365":
+        t = (d - d0).astype("timedelta64[D]").astype(float) / 365.0
+    else:
+        y1, m1, dd1 = _ymd(d0)
+        y2, m2, dd2 = _ymd(d)
+        dias = 360 * (y2 - y1) + 30 * (m2 - m1) + (np.minimum(dd2, 30) - np.minimum(dd1, 30))
+        t = dias / 360.0
+    return np.where(np.isnat(d), 0.0, t)
+
+def _ymd(d):
+    """Año, mes (1-12) y día (1-31) de un array datetime64[D], vectorizado."""
+    meses = d.astype("datetime64[M]")
+    y = meses.astype("datetime64[Y]").astype(np.int64) + 1970
+    m = meses.astype(np.int64) % 12 + 1
+    dd = (d - meses).astype("timedelta64[D]").astype(np.int64) + 1
+    return y, m, dd
+
+
+# --- VAN y su derivada en una pasada ---
+def xnpv(tasa, montos, t):
+    """
+    VAN de flujos en tiempos t (años) a la tasa anual efectiva `tasa`, y su
+    derivada respecto de la tasa. Sobre la última dimensión; devuelve (van, dvan).
+    """
+    tasa = np.asarray(tasa, dtype=float)
+    montos = np.asarray(montos, dtype=float)
+    ln1p = np.log1p(tasa)[..., None] if montos.ndim > tasa.ndim else np.log1p(tasa)
+    desc = montos * np.exp(-t * ln1p)            # c · (1+r)^-t
+    van = desc.sum(axis=-1)
+    dvan = -(t * desc).sum(axis=-1) / (1 + tasa)
+    return van, dvan
+
+
+# --- XIRR de un plan ---
+def xirr(montos, fechas, convencion="act/365", guess=0.1, tol=1e-12, max_iter=50):
+    """
+    Tasa anual efectiva que anula el VAN de flujos fechados (como XIRR de Excel).
+    montos y fechas son arrays 1-D del mismo largo; los signos deben alternar
+    (p. ej. -contado hoy y +cuotas, o un anticipo más cuotas). NaN si no converge.
+    """
+    r, _, _ = xirr_batch(np.atleast_2d(montos), np.atleast_2d(fechas),
+                         convencion=convencion, guess=guess, tol=tol, max_iter=max_iter)
+    return float(r[0])
+
+
+# --- XIRR para muchos planes a la vez ---
+def xirr_batch(montos, fechas, convencion="act/365", guess=0.1, tol=1e-12, max_iter=50):
+    """
+    XIRR vectorizado sobre planes × flujos (arrays 2-D). Los planes más cortos
+    se rellenan con monto 0 / fecha NaT. Newton sobre todos los planes a la vez,
+    con el paso recortado para no cruzar r = -1.
+    Devuelve (tasa, iters, convergio) por plan.
+    """
+    montos = np.nan_to_num(np.asarray(montos, dtype=float))
+    t = year_fractions(fechas, convencion=convencion)
+    m = montos.shape[0]
+
+    r = np.full(m, float(guess))
+    iters = np.full(m, max_iter, dtype=np.int64)
+    convergio = np.zeros(m, dtype=bool)
+    # Sin flujos de ambos signos no hay tasa que anule el VAN
+    valido = (montos > 0).any(axis=1) & (montos < 0).any(axis=1)
+    r[~valido] = np.nan
+    iters[~valido] = 0
+
+    act = np.flatnonzero(valido)
+    ra, ca, ta = r[act], montos[act], t[act]
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for k in range(1, max_iter + 1):
+            if act.size == 0:
+                break
+            van, dvan = xnpv(ra, ca, ta)
+            r_new = ra - van / dvan
+            # Si el paso cruza -1 (o no es finito), avanzamos a mitad de camino
+            malo = ~np.isfinite(r_new) | (r_new <= -1)
+            r_new[malo] = ((ra - 1) / 2)[malo]
+            sale = ~malo & (np.abs(r_new - ra) < tol)
+            r[act] = r_new
+            if sale.any():
+                iters[act[sale]] = k
+                convergio[act[sale]] = True
+                sigue = ~sale
+                act, ra, ca, ta = act[sigue], r_new[sigue], ca[sigue], ta[sigue]
+            else:
+                ra = r_new
+    r[act] = np.nan
+    return r, iters, convergio
@@ -1,22 +1,18 @@
 import streamlit as st
 st.set_page_config(page_title="True Rate · Tasas implícitas", page_icon="📈", layout="wide")
 
-from dotenv import load_dotenv
 import os
 from datetime import date
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from io import BytesIO
 import pandas as pd     # para CSV / Excel y DataFrames
-from openai import OpenAI
+import numpy as np
 import json
-from pypdf import PdfReader
+import tempfile
+# reportlab, openpyxl, pypdf, openai, dotenv, altair y plotly se importan
+# recién cuando se usa su función (PDF, Excel, tutor, IA, gráficos)
 
 
 # --- Estado persistente: inicializamos TODO lo que usamos en la app ---
 
-from datetime import date
-
 defaults = {
     "pv": 0.0,
     "n": 1,
@@ -26,11 +22,12 @@ defaults = {
     "i_periodo": 0.0,
     "periodicidad": "Mensual",
     "fecha_inicial": date.today(),
+    "regla_fin_de_mes": "acumulada",
+    "ajuste_habil": "ninguno",
     "resultado": None,
     "explicacion": None,
     "kb_text": None,
     "kb_name": None,
-    "escenarios": {},
     "escenario_nombre": "",
     "escenario_sel": "",
 }
@@ -82,7 +79,7 @@ st.markdown(
             </h1>
         </div>
         <h3 style="color: #ccc; font-weight: 400; margin-top: 10px;">
-            Prestación vs. Contraprestación · Pago vencido · Semilla tipo Baily
+            Prestación vs. Contraprestación · Pago vencido · Semilla de la grilla de log(tasa) · Pasos de Halley
         </h3>
         <p style="font-size: 18px; color: #aaa; margin-top: -5px; margin-bottom: 70px;">
             Calculá la tasa real y el número de cuotas en tus operaciones financieras
@@ -95,39 +92,95 @@ st.markdown(
 
 #!------------------------------------------------------------------------------
 
-# carga .env en variables de entorno
-load_dotenv()
+from core.ai import explicar_con_ia, get_client
 
-# 1) Primero intento con .env (local), luego pruebo st.secrets (Cloud).
-api_key = os.getenv("OPENAI_API_KEY")
-try:
-    # En Streamlit Cloud esto existe; en local puede lanzar excepción.
-    api_key = st.secrets["OPENAI_API_KEY"] if "OPENAI_API_KEY" in st.secrets else api_key
-except Exception:
-    # Si no hay secrets.toml, seguimos con lo de .env
-    pass
 
-from core.ai import explicar_con_ia
+# --- OpenAI client (solo si hay API key; se arma al primer uso de la IA) ---
+def ai_client():
+    """Cliente OpenAI o None. Se llama recién al pedir una respuesta a la IA."""
+    from dotenv import load_dotenv
 
+    # carga .env en variables de entorno
+    load_dotenv()
 
-# --- OpenAI client (solo si hay API key) ---
-client = OpenAI(api_key=api_key) if api_key else None
+    # 1) Primero intento con .env (local), luego pruebo st.secrets (Cloud).
+    api_key = os.getenv("OPENAI_API_KEY")
+    try:
+        # En Streamlit Cloud esto existe; en local puede lanzar excepción.
+        api_key = st.secrets["OPENAI_API_KEY"] if "OPENAI_API_KEY" in st.secrets else api_key
+    except Exception:
+        # Si no hay secrets.toml, seguimos con lo de .env
+        pass
+    return get_client(api_key)
 # --- fin OpenAI client ---
-# st.write("API key cargada:", "sí" if api_key else "no")
 
 
 from core.finanzas import (
-    present_value_annuity,
-    solve_monthly_rate_trace,
-    annual_effective,
-    cashflow_table,
+    SolverStats,
+    activate_instrumentation,
+    phase,
+    solve_periods,
+)
+from core.cache import cached_solve_monthly_rate_trace, content_hash, rate_cache
+from core.lote import iter_chunks, iter_file_chunks, price_file
+from core.exportes import (
+    cached_export,
+    export_comparacion_excel,
+    export_csv,
+    export_excel,
+    export_lote_excel,
+    export_pdf,
 )
+from core.calendario import AJUSTES_HABIL, REGLAS_FIN_DE_MES
+from core.escenarios import compare_scenarios, open_store
+from core.graficos import cached_flow_chart_data, histogram_frame
+from core.resultado import derive_result
+from core.sensibilidad import MAX_PUNTOS, grid_to_frame, n_values, pmt_values, sensitivity_grid
+
+# --- Métricas del solver (opcional, se activa en Ajustes avanzados) ---
+def sync_instrumentation():
+    """
+    Activa (o desactiva) las métricas de la sesión en el contexto actual. Cada
+    fragmento la llama al empezar: un rerun del fragmento puede correr en un
+    contexto nuevo, sin lo activado por la corrida completa.
+    """
+    if st.session_state.get("medir_solver"):
+        if st.session_state.get("solver_stats") is None:
+            st.session_state.solver_stats = SolverStats()
+        activate_instrumentation(st.session_state.solver_stats)
+    else:
+        activate_instrumentation(None)
+
+
+sync_instrumentation()
+stats_slot = None   # lugar del panel donde se muestran (se llena al final del script)
 
 
 #!------------------------------------------------------------------------------
 
 
 # --- Uploaders en dos columnas (JSON + CSV/Excel) ---
+# Formatos de salida del lote: (formato de core.lote.BlockWriter, tipo MIME)
+SALIDAS_LOTE = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Arrow": ("arrow", "application/vnd.apache.arrow.file"),
+}
+
+# Opciones del calendario de pagos (core.calendario)
+ETIQUETAS_REGLA = {
+    "acumulada": "Desde la cuota anterior (31/01 → 28/02 → 28/03)",
+    "mismo_dia": "Mismo día o último del mes (31/01 → 28/02 → 31/03)",
+    "fin_de_mes": "Fin de mes si empieza a fin de mes (30/04 → 31/05)",
+}
+ETIQUETAS_HABIL = {
+    "ninguno": "Sin ajuste",
+    "siguiente": "Día hábil siguiente",
+    "siguiente_modificado": "Siguiente (sin cambiar de mes)",
+    "anterior": "Día hábil anterior",
+    "anterior_modificado": "Anterior (sin cambiar de mes)",
+}
+
 col1, col2 = st.columns(2)
 
 with col1:
@@ -163,6 +216,8 @@ with col1:
             st.session_state.i_periodo   = float(data.get("i_periodo", 0.0))
             st.session_state.periodicidad = data.get("periodicidad", "Mensual")
             st.session_state.fecha_inicial = date.fromisoformat(data.get("fecha_inicial")) if data.get("fecha_inicial") else date.today()
+            st.session_state.regla_fin_de_mes = data.get("regla_fin_de_mes", "acumulada")
+            st.session_state.ajuste_habil = data.get("ajuste_habil", "ninguno")
 
             st.session_state.resultado   = None
             st.session_state.explicacion = None
@@ -191,79 +246,156 @@ with col2:
                  stroke-linecap="round" stroke-linejoin="round">
                 <path d="M4 4h5l2 2h9a1 1 0 0 1 1 1v11a1 1 0 0 1-1 1H4a1 1 0 0 1-1-1V5a1 1 0 0 1 1-1z"></path>
             </svg>
-            <h4 style="color:#FAFAFA; margin:0;">Cargar CSV / Excel</h4>
+            <h4 style="color:#FAFAFA; margin:0;">Cargar CSV / Excel / Parquet</h4>
         </div>
         """,
         unsafe_allow_html=True
     )
 
-    upl_tabla = st.file_uploader("", type=["csv", "xlsx", "xls"], key="upl_tabla")
+    upl_tabla = st.file_uploader("", type=["csv", "xlsx", "parquet", "arrow", "feather"], key="upl_tabla")
+    modo_lote = st.checkbox(
+        "Modo lote: calcular todas las filas",
+        value=False,
+        key="modo_lote",
+        help="Resuelve cada fila del archivo (tasa o cuotas según sus columnas) y permite descargar el resultado."
+    )
+    if modo_lote:
+        salida_lote = st.selectbox(
+            "Formato del resultado",
+            list(SALIDAS_LOTE),
+            key="salida_lote",
+            help="Parquet y Arrow conservan los tipos y se leen mucho más rápido que CSV "
+                 "(Arrow se puede abrir con memory_map, sin copiar).",
+        )
 
     if upl_tabla is not None:
         try:
-            # Leer archivo
-            if upl_tabla.name.lower().endswith(".csv"):
-                try:
-                    df_in = pd.read_csv(upl_tabla)
-                except Exception:
-                    upl_tabla.seek(0)
-                    df_in = pd.read_csv(upl_tabla, decimal=",")
+            if modo_lote:
+                # --- Lote: se lee, resuelve y escribe por bloques, una vez por archivo ---
+                lote = st.session_state.get("lote")
+                fmt_lote, mime_lote = SALIDAS_LOTE[salida_lote]
+                adel_def = st.session_state.tipo_pago.startswith("Adelantado")
+                # Se recalcula si cambia el archivo, el formato o el tipo de pago por defecto
+                if (not lote or lote["file_id"] != upl_tabla.file_id or lote["fmt"] != fmt_lote
+                        or lote.get("adelantado") != adel_def):
+                    salida = tempfile.SpooledTemporaryFile(max_size=32 << 20)
+                    with st.spinner("Procesando lote…"), phase("lote"):
+                        # keep_columns: el id y demás columnas del archivo van en la descarga
+                        resumen, preview = price_file(upl_tabla, upl_tabla.name, salida,
+                                                      adelantado_default=adel_def, fmt=fmt_lote,
+                                                      keep_columns=True)
+                    lote = {"file_id": upl_tabla.file_id, "fmt": fmt_lote, "adelantado": adel_def,
+                            "salida": salida, "resumen": resumen, "preview": preview}
+                    st.session_state["lote"] = lote
+
+                res = lote["resumen"]
+                if not res["filas"]:
+                    st.error("El archivo no tiene filas.")
+                else:
+                    st.success(f"Lote: {res['resueltas']:,} de {res['filas']:,} filas resueltas "
+                               f"({res['modo_i']:,} tasa · {res['modo_n']:,} cuotas).")
+                    if res["con_error"]:
+                        st.warning(f"{res['con_error']:,} filas sin datos suficientes o sin solución (ok = False).")
+                    if res["resueltas"]:
+                        st.caption(f"Tasa mensual media: {res['tasa_mensual_media'] * 100:.3f}% · "
+                                   f"TEA media: {res['TEA_media'] * 100:.2f}%")
+                        # Distribución de TEA: 50 intervalos, contados por bloques una vez por lote
+                        if lote.get("histograma") is None:
+                            lote["salida"].seek(0)
+                            lote["histograma"] = histogram_frame(
+                                iter_chunks(lote["salida"], lote["fmt"]), "TEA",
+                                res["TEA_min"], res["TEA_max"], bins=50)
+                        import altair as alt
+
+                        st.altair_chart(
+                            alt.Chart(lote["histograma"]).mark_bar(color="#00909a").encode(
+                                x=alt.X("desde:Q", title="TEA", axis=alt.Axis(format="%")),
+                                x2="hasta:Q",
+                                y=alt.Y("filas:Q", title="Filas"),
+                                tooltip=[alt.Tooltip("desde:Q", format=".2%"),
+                                         alt.Tooltip("hasta:Q", format=".2%"), "filas:Q"],
+                            ).properties(height=220),
+                            use_container_width=True,
+                        )
+                    st.dataframe(lote["preview"], use_container_width=True)
+                    lote["salida"].seek(0)
+                    st.download_button(
+                        f"📄 Descargar resultado del lote ({salida_lote})",
+                        data=lote["salida"],
+                        file_name=f"resultado_lote.{fmt_lote}",
+                        mime=mime_lote,
+                    )
+                    # Excel del lote: se arma a pedido, por bloques, desde el resultado ya escrito
+                    if lote.get("excel") is None:
+                        if st.button("⚙️ Preparar Excel del lote", key="lote_excel"):
+                            excel = tempfile.SpooledTemporaryFile(max_size=32 << 20)
+                            with st.spinner("Armando Excel…"), phase("lote_excel"):
+                                export_lote_excel(lote["salida"], excel, fmt=lote["fmt"])
+                            lote["excel"] = excel
+                    if lote.get("excel") is not None:
+                        lote["excel"].seek(0)
+                        st.download_button(
+                            "📊 Descargar resultado del lote (Excel)",
+                            data=lote["excel"],
+                            file_name="resultado_lote.xlsx",
+                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        )
             else:
-                df_in = pd.read_excel(upl_tabla, engine="openpyxl")
+                # Solo se lee la primera fila (separador y decimal detectados de una muestra)
+                df_in = next(iter(iter_file_chunks(upl_tabla, upl_tabla.name, chunksize=1)), None)
+                if df_in is None or df_in.empty:
+                    st.error("El archivo no tiene filas.")
+                else:
+                    row = {str(k).strip(): row for k, row in df_in.iloc[0].to_dict().items()}
 
-            if df_in.empty:
-                st.error("El archivo no tiene filas.")
-            else:
-                row = {str(k).strip(): row for k, row in df_in.iloc[0].to_dict().items()}
-
-                def pick(*names):
-                    for n in names:
-                        if n in row and pd.notna(row[n]):
-                            return row[n]
-                    return None
-
-                pv_in   = pick("precio_contado", "contado", "precio")
-                n_in    = pick("CANT C", "cant_c", "cuotas", "n")
-                pmt_in  = pick("monto_cuota", "cuota", "pmt")
-                tipo_in = pick("tipo_pago")
-                i_per   = pick("tasa_periodo", "i_periodo", "tasa", "i")
-
-                def to_float(x):
-                    if x is None: return None
-                    s = str(x).strip().replace(" ", "")
-                    s = s.replace(".", "").replace(",", ".") if s.count(",") == 1 and s.count(".") >= 1 else s.replace(",", ".")
-                    try:
-                        return float(s)
-                    except Exception:
+                    def pick(*names):
+                        for n in names:
+                            if n in row and pd.notna(row[n]):
+                                return row[n]
                         return None
 
-                pv_f   = to_float(pv_in)
-                n_f    = int(to_float(n_in)) if n_in is not None else None
-                pmt_f  = to_float(pmt_in)
-                i_f    = to_float(i_per)
-
-                if pv_f is not None and pmt_f is not None and n_f is not None:
-                    modo_in = "Calcular tasa (i)"
-                elif pv_f is not None and pmt_f is not None and i_f is not None:
-                    modo_in = "Calcular cuotas (n)"
-                else:
-                    st.error("Faltan columnas: para modo i → precio_contado, CANT C, monto_cuota; "
-                             "para modo n → precio_contado, monto_cuota, tasa_periodo.")
-                    modo_in = None
-
-                if modo_in:
-                    st.session_state.update({
-                        "pv": pv_f if pv_f is not None else 0.0,
-                        "n": n_f if n_f is not None else 1,
-                        "pmt": pmt_f if pmt_f is not None else 0.0,
-                        "tipo_pago": ("Adelantado (inicio de período)" if str(tipo_in).lower().startswith("adel") else "Vencido (fin de período)")
-                                     if tipo_in is not None else st.session_state.tipo_pago,
-                        "modo": modo_in,
-                        "i_periodo": i_f if i_f is not None else st.session_state.i_periodo,
-                        "resultado": None,
-                        "explicacion": None,
-                    })
-                    st.success(f"Archivo cargado en modo: {modo_in}. Revisá y luego tocá «Calcular».")
+                    pv_in   = pick("precio_contado", "contado", "precio")
+                    n_in    = pick("CANT C", "cant_c", "cuotas", "n")
+                    pmt_in  = pick("monto_cuota", "cuota", "pmt")
+                    tipo_in = pick("tipo_pago")
+                    i_per   = pick("tasa_periodo", "i_periodo", "tasa", "i")
+
+                    def to_float(x):
+                        if x is None: return None
+                        s = str(x).strip().replace(" ", "")
+                        s = s.replace(".", "").replace(",", ".") if s.count(",") == 1 and s.count(".") >= 1 else s.replace(",", ".")
+                        try:
+                            return float(s)
+                        except Exception:
+                            return None
+
+                    pv_f   = to_float(pv_in)
+                    n_f    = int(to_float(n_in)) if n_in is not None else None
+                    pmt_f  = to_float(pmt_in)
+                    i_f    = to_float(i_per)
+
+                    if pv_f is not None and pmt_f is not None and n_f is not None:
+                        modo_in = "Calcular tasa (i)"
+                    elif pv_f is not None and pmt_f is not None and i_f is not None:
+                        modo_in = "Calcular cuotas (n)"
+                    else:
+                        st.error("Faltan columnas: para modo i → precio_contado, CANT C, monto_cuota; "
+                                 "para modo n → precio_contado, monto_cuota, tasa_periodo.")
+                        modo_in = None
+
+                    if modo_in:
+                        st.session_state.update({
+                            "pv": pv_f if pv_f is not None else 0.0,
+                            "n": n_f if n_f is not None else 1,
+                            "pmt": pmt_f if pmt_f is not None else 0.0,
+                            "tipo_pago": ("Adelantado (inicio de período)" if str(tipo_in).lower().startswith("adel") else "Vencido (fin de período)")
+                                         if tipo_in is not None else st.session_state.tipo_pago,
+                            "modo": modo_in,
+                            "i_periodo": i_f if i_f is not None else st.session_state.i_periodo,
+                            "resultado": None,
+                            "explicacion": None,
+                        })
+                        st.success(f"Archivo cargado en modo: {modo_in}. Revisá y luego tocá «Calcular».")
         except Exception as e:
             st.error(f"Archivo inválido: {e}")
 # --- fin Uploaders ---
@@ -355,6 +487,29 @@ with cpb:
         key="fecha_inicial",
         value=preset.get("fecha_inicial", st.session_state.fecha_inicial)
     )
+
+# Calendario de pagos: día del mes y corrimiento a día hábil (feriados de core/data/feriados.csv)
+# El de un escenario cargado se pasa una sola vez al estado, antes de crear los selectores
+for k in ("regla_fin_de_mes", "ajuste_habil"):
+    if k in preset:
+        st.session_state[k] = preset.pop(k)
+cpc, cpd = st.columns(2)
+with cpc:
+    st.selectbox(
+        "Fin de mes",
+        REGLAS_FIN_DE_MES,
+        key="regla_fin_de_mes",
+        format_func=ETIQUETAS_REGLA.get,
+        help="Qué día cae la cuota cuando el mes no tiene el día de la fecha inicial."
+    )
+with cpd:
+    st.selectbox(
+        "Día hábil",
+        list(AJUSTES_HABIL),
+        key="ajuste_habil",
+        format_func=ETIQUETAS_HABIL.get,
+        help="Corre las fechas que caen en fin de semana o feriado."
+    )
 # --- fin Inputs principales ---
 
 
@@ -364,7 +519,7 @@ with cpb:
 if st.session_state.modo == "Calcular tasa (i)":
     with st.expander("Ajustes avanzados", expanded=False):
         tol = st.number_input("Tolerancia (convergencia)", value=1e-12, format="%.1e", step=1e-13, key="tol_i")
-        max_iter = st.number_input("Máx. iteraciones (Newton)", min_value=10, value=80, step=10, key="max_iter_i")
+        max_iter = st.number_input("Máx. iteraciones (Halley)", min_value=10, value=80, step=10, key="max_iter_i")
 
         # 👉 Texto explicativo
         st.caption(
@@ -374,6 +529,14 @@ if st.session_state.modo == "Calcular tasa (i)":
             "- *Máx. iteraciones*: número máximo de intentos del algoritmo. "
             "Normalmente no hace falta cambiarlo (80 asegura que siempre se encuentre la tasa)."
         )
+        cs = rate_cache.stats()
+        st.caption(f"Caché de tasas (compartida): {cs['hits']} aciertos · {cs['misses']} cálculos · "
+                   f"{cs['size']}/{cs['maxsize']} entradas")
+
+        st.checkbox("Medir solver (contadores y tiempos)", key="medir_solver",
+                    help="Cuenta evaluaciones de VP y pasos de Halley/bisección, y mide cada fase "
+                         "(semilla, iteración, flujo, descargas). Solo para diagnóstico.")
+        stats_slot = st.empty()
 else:
     tol, max_iter = 1e-12, 80  # valores por defecto cuando no se usan
 
@@ -388,47 +551,51 @@ if st.session_state.modo == "Calcular tasa (i)":
         pmt = float(st.session_state.pmt)
         if pv > 0 and pmt > 0 and n > 0:
             adelantado = st.session_state.tipo_pago.startswith("Adelantado")
-            i, trace = solve_monthly_rate_trace(pv, pmt, n, adelantado=adelantado, tol=tol, max_iter=int(max_iter))
-            st.session_state["resultado"] = {
-                "modo": "Calcular tasa (i)",
-                "pv": pv, 
-                "n": n, 
-                "pmt": pmt,
-                "adelantado": adelantado, 
-                "i": i, 
-                "trace": trace,
-                "tol": float(tol), 
-                "max_iter": int(max_iter),
-            }
-            st.session_state.explicacion = None
+            i, trace = cached_solve_monthly_rate_trace(pv, pmt, n, adelantado=adelantado, tol=tol, max_iter=int(max_iter))
+            if not np.isfinite(i):
+                # Mismo criterio que solve_monthly_rate / el lote: sin tasa >= 0 no hay resultado
+                st.error("No hay una tasa ≥ 0 que iguale las cuotas con el contado: "
+                         + ("la primera cuota (adelantada) ya cubre el contado o las cuotas no alcanzan."
+                            if adelantado else "las cuotas no alcanzan a cubrirlo (cuota × CANT C < contado)."))
+            else:
+                st.session_state["resultado"] = {
+                    "modo": "Calcular tasa (i)",
+                    "pv": pv,
+                    "n": n,
+                    "pmt": pmt,
+                    "adelantado": adelantado,
+                    "i": i,
+                    "trace": trace,
+                    "tol": float(tol),
+                    "max_iter": int(max_iter),
+                }
+                st.session_state.explicacion = None
         else:
             st.error("Ingresá valores positivos (contado, cuotas y valor de cuota).")
 else:
     if st.button("Calcular cuotas (n)"):
-        import math
         pv  = float(st.session_state.pv)
         pmt = float(st.session_state.pmt)
         i   = float(st.session_state.i_periodo)
         adelantado = st.session_state.tipo_pago.startswith("Adelantado")
 
-        # Ajuste para adelantado: traer PV a vencido para usar misma fórmula de n
-        pv_v = pv / (1 + i) if adelantado else pv
-        x = i * pv_v / pmt if pmt > 0 else 0.0
+        # Fórmula cerrada (en adelantado se trae PV a vencido); ver solve_periods
+        n_real, n_red, ultima_cuota, factible = solve_periods(pv, pmt, i, adelantado=adelantado)
 
         if i <= 0 or pmt <= 0 or pv <= 0:
             st.error("Ingresá valores positivos en contado, cuota y tasa.")
-        elif not (0 < x < 1):
+        elif not factible:
             st.error("La cuota no cubre los intereses (i·PV/PMT ≥ 1) o los datos no son viables.")
         else:
-            n_real = -math.log(1 - x) / math.log(1 + i)
-            n_red  = math.ceil(n_real)
             st.session_state["resultado"] = {
                 "modo": "Calcular cuotas (n)",
                 "pv": pv, 
                 "n": n_red, 
+                "n_real": n_real,
                 "pmt": pmt,
                 "adelantado": adelantado, 
                 "i": i, 
+                "ultima_cuota": ultima_cuota,
                 "trace": None,
             }
             st.session_state.explicacion = None
@@ -495,7 +662,16 @@ st.divider()   # ← ÚNICO separador entre entrada/import y resultados
 # 📊 Resultados: Bloque de Resultados y descargas (persisten al hacer clic) ---
 # st.subheader("📊 Resultados y descargas")
 
-if st.session_state.get("resultado"):
+@st.fragment
+def results_section():
+    """
+    Resultados y descargas: los checkboxes (flujo, última cuota, iteraciones)
+    y los botones de descarga solo vuelven a correr este bloque.
+    """
+    sync_instrumentation()
+    if not st.session_state.get("resultado"):
+        return
+
     # --- Subtítulo: Resultados ---
     st.markdown(
         """
@@ -521,75 +697,49 @@ if st.session_state.get("resultado"):
     # --- Desempaquetar resultado ---
     r     = st.session_state.get("resultado", {})
     modo  = r.get("modo", "Calcular tasa (i)")
-    pv, n, pmt = r["pv"], r["n"], r["pmt"]
-    adelantado, i = r["adelantado"], r["i"]
+    cabecera = st.container()   # tasas arriba del checkbox de ajuste (se completa abajo)
+
+    # --- Ajuste opcional de última cuota (solo modo n) ---
+    ajustar_ultima = False
+    if modo == "Calcular cuotas (n)":
+        ajustar_ultima = st.checkbox(
+            "Ajustar última cuota para equivalencia exacta",
+            value=True,
+            help="Ajusta solo la última cuota para que el VP de las cuotas iguale exactamente al contado."
+        )
+
+    # --- Resultado derivado: tasas, flujo (ya ajustado), fechas y resumen ---
+    # Se arma una vez por cálculo + periodicidad + fecha inicial + calendario; los reruns lo leen de la caché
+    res = derive_result(r, st.session_state.periodicidad, st.session_state.fecha_inicial, ajustar_ultima,
+                        st.session_state.regla_fin_de_mes, st.session_state.ajuste_habil)
+    pv, n, pmt = res.pv, res.n, res.pmt
+    L, total_vp, diff = res.ultima_cuota, res.total_vp, res.diferencia
+    df_flujo = res.flujo()
 
     # --- Tasas (fracción y %) ---
-    tasa_mensual_frac = i
-    tasa_anual_frac   = annual_effective(i)
+    tasa_mensual_frac = res.i
+    tasa_anual_frac   = res.tea
     tasa_mensual_pct  = tasa_mensual_frac * 100
     tasa_anual_pct    = tasa_anual_frac * 100
     # TNA: nominal anual con capitalización mensual (referencia local)
-    tna_frac = i * 12
+    tna_frac = res.tna
     tna_pct  = tna_frac * 100
 
     # --- Cabecera de tasas ---
     label_tasa  = "Tasa mensual calculada" if modo == "Calcular tasa (i)" else "Tasa mensual (ingresada)"
     label_anual = "TEA (tasa efectiva anual)" if modo == "Calcular tasa (i)" else "TEA (derivada)"
-    st.success(f"{label_tasa}: {tasa_mensual_pct:.3f}%")
-    st.success(f"{label_anual}: {tasa_anual_pct:.2f}%")
-    st.caption(f"TNA (nominal anual): {tna_pct:.2f}%")
-
-    if modo == "Calcular cuotas (n)":
-        st.info(f"n (real): {r.get('n_real', float(n)):.3f}  →  n (redondeado): {n}")
+    cabecera.success(f"{label_tasa}: {tasa_mensual_pct:.3f}%")
+    cabecera.success(f"{label_anual}: {tasa_anual_pct:.2f}%")
+    cabecera.caption(f"TNA (nominal anual): {tna_pct:.2f}%")
+    tea_fechas = res.tea_fechas()
+    if np.isfinite(tea_fechas):
+        cabecera.caption(f"TEA por fechas reales de pago (XIRR, act/365): {tea_fechas * 100:.2f}%")
 
-    # --- Ajuste opcional de última cuota (solo modo n) ---
-    ajustar_ultima = False
     if modo == "Calcular cuotas (n)":
-        ajustar_ultima = st.checkbox(
-            "Ajustar última cuota para equivalencia exacta",
-            value=True,
-            help="Ajusta solo la última cuota para que el VP de las cuotas iguale exactamente al contado."
-        )
+        cabecera.info(f"n (real): {res.n_real:.3f}  →  n (redondeado): {n}")
 
-    # --- Flujo de pagos y VP (se ajusta ANTES de mostrar) ---
+    # --- Flujo de pagos y VP ---
     ver_flujo = st.checkbox("Mostrar flujo (detalle de cuotas y VP)", value=False)
-    df_flujo, total_vp = cashflow_table(pmt, n, adelantado, i)
-
-    # Ajuste de última cuota (si corresponde)
-    L = None
-    if modo == "Calcular cuotas (n)" and ajustar_ultima and n >= 1:
-        k_last = (n - 1) if adelantado else n
-        factor_last = (1 + i) ** (-k_last)
-        pv_first = present_value_annuity(pmt, i, n - 1, adelantado=adelantado) if n > 1 else 0.0
-        L = (pv - pv_first) / factor_last  # última cuota ajustada
-
-        # Aplicar ajuste en la tabla
-        df_flujo.loc[df_flujo.index[-1], "cuota"]    = L
-        df_flujo.loc[df_flujo.index[-1], "vp_cuota"] = L * factor_last
-        total_vp = float(df_flujo["vp_cuota"].sum())
-
-
-    # --- Fechas de pago según periodicidad (solo etiqueta, no afecta cálculo) ---
-    step_map = {
-        "Mensual": 1, "Bimestral": 2, "Trimestral": 3,
-        "Cuatrimestral": 4, "Semestral": 6, "Anual": 12,
-    }
-    meses_step = step_map.get(st.session_state.periodicidad, 1)
-
-    start_ts = pd.to_datetime(st.session_state.fecha_inicial)
-
-    if adelantado:
-        # Adelantado: 1ª cuota en la fecha inicial
-        fechas = pd.date_range(start=start_ts, periods=n, freq=pd.DateOffset(months=meses_step))
-    else:
-        # Vencido: 1ª cuota un período después de la fecha inicial
-        fechas = pd.date_range(start=start_ts + pd.DateOffset(months=meses_step),
-                            periods=n, freq=pd.DateOffset(months=meses_step))
-
-    # Insertamos la columna como segunda (después de 'periodo')
-    df_flujo.insert(1, "fecha_pago", fechas.date)
-    # --- fin fechas ---
 
 
     # Mostrar flujo (ya ajustado si corresponde)
@@ -605,13 +755,17 @@ if st.session_state.get("resultado"):
 
         st.markdown("### 📈 Visualización del flujo de pagos")
 
-        chart_df = df_flujo.copy()
-        chart_df["acum_vp"] = chart_df["vp_cuota"].cumsum()
+        # Arriba de MAX_PUNTOS_GRAFICO filas: agrupado por año o reducido (LTTB), en caché por resultado
+        chart_df, nivel = cached_flow_chart_data(df_flujo, pv)
+        titulo_cuota = "Cuotas del año" if nivel == "año" else "Valor de cuota"
+        if nivel != "periodo":
+            st.caption(f"{len(df_flujo):,} cuotas → {len(chart_df):,} puntos "
+                       + ("(sumadas por año)." if nivel == "año" else "(reducidas con LTTB)."))
 
         base = alt.Chart(chart_df).encode(x="fecha_pago:T")
 
         barras = base.mark_bar(color="#00909a", opacity=0.6).encode(
-            y=alt.Y("cuota:Q", title="Valor de cuota")
+            y=alt.Y("cuota:Q", title=titulo_cuota)
         )
 
         linea = base.mark_line(color="#FAFAFA", strokeWidth=2).encode(
@@ -630,16 +784,12 @@ if st.session_state.get("resultado"):
           
         
         # --- Gráfico de flujo vs contado con doble eje Y ---
-        import altair as alt
-
         st.markdown("### 📊 Flujo de pagos vs contado")
 
-        chart_df = df_flujo.copy()
-        chart_df["contado"] = pv  # línea de referencia
-
+        # Mismos datos reducidos (contado = línea de referencia)
         barras = alt.Chart(chart_df).mark_bar(color="#00909a", opacity=0.7).encode(
             x=alt.X("fecha_pago:T", title="Fecha de pago"),
-            y=alt.Y("cuota:Q", axis=alt.Axis(title="Monto de cuota")),
+            y=alt.Y("cuota:Q", axis=alt.Axis(title="Cuotas del año" if nivel == "año" else "Monto de cuota")),
             tooltip=["fecha_pago:T", "cuota:Q"]
         )
 
@@ -664,7 +814,6 @@ if st.session_state.get("resultado"):
     colA, colB, colC = st.columns(3)
     colA.metric("PV de cuotas (VP)", f"{total_vp:,.2f}")
     colB.metric("Precio contado",     f"{pv:,.2f}")
-    diff = total_vp - pv
     diff_abs = abs(diff)
     diff_disp = 0.0 if diff_abs < 0.005 else diff  # evita -0.00
 
@@ -677,8 +826,8 @@ if st.session_state.get("resultado"):
 
 
     # --- Strings auxiliares para informe ---
-    tipo_pago_str = "Adelantado (inicio de período)" if adelantado else "Vencido (fin de período)"
-    linea_n       = f"- n (real): {r.get('n_real', float(n)):.3f} · n (redondeado): {n}\n" if modo == "Calcular cuotas (n)" else ""
+    tipo_pago_str = res.tipo_pago
+    linea_n       = f"- n (real): {res.n_real:.3f} · n (redondeado): {n}\n" if modo == "Calcular cuotas (n)" else ""
     linea_ajuste  = f"- Ajuste: última cuota = {L:,.2f}\n" if L is not None else ""
 
     # --- Informe resumen (sin indentación fantasma) ---
@@ -691,6 +840,7 @@ if st.session_state.get("resultado"):
         f"- Fecha inicial: {st.session_state.fecha_inicial.strftime('%d/%m/%Y')}\n"
         f"{linea_n}"
         f"- Periodicidad: {st.session_state.periodicidad}\n"
+        f"- Fechas de pago: {ETIQUETAS_REGLA[res.regla]}; {ETIQUETAS_HABIL[res.ajuste].lower()}\n"
         f"- Tipo de pago: {tipo_pago_str}\n"
         f"{linea_ajuste}\n"
         "➜ La tasa de interés que iguala el valor presente del plan en cuotas\n"
@@ -702,15 +852,11 @@ if st.session_state.get("resultado"):
     st.markdown(informe)
 
     # --- Iteraciones (convergencia) ---
-    df_iter = None
+    df_iter = res.iteraciones
     if modo == "Calcular tasa (i)":
-        ver_iter = st.checkbox("Mostrar iteraciones (Newton/Bisección)", value=False)
-        if "trace" in r and r["trace"]:
-            import pandas as pd
-            df_iter = pd.DataFrame(r["trace"])
-            df_iter["i_%"] = df_iter["i"] * 100
-            if ver_iter:
-                st.dataframe(df_iter)
+        ver_iter = st.checkbox("Mostrar iteraciones (Halley/Bisección)", value=False)
+        if ver_iter and df_iter is not None:
+            st.dataframe(df_iter)
     # --- fin Iteraciones ---
 
         
@@ -720,124 +866,114 @@ if st.session_state.get("resultado"):
         informe_pdf += "\n\n**Explicación (IA)**\n" + st.session_state.explicacion
 
     # --- Resumen (CSV/Excel) ---
-    df_resumen = pd.DataFrame([{
-        "fecha_inicial": st.session_state.fecha_inicial,
-        "precio_contado": pv,
-        "CANT C": int(n),
-        "monto_cuota": pmt,
-        "tipo_pago": tipo_pago_str,
-        "periodicidad": st.session_state.periodicidad,
-        "tasa mensual (fracción)": round(tasa_mensual_frac, 6),
-        "TEA (fracción)":          round(tasa_anual_frac, 6),
-        "tasa mensual (%)":        round(tasa_mensual_pct, 3),  # número 0-100
-        "TEA (%)":                 round(tasa_anual_pct, 2),    # número 0-100
-        "TNA (fracción)":          round(tna_frac, 6),
-        "TNA (%)":                 round(tna_pct, 2),
-        "PV de cuotas (VP)":       round(total_vp, 2),
-        "Diferencia (VP - contado)": round(diff, 2),
-        "ultima_cuota_ajustada":  round(L, 2) if L is not None else None,
-        "modo": modo,
-        "n (real)": round(r.get("n_real", float(n)), 3),
-        "n (redondeado)": int(n),
-        "tolerancia": r.get("tol", None),
-        "max_iter":   r.get("max_iter", None),
-    }])
-
-    # CSV
-    csv_bytes = df_resumen.to_csv(index=False).encode("utf-8")
+    df_resumen = res.resumen
+
+    # --- Descargas: se arman al pedirlas y se cachean por contenido (resultado + explicación) ---
+    # CSV (liviano: siempre disponible; en cada rerun sale de la caché)
+    with phase("export_csv"):
+        csv_bytes = cached_export(export_csv, df_resumen)
     st.download_button("📄 Descargar CSV", data=csv_bytes,
                        file_name="resumen_tasa.csv", mime="text/csv")
 
-    # Excel
-    excel_buffer = BytesIO()
-
-    with pd.ExcelWriter(excel_buffer, engine="openpyxl") as writer:
-        # --- dentro del with ---
-        df_resumen.to_excel(writer, index=False, sheet_name="Resumen")
-        df_flujo.to_excel(writer, index=False, sheet_name="Flujo")
-        if df_iter is not None:
-            df_iter.to_excel(writer, index=False, sheet_name="Iteraciones")
-        if st.session_state.explicacion:
-            pd.DataFrame([{"explicacion": st.session_state.explicacion}]).to_excel(
-                writer, index=False, sheet_name="Explicación IA"
-            )
+    # Excel y PDF: solo si se pidieron para este resultado (el pedido queda atado a su hash;
+    # un resultado nuevo vuelve a mostrar el botón en lugar de armarlos en cada rerun)
+    clave_resultado = content_hash(df_resumen)
+    if st.session_state.get("exportes_listos") != clave_resultado:
+        if st.button("⚙️ Preparar Excel y PDF",
+                     help="Arma el libro Excel y el informe PDF del resultado (se guardan en caché)."):
+            st.session_state.exportes_listos = clave_resultado
+
+    if st.session_state.get("exportes_listos") == clave_resultado:
+        # Excel
+        with phase("export_excel"):
+            excel_bytes = cached_export(export_excel, df_resumen, df_flujo, df_iter,
+                                        st.session_state.explicacion)
+        st.download_button(
+            label="📊 Descargar Excel",
+            data=excel_bytes,
+            file_name="resumen_tasa.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
 
-        # Formatos (Resumen)
-        wb, ws = writer.book, writer.sheets["Resumen"]
-        headers = {cell.value: idx for idx, cell in enumerate(ws[1], start=1)}
-        def fmt_col(sheet, header, numfmt):
-            col = headers.get(header)
-            if col:
-                for r_ in range(2, sheet.max_row + 1):
-                    sheet.cell(row=r_, column=col).number_format = numfmt
-
-        # Formato en hoja 'Flujo'
-        ws_flujo = writer.sheets.get("Flujo")
-        if ws_flujo:
-            headers_f = {cell.value: idx for idx, cell in enumerate(ws_flujo[1], start=1)}
-            def fmt_col_f(sheet, header, numfmt):
-                col = headers_f.get(header)
-                if col:
-                    for r_ in range(2, sheet.max_row + 1):
-                        sheet.cell(row=r_, column=col).number_format = numfmt
-
-            # columnas típicas
-            fmt_col_f(ws_flujo, "fecha_pago", "DD/MM/YYYY")
-            fmt_col_f(ws_flujo, "cuota", "#,##0.00")
-            fmt_col_f(ws_flujo, "vp_cuota", "#,##0.00")
-            fmt_col_f(ws_flujo, "factor_descuento", "0.000000")
-
-
-        # Monedas
-        fmt_col(ws, "precio_contado", "#,##0.00")
-        fmt_col(ws, "monto_cuota", "#,##0.00")
-        fmt_col(ws, "PV de cuotas (VP)", "#,##0.00")
-        fmt_col(ws, "Diferencia (VP - contado)", "#,##0.00")
-        fmt_col(ws, "ultima_cuota_ajustada", "#,##0.00")
-
-        # Fechas (Resumen)
-        fmt_col(ws, "fecha_inicial", "DD/MM/YYYY")
-
-        # Cantidades
-        fmt_col(ws, "n (real)", "0.000")
-        fmt_col(ws, "n (redondeado)", "0")
-
-        # Fracciones (tanto por uno)
-        fmt_col(ws, "tasa mensual (fracción)", "0.000000")
-        fmt_col(ws, "TEA (fracción)",   "0.000000")
-        fmt_col(ws, "TNA (fracción)", "0.000000")
-
-        # Porcentaje como número 0–100 (sin símbolo %)
-        fmt_col(ws, "tasa mensual (%)", "0.000")
-        fmt_col(ws, "TEA (%)",   "0.00")
-        fmt_col(ws, "TNA (%)", "0.00")
-    # --- aquí TERMINA el with ---
-
-
-    excel_buffer.seek(0)
-    st.download_button(
-        label="📊 Descargar Excel",
-        data=excel_buffer.getvalue(),
-        file_name="resumen_tasa.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
+        # PDF
+        with phase("export_pdf"):
+            pdf_bytes = cached_export(export_pdf, informe_pdf, df_flujo)
+        st.download_button("📥 Descargar PDF",
+            data=pdf_bytes,
+            file_name="informe.pdf",
+            mime="application/pdf"
+        )
 
-    # PDF
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=letter)
-    text = c.beginText(50, 750)
-    for line in informe_pdf.split("\n"):
-        text.textLine(line.strip())
-    c.drawText(text); c.showPage(); c.save()
-    buffer.seek(0)
-    st.download_button("📥 Descargar PDF",
-        data=buffer,
-        file_name="informe.pdf",
-        mime="application/pdf"
-    )
+results_section()
 # --- fin resultados y descargas ---
 
 
+# --- Sensibilidad: TEA para una grilla de cuota × cantidad de cuotas ---
+@st.fragment
+def sensitivity_section():
+    """Sensibilidad: cambiar la grilla solo vuelve a correr esta sección."""
+    sync_instrumentation()
+    with st.expander("🧮 Sensibilidad (cuota × cantidad de cuotas)", expanded=False):
+        st.caption("Resuelve la tasa para todas las combinaciones de monto de cuota y cantidad de cuotas "
+                   "con el precio contado y el tipo de pago actuales (hasta 500 × 500).")
+        pmt_ref = float(st.session_state.pmt) or float(st.session_state.pv) / 12 or 100.0
+        s1, s2, s3 = st.columns(3)
+        sens_pmt_desde = s1.number_input("Cuota desde", min_value=0.01, value=round(pmt_ref * 0.5, 2), key="sens_pmt_desde")
+        sens_pmt_hasta = s2.number_input("Cuota hasta", min_value=0.01, value=round(pmt_ref * 1.5, 2), key="sens_pmt_hasta")
+        sens_pmt_pasos = s3.number_input("Valores de cuota", min_value=2, max_value=MAX_PUNTOS, value=50, key="sens_pmt_pasos")
+        s4, s5, s6 = st.columns(3)
+        sens_n_desde = s4.number_input("Cuotas desde", min_value=1, value=6, step=1, key="sens_n_desde")
+        sens_n_hasta = s5.number_input("Cuotas hasta", min_value=1, value=24, step=1, key="sens_n_hasta")
+        sens_n_paso  = s6.number_input("Paso", min_value=1, value=6, step=1, key="sens_n_paso")
+
+        if st.button("Calcular sensibilidad"):
+            pv_s = float(st.session_state.pv)
+            if pv_s <= 0:
+                st.error("Ingresá el precio contado para calcular la sensibilidad.")
+            else:
+                adel_s = st.session_state.tipo_pago.startswith("Adelantado")
+                pmts = pmt_values(sens_pmt_desde, sens_pmt_hasta, sens_pmt_pasos)
+                ns = n_values(sens_n_desde, sens_n_hasta, sens_n_paso)
+                with phase("sensibilidad"):
+                    i_s, tea_s = sensitivity_grid(pv_s, pmts, ns, adelantado=adel_s, tol=tol, max_iter=int(max_iter))
+                    csv_s = grid_to_frame(pmts, ns, tea_s).to_csv(index=False).encode("utf-8")
+                st.session_state["sensibilidad"] = {
+                    "pv": pv_s, "adelantado": adel_s, "pmts": pmts, "ns": ns,
+                    "tea": tea_s, "csv": csv_s,
+                }
+
+        sens = st.session_state.get("sensibilidad")
+        if sens:
+            import plotly.graph_objects as go
+
+            z = sens["tea"] * 100
+            validos = z[np.isfinite(z)]
+            if validos.size == 0:
+                st.warning("Ninguna combinación tiene tasa ≥ 0 (las cuotas no cubren el contado).")
+            else:
+                # Escala de color sin los extremos (cuotas muy altas dan TEA de miles de %)
+                zmin, zmax = np.percentile(validos, [2, 98])
+                fig = go.Figure(go.Heatmap(
+                    z=z, x=sens["pmts"], y=sens["ns"],
+                    zmin=zmin, zmax=zmax, colorscale="Viridis",
+                    colorbar=dict(title="TEA %"),
+                    hovertemplate="Cuota %{x:,.2f}<br>Cuotas %{y}<br>TEA %{z:,.2f}%<extra></extra>",
+                ))
+                fig.update_layout(
+                    xaxis_title="Monto de cuota", yaxis_title="Cantidad de cuotas",
+                    height=450, margin=dict(l=10, r=10, t=30, b=10),
+                    title=f"TEA sobre contado {sens['pv']:,.2f} · "
+                          f"{'adelantado' if sens['adelantado'] else 'vencido'}",
+                )
+                st.plotly_chart(fig, use_container_width=True)
+                st.caption(f"{z.size:,} combinaciones · {z.size - validos.size:,} sin tasa ≥ 0 (en blanco).")
+            st.download_button("📄 Descargar grilla TEA (CSV)", data=sens["csv"],
+                               file_name="sensibilidad_tea.csv", mime="text/csv")
+
+sensitivity_section()
+# --- fin Sensibilidad ---
+
+
 #!------------------------------------------------------------------------------
 
 
@@ -862,85 +998,149 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# --- Fila 1: guardar escenario ---
-col1, col2 = st.columns([4,1])  # campo más ancho, botón más chico
-with col1:
-    nombre = st.text_input(
-        "Nombre del escenario",
-        key="escenario_nombre",
-        placeholder="Ej: Caso base 12x14.315"
-    )
-with col2:
-    # Empujamos el botón hacia abajo para que quede alineado con el campo
-    st.write("")
-    st.write("")
-    if st.button("💾 Guardar", use_container_width=True):
+@st.fragment
+def scenarios_section():
+    """Escenarios: guardar, filtrar, paginar y comparar solo vuelven a correr esta sección."""
+    sync_instrumentation()
+    # --- Fila 1: guardar escenario ---
+    store = open_store()
+    col1, col2 = st.columns([4,1])  # campo más ancho, botón más chico
+    with col1:
+        nombre = st.text_input(
+            "Nombre del escenario",
+            key="escenario_nombre",
+            placeholder="Ej: Caso base 12x14.315"
+        )
+    with col2:
+        # Empujamos el botón hacia abajo para que quede alineado con el campo
+        st.write("")
+        st.write("")
+        guardar = st.button("💾 Guardar", use_container_width=True)
+
+    def save_scenario(nombre):
+        store.save(nombre, {
+            "pv": float(st.session_state.pv),
+            "n": int(st.session_state.n),
+            "pmt": float(st.session_state.pmt),
+            "tipo_pago": st.session_state.tipo_pago,
+            "modo": st.session_state.modo,
+            "i_periodo": float(st.session_state.i_periodo),
+            "periodicidad": st.session_state.periodicidad,
+            "fecha_inicial": st.session_state.fecha_inicial,
+            "regla_fin_de_mes": st.session_state.regla_fin_de_mes,
+            "ajuste_habil": st.session_state.ajuste_habil,
+        }, st.session_state.get("resultado"))
+        st.success(f"Escenario “{store.stored_name(nombre)}” guardado.")
+
+    if guardar:
+        st.session_state.pop("escenario_reemplazar", None)
         if not nombre.strip():
             st.warning("Poné un nombre para el escenario.")
         else:
-            st.session_state.escenarios[nombre] = {
-                "pv": float(st.session_state.pv),
-                "n": int(st.session_state.n),
-                "pmt": float(st.session_state.pmt),
-                "tipo_pago": st.session_state.tipo_pago,
-                "modo": st.session_state.modo,
-                "i_periodo": float(st.session_state.i_periodo),
-                "periodicidad": st.session_state.periodicidad,
-                "fecha_inicial": st.session_state.fecha_inicial,
-                "resultado": st.session_state.get("resultado", {}),
-            }
-            st.success(f"Escenario “{nombre}” guardado.")
-
-
-
-# --- Fila 2: Cargar escenario ---
-col3, col4 = st.columns([4,1])
+            # Los nombres no distinguen mayúsculas: "base" reemplazaría a "Base"; se pide confirmación
+            previo = store.stored_name(nombre)
+            if previo is not None and previo != nombre.strip():
+                st.session_state.escenario_reemplazar = nombre.strip()
+            else:
+                save_scenario(nombre)
 
-with col3:
-    opciones = ["(ninguno)"] + sorted(st.session_state.escenarios.keys())
-    escenario_sel = st.selectbox("Seleccionar escenario guardado", options=opciones, key="escenario_sel")
-
-with col4:
-    st.markdown("<div style='height:8px'></div>", unsafe_allow_html=True)  # alinear arriba
-    if st.button("📥 Cargar", use_container_width=True):
-        sel = st.session_state.escenario_sel
-        if sel and sel != "(ninguno)" and sel in st.session_state.escenarios:
-            e = st.session_state.escenarios[sel]
-            st.session_state["preset"] = {
-                "pv": e.get("pv", 0.0),
-                "n": e.get("n", 1),
-                "pmt": e.get("pmt", 0.0),
-                "tipo_pago": e.get("tipo_pago", "Vencido (fin de período)"),
-                "modo": e.get("modo", "Calcular tasa (i)"),
-                "i_periodo": e.get("i_periodo", 0.0),
-                "periodicidad": e.get("periodicidad", "Mensual"),
-                "fecha_inicial": e.get("fecha_inicial", st.session_state.fecha_inicial),
-                "resultado": None,
-                "explicacion": None,
-            }
-            st.success(f"Escenario “{sel}” cargado. Revisá los campos y presioná **Calcular**.")
-            st.rerun()  # 👈 forzamos recarga antes de que se pinten los widgets
-# --- fin Fila 2 ---
-
-
-
-# Listado de escenarios guardados
-if st.session_state.escenarios:
-    st.caption("Escenarios guardados:")
-    st.dataframe(
-        pd.DataFrame([
-            {
-                "nombre": k,
-                "modo": v.get("modo", ""),
-                "tipo_pago": v.get("tipo_pago", ""),
-                "pv": v.get("pv", 0.0),
-                "n": v.get("n", 0),
-                "pmt": v.get("pmt", 0.0),
-            } for k, v in st.session_state.escenarios.items()
-        ]),
-        use_container_width=True,
-        hide_index=True,
-    )
+    pendiente = st.session_state.get("escenario_reemplazar")
+    previo = store.stored_name(pendiente) if pendiente else None
+    if previo is None:
+        st.session_state.pop("escenario_reemplazar", None)     # ya no existe: nada que confirmar
+    else:
+        st.warning(f"Ya hay un escenario “{previo}”: guardar “{pendiente}” lo reemplaza "
+                   f"(se conserva el nombre “{previo}” y su fecha de creación).")
+        c1, c2 = st.columns(2)
+        if c1.button(f"Reemplazar “{previo}”", key="escenario_reemplazar_ok", use_container_width=True):
+            del st.session_state.escenario_reemplazar
+            save_scenario(pendiente)
+        elif c2.button("Cancelar", key="escenario_reemplazar_no", use_container_width=True):
+            del st.session_state.escenario_reemplazar
+            st.rerun(scope="fragment")
+
+
+    # --- Filtros y página del listado (solo se lee la página visible) ---
+    POR_PAGINA = 50
+    f1, f2, f3 = st.columns([3, 2, 1])
+    buscar = f1.text_input("Buscar por nombre", key="escenario_buscar", placeholder="Empieza con…")
+    filtro_modo = f2.selectbox("Modo", ["Todos", "Calcular tasa (i)", "Calcular cuotas (n)"], key="escenario_modo")
+    filtro_modo = None if filtro_modo == "Todos" else filtro_modo
+    total_escenarios = store.count(buscar.strip(), filtro_modo)
+    paginas = max(-(-total_escenarios // POR_PAGINA), 1)
+    pagina = f3.number_input("Página", min_value=1, max_value=paginas, value=1, key="escenario_pagina")
+    df_escenarios = store.page(pagina, POR_PAGINA, buscar.strip(), filtro_modo)
+
+
+    # --- Fila 2: Cargar escenario ---
+    col3, col4, col5 = st.columns([4,1,1])
+
+    with col3:
+        opciones = ["(ninguno)"] + df_escenarios["nombre"].tolist()
+        if st.session_state.get("escenario_sel") not in opciones:
+            st.session_state.escenario_sel = "(ninguno)"     # borrado o fuera de la página
+        escenario_sel = st.selectbox("Seleccionar escenario guardado", options=opciones, key="escenario_sel")
+
+    with col4:
+        st.markdown("<div style='height:8px'></div>", unsafe_allow_html=True)  # alinear arriba
+        if st.button("📥 Cargar", use_container_width=True):
+            sel = st.session_state.escenario_sel
+            e = store.get(sel) if sel and sel != "(ninguno)" else None
+            if e is not None:
+                st.session_state["preset"] = {
+                    "pv": e["pv"],
+                    "n": e["n"],
+                    "pmt": e["pmt"],
+                    "tipo_pago": e["tipo_pago"],
+                    "modo": e["modo"],
+                    "i_periodo": e["i_periodo"],
+                    "periodicidad": e["periodicidad"],
+                    "fecha_inicial": e["fecha_inicial"] or st.session_state.fecha_inicial,
+                    "regla_fin_de_mes": e["regla_fin_de_mes"],
+                    "ajuste_habil": e["ajuste_habil"],
+                    "resultado": None,
+                    "explicacion": None,
+                }
+                st.success(f"Escenario “{sel}” cargado. Revisá los campos y presioná **Calcular**.")
+                st.rerun()  # 👈 forzamos recarga antes de que se pinten los widgets
+
+    with col5:
+        st.markdown("<div style='height:8px'></div>", unsafe_allow_html=True)
+        if st.button("🗑️ Borrar", use_container_width=True):
+            sel = st.session_state.escenario_sel
+            if sel and sel != "(ninguno)":
+                store.delete(sel)
+                st.rerun(scope="fragment")
+    # --- fin Fila 2 ---
+
+
+
+    # Listado de escenarios guardados (página actual)
+    if total_escenarios:
+        st.caption(f"Escenarios guardados: {total_escenarios:,} · página {pagina} de {paginas}")
+        st.dataframe(df_escenarios, use_container_width=True, hide_index=True)
+
+        # --- Comparar todos: los escenarios del filtro, resueltos en un solo lote ---
+        if st.button(f"⚖️ Comparar todos ({total_escenarios:,})",
+                     help="Resuelve todos los escenarios del filtro actual de una vez y los ordena por TEA."):
+            with st.spinner("Comparando escenarios…"), phase("comparacion"):
+                st.session_state["comparacion"] = compare_scenarios(
+                    store.inputs(buscar.strip(), filtro_modo), tol=tol, max_iter=int(max_iter))
+
+        df_comp = st.session_state.get("comparacion")
+        if df_comp is not None:
+            sin_solucion = int((~df_comp["ok"]).sum())
+            st.caption(f"Comparación de {len(df_comp):,} escenarios (de menor a mayor TEA)"
+                       + (f" · {sin_solucion:,} sin solución al final" if sin_solucion else ""))
+            st.dataframe(df_comp, use_container_width=True, hide_index=True)
+            d1, d2 = st.columns(2)
+            d1.download_button("📄 Comparación (CSV)", data=cached_export(export_csv, df_comp),
+                               file_name="comparacion_escenarios.csv", mime="text/csv")
+            d2.download_button("📊 Comparación (Excel)", data=cached_export(export_comparacion_excel, df_comp),
+                               file_name="comparacion_escenarios.xlsx",
+                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+scenarios_section()
 # --- Escenarios (guardar/cargar) ---
 
 
@@ -1002,6 +1202,8 @@ if st.button("Exportar escenario actual como JSON"):
         "modo": st.session_state.modo,
         "periodicidad": st.session_state.periodicidad,
         "fecha_inicial": st.session_state.fecha_inicial.isoformat(),
+        "regla_fin_de_mes": st.session_state.regla_fin_de_mes,
+        "ajuste_habil": st.session_state.ajuste_habil,
     }
     if st.session_state.modo == "Calcular tasa (i)":
         data["CANT C"] = int(st.session_state.get("n", 0))
@@ -1080,7 +1282,7 @@ if st.button("✨ Explicar con IA", type="primary", disabled=not has_result,
 
     with st.spinner("Generando explicación…"):
         out = explicar_con_ia(
-            client, pv, pmt, n, adelantado, i,
+            ai_client(), pv, pmt, n, adelantado, i,
             periodicidad=st.session_state.periodicidad,
             fecha_inicial=st.session_state.fecha_inicial,
             modo=r.get("modo", "Calcular tasa (i)"),
@@ -1104,69 +1306,84 @@ st.divider()   # ← ÚNICO separador
 
 
 # --- 📚 Tutor IA (conceptos) + PDF opcional ---
-st.markdown(
-    """
-    <div style="display:flex; align-items:center; gap:10px; margin-top:25px; margin-bottom:15px;">
-        <!-- Ícono libro abierto -->
-        <svg xmlns="http://www.w3.org/2000/svg"
-             width="30" height="30"
-             viewBox="0 0 24 24"
-             fill="none" stroke="#00909a" stroke-width="2.5"
-             stroke-linecap="round" stroke-linejoin="round">
-            <path d="M4 19.5a2.5 2.5 0 0 1 2.5-2.5H20"></path>
-            <path d="M20 22V4a2 2 0 0 0-2-2H7a2 2 0 0 0-2 2v18"></path>
-            <path d="M12 4v18"></path>
-        </svg>
-        <h2 style="color:#FAFAFA; margin:0;">Tutor IA (conceptos)</h2>
-    </div>
-    """,
-    unsafe_allow_html=True
-)
-
-# 1) Subida de PDF (opcional)
-upl_pdf = st.file_uploader("Subir una fuente PDF (opcional)", type=["pdf"], key="kb_upl")
-if upl_pdf is not None:
-    try:
-        reader = PdfReader(upl_pdf)
-        text = "\n".join((page.extract_text() or "") for page in reader.pages)
-        st.session_state.kb_text = text
-        st.session_state.kb_name = upl_pdf.name
-        st.success(f"PDF cargado: {upl_pdf.name} · {len(reader.pages)} páginas")
-    except Exception as e:
-        st.error(f"No pude leer el PDF: {e}")
-
-# 2) Pregunta abierta (conceptos)
-q = st.text_input("Preguntá algo de matemática financiera (p. ej. '¿Cómo se calcula la cuota francesa?')", key="kb_q")
-
-# 3) Respuesta con IA, usando la fuente si existe (sin recalcular nada)
-btn_disabled = (not q)
-if st.button("💬 Responder (IA)", type="secondary", disabled=btn_disabled,
-             help="Responde usando la fuente PDF si está cargada; no recalcula, solo explica."):
-    kb = st.session_state.get("kb_text", "")
-    kb_short = kb[:12000]
-    kb_name = st.session_state.get("kb_name", "fuente")
-
-    system = (
-        "Asistente de Matemática Financiera. Responde de forma clara y breve (6–10 líneas). "
-        "Si hay fuente, apóyate en ella y dilo explícitamente; si no está en la fuente, acláralo. "
-        "No inventes fórmulas ni recalcules resultados del caso; solo explica conceptos."
-    )
-    user = (
-        f"Pregunta del usuario: {q}\n\n"
-        f"Fuente PDF (opcional, extracto de '{kb_name}'):\n{kb_short}"
+@st.fragment
+def tutor_section():
+    """Tutor IA: subir el PDF o preguntar solo vuelve a correr esta sección."""
+    sync_instrumentation()
+    st.markdown(
+        """
+        <div style="display:flex; align-items:center; gap:10px; margin-top:25px; margin-bottom:15px;">
+            <!-- Ícono libro abierto -->
+            <svg xmlns="http://www.w3.org/2000/svg"
+                 width="30" height="30"
+                 viewBox="0 0 24 24"
+                 fill="none" stroke="#00909a" stroke-width="2.5"
+                 stroke-linecap="round" stroke-linejoin="round">
+                <path d="M4 19.5a2.5 2.5 0 0 1 2.5-2.5H20"></path>
+                <path d="M20 22V4a2 2 0 0 0-2-2H7a2 2 0 0 0-2 2v18"></path>
+                <path d="M12 4v18"></path>
+            </svg>
+            <h2 style="color:#FAFAFA; margin:0;">Tutor IA (conceptos)</h2>
+        </div>
+        """,
+        unsafe_allow_html=True
     )
-    try:
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": user},
-            ],
-            temperature=0.2,
+
+    # 1) Subida de PDF (opcional)
+    upl_pdf = st.file_uploader("Subir una fuente PDF (opcional)", type=["pdf"], key="kb_upl")
+    if upl_pdf is not None and st.session_state.get("kb_file_id") != upl_pdf.file_id:
+        # El texto se extrae una vez por archivo (no en cada pregunta)
+        try:
+            from pypdf import PdfReader
+
+            reader = PdfReader(upl_pdf)
+            text = "\n".join((page.extract_text() or "") for page in reader.pages)
+            st.session_state.kb_text = text
+            st.session_state.kb_name = upl_pdf.name
+            st.session_state.kb_file_id = upl_pdf.file_id
+            st.session_state.kb_paginas = len(reader.pages)
+        except Exception as e:
+            st.error(f"No pude leer el PDF: {e}")
+    if upl_pdf is not None and st.session_state.get("kb_file_id") == upl_pdf.file_id:
+        st.success(f"PDF cargado: {upl_pdf.name} · {st.session_state.kb_paginas} páginas")
+
+    # 2) Pregunta abierta (conceptos)
+    q = st.text_input("Preguntá algo de matemática financiera (p. ej. '¿Cómo se calcula la cuota francesa?')", key="kb_q")
+
+    # 3) Respuesta con IA, usando la fuente si existe (sin recalcular nada)
+    btn_disabled = (not q)
+    if st.button("💬 Responder (IA)", type="secondary", disabled=btn_disabled,
+                 help="Responde usando la fuente PDF si está cargada; no recalcula, solo explica."):
+        kb = st.session_state.get("kb_text", "")
+        kb_short = kb[:12000]
+        kb_name = st.session_state.get("kb_name", "fuente")
+
+        system = (
+            "Asistente de Matemática Financiera. Responde de forma clara y breve (6–10 líneas). "
+            "Si hay fuente, apóyate en ella y dilo explícitamente; si no está en la fuente, acláralo. "
+            "No inventes fórmulas ni recalcules resultados del caso; solo explica conceptos."
         )
-        st.info(resp.choices[0].message.content.strip())
-    except Exception as e:
-        st.error(f"Error al consultar IA: {e}")
+        user = (
+            f"Pregunta del usuario: {q}\n\n"
+            f"Fuente PDF (opcional, extracto de '{kb_name}'):\n{kb_short}"
+        )
+        try:
+            client = ai_client()
+            if client is None:
+                raise RuntimeError("falta configurar OPENAI_API_KEY (st.secrets o .env)")
+            resp = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": user},
+                ],
+                temperature=0.2,
+            )
+            st.info(resp.choices[0].message.content.strip())
+        except Exception as e:
+            st.error(f"Error al consultar IA: {e}")
+
+tutor_section()
 # --- fin Tutor IA ---
 
 
@@ -1175,6 +1392,26 @@ if st.button("💬 Responder (IA)", type="secondary", disabled=btn_disabled,
 
 
 
+# --- Métricas del solver (se muestran al final para incluir lo calculado en esta corrida) ---
+if stats_slot is not None and st.session_state.get("solver_stats") is not None:
+    with stats_slot.container():
+        ss = st.session_state.solver_stats.as_dict()
+        st.caption(f"Solver: {ss['resoluciones']:,} resoluciones ({ss['aciertos_cache']:,} desde la caché) · "
+                   f"{ss['evaluaciones_vp']:,} evaluaciones de VP · "
+                   f"{ss['pasos_newton']:,} pasos Halley · {ss['pasos_biseccion']:,} de bisección · "
+                   f"{ss['sin_convergencia']:,} sin converger")
+        if ss["tiempos"]:
+            st.dataframe(pd.DataFrame([
+                {"fase": f, "llamadas": t["llamadas"], "total (ms)": t["segundos"] * 1e3,
+                 "promedio (ms)": t["segundos"] * 1e3 / t["llamadas"]}
+                for f, t in ss["tiempos"].items()
+            ]), hide_index=True)
+        if st.button("Reiniciar métricas", key="reset_solver_stats"):
+            st.session_state.solver_stats.reset()
+            st.rerun()
+# --- fin Métricas del solver ---
+
+
 # Acerca de (pie de página)
 with st.expander("Acerca de "):
     st.markdown(
@@ -1196,7 +1433,7 @@ with st.expander("Acerca de "):
     )
     st.markdown(
         "- Matemática Financiera clásica: prestación vs. contraprestación; pago vencido/adelantado.\n"
-        "- Cálculo de **i** (tasa por período) por **equivalencia**: Newton + bisección con **semilla tipo Baily**.\n"
+        "- Cálculo de **i** (tasa por período) por **equivalencia**: Halley con derivadas exactas dentro de un intervalo, con **semilla de una grilla precalculada**.\n"
         "- Cálculo de **n** (cantidad de cuotas) por **fórmula cerrada**:  \n"
         "  n = -ln(1 - i·PV/PMT) / ln(1+i) (pago **vencido**). En **adelantado**, se trae PV a vencido y se aplica la misma fórmula.\n"
         "- Opción de **ajustar la última cuota** para que VP(cuotas) ≈ contado (equivalencia exacta).\n"
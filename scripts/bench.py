@@ -0,0 +1,443 @@
+# --- Benchmarks de los caminos calientes (solvers, flujo y descargas) ---
+# Uso (desde la raíz del repo):
+#   python -m scripts.bench                        # barrido completo → benchmarks/<commit>.json
+#   python -m scripts.bench --quick                # barrido reducido (unos segundos)
+#   python -m scripts.bench --only solve,cashflow  # solo los casos cuyo nombre contiene esos textos
+#   python -m scripts.bench --compare benchmarks/abc1234.json   # compara p50 contra una línea base
+#   python -m scripts.bench --only import          # solo tiempos de importación (arranque de la app)
+
+import argparse
+import ast
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timezone
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from core.calendario import payment_schedule
+from core.exportes import (
+    FORMATOS_FLUJO,
+    MOTORES_EXCEL,
+    export_csv,
+    export_excel,
+    export_pdf,
+    write_excel_streaming,
+)
+from core.finanzas import (
+    cashflow_table,
+    present_value_annuity,
+    solve_monthly_rate,
+    solve_monthly_rate_batch,
+    solve_monthly_rate_trace,
+    solve_periods_batch,
+)
+from core.lote import MODO_I
+from core.resultado import derive_result
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(ROOT, "benchmarks")
+
+# Barridos: cantidad de cuotas, relación pmt·n/pv (1 = tasa 0) y tamaños de lote
+N_SWEEP = (12, 36, 120, 360, 1200)
+RATIOS = (1.05, 1.3, 2.0, 5.0)
+BATCH_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+LOOP_FILAS = 10_000     # filas del bucle escalar de referencia para la aceleración del lote
+# Escalar original (antes del lote), leído con git show: la meta del lote es >= 100× sobre él.
+# Medido (1 CPU, p50, 1M filas de _random_plans): lote 0.054 s, escalar base 5.7 µs/fila → 105×.
+BASE_COMMIT = "b5e7c3f"
+OBJETIVO_LOTE = 100
+EXPORT_N = (12, 360, 1200)
+# Filas de la hoja larga del Excel por bloques. Medido (200k filas × 5 columnas):
+# motor xml 470k celdas/s, openpyxl write_only 36k celdas/s (sin lxml).
+EXCEL_FILAS = 50_000
+PV = 100_000.0
+
+# Importaciones medidas en un intérprete nuevo (dependencias pesadas y el núcleo)
+IMPORT_MODULES = (
+    "numpy", "pandas", "streamlit", "dotenv", "openai", "reportlab.pdfgen.canvas",
+    "pypdf", "openpyxl", "altair", "plotly.graph_objects",
+    "core.finanzas", "core.lote", "core.exportes", "core.sensibilidad", "core.ai",
+    "core.calendario",
+)
+
+
+# --- Medición ---
+def measure(fn, min_time=0.2, max_calls=20_000, min_calls=5, warmup=2):
+    """Latencias (ns) de llamadas sucesivas a fn, hasta min_time segundos o max_calls."""
+    for _ in range(warmup):
+        fn()
+    lat = []
+    fin = time.perf_counter() + min_time
+    while len(lat) < max_calls and (len(lat) < min_calls or time.perf_counter() < fin):
+        t0 = time.perf_counter_ns()
+        fn()
+        lat.append(time.perf_counter_ns() - t0)
+    return lat
+
+
+def summarize_latencies(lat_ns, items=1):
+    """Percentiles de latencia (segundos) y throughput en items/s (filas, períodos o llamadas)."""
+    s = np.asarray(lat_ns, dtype=float) / 1e9
+    p50, p90, p99 = np.percentile(s, [50, 90, 99])
+    return {
+        "llamadas": len(s),
+        "items": items,
+        "media_s": float(s.mean()),
+        "min_s": float(s.min()),
+        "p50_s": float(p50),
+        "p90_s": float(p90),
+        "p99_s": float(p99),
+        "items_por_s": float(items / s.mean()),
+    }
+
+
+def case_id(nombre, params):
+    """Clave estable de un caso: nombre[k=v,...] (se usa para comparar corridas)."""
+    return nombre + "[" + ",".join(f"{k}={v}" for k, v in params.items()) + "]"
+
+
+# --- Casos ---
+def _plan(n, ratio):
+    """pv, pmt, n para un plan con pmt·n/pv = ratio."""
+    return PV, PV * ratio / n, n
+
+
+def _random_plans(size, seed=0):
+    """Cartera sintética: n entre 12 y 1200, pmt·n/pv entre 1.01 y 5, mitad adelantado."""
+    rng = np.random.default_rng(seed)
+    n = rng.integers(12, 1201, size).astype(float)
+    pv = rng.uniform(1e3, 1e6, size)
+    pmt = pv * rng.uniform(1.01, 5.0, size) / n
+    adel = rng.random(size) < 0.5
+    return pv, pmt, n, adel
+
+
+def scalar_cases(quick):
+    """Solvers escalares y VP de la renta sobre el barrido n × pmt/pv × tipo de pago."""
+    ns = N_SWEEP[::2] if quick else N_SWEEP
+    ratios = RATIOS[::2] if quick else RATIOS
+    for n in ns:
+        for adel in (False, True):
+            yield ("present_value_annuity", {"n": n, "adelantado": adel},
+                   lambda n=n, adel=adel: present_value_annuity(1000.0, 0.03, n, adel), 1)
+            for ratio in ratios:
+                pv, pmt, _ = _plan(n, ratio)
+                params = {"n": n, "ratio": ratio, "adelantado": adel}
+                yield ("solve_monthly_rate", params,
+                       lambda pv=pv, pmt=pmt, n=n, adel=adel: solve_monthly_rate(pv, pmt, n, adel), 1)
+                yield ("solve_monthly_rate_trace", params,
+                       lambda pv=pv, pmt=pmt, n=n, adel=adel: solve_monthly_rate_trace(pv, pmt, n, adel), 1)
+
+
+def batch_cases(quick):
+    """Solvers vectorizados sobre carteras de distinto tamaño (throughput en filas/s)."""
+    sizes = BATCH_SIZES[:-1] if quick else BATCH_SIZES
+    for size in sizes:
+        pv, pmt, n, adel = _random_plans(size)
+        i, _, _ = solve_monthly_rate_batch(pv, pmt, n, adel)
+        yield ("solve_monthly_rate_batch", {"filas": size},
+               lambda pv=pv, pmt=pmt, n=n, adel=adel: solve_monthly_rate_batch(pv, pmt, n, adel), size)
+        yield ("solve_periods_batch", {"filas": size},
+               lambda pv=pv, pmt=pmt, i=i, adel=adel: solve_periods_batch(pv, pmt, i, adel), size)
+    # Referencia: el escalar en un bucle de Python (filas/s comparables con las del lote)
+    filas = list(zip(*(x.tolist() for x in _random_plans(LOOP_FILAS))))
+    yield ("solve_monthly_rate_loop", {"filas": LOOP_FILAS},
+           lambda filas=filas: [solve_monthly_rate(*f) for f in filas], LOOP_FILAS)
+    base = _base_solver()
+    if base is not None:
+        yield ("solve_monthly_rate_base_loop", {"filas": LOOP_FILAS, "commit": BASE_COMMIT},
+               lambda filas=filas: [base(*f) for f in filas], LOOP_FILAS)
+
+
+def _base_solver():
+    """solve_monthly_rate de BASE_COMMIT (git show + exec), o None si no hay git o el commit."""
+    try:
+        fuente = subprocess.run(("git", "show", f"{BASE_COMMIT}:core/finanzas.py"), cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    ns = {"__name__": "finanzas_base"}
+    exec(compile(fuente, f"{BASE_COMMIT}:core/finanzas.py", "exec"), ns)
+    return ns["solve_monthly_rate"]
+
+
+def calendar_cases(quick):
+    """Cronogramas de fechas por lote (throughput en planes/s): n entre 12 y 36, paso 1 a 12 meses."""
+    sizes = BATCH_SIZES[:-1] if quick else BATCH_SIZES
+    for size in sizes:
+        rng = np.random.default_rng(size)
+        inicio = np.datetime64("2025-01-01") + rng.integers(0, 730, size)
+        n = rng.integers(12, 37, size)
+        paso = rng.choice([1, 2, 3, 6, 12], size)
+        adel = rng.random(size) < 0.5
+        for regla, ajuste in (("acumulada", "ninguno"), ("fin_de_mes", "siguiente_modificado")):
+            yield ("payment_schedule", {"filas": size, "regla": regla, "ajuste": ajuste},
+                   lambda inicio=inicio, n=n, paso=paso, adel=adel, regla=regla, ajuste=ajuste:
+                       payment_schedule(inicio, n, paso, adel, regla, ajuste), size)
+
+
+def cashflow_cases(quick):
+    """Tabla de flujo (throughput en períodos/s)."""
+    ns = N_SWEEP[::2] if quick else N_SWEEP
+    for n in ns + (100_000,):
+        for adel in (False, True):
+            yield ("cashflow_table", {"n": n, "adelantado": adel},
+                   lambda n=n, adel=adel: cashflow_table(1000.0, n, adel, 0.03), n)
+
+
+def _resultado(n):
+    """Resumen, flujo, iteraciones e informe de un plan de n cuotas, como en main.py (derive_result)."""
+    pv, pmt, _ = _plan(n, 1.3)
+    i, trace = solve_monthly_rate_trace(pv, pmt, n)
+    r = {"modo": MODO_I, "pv": pv, "n": n, "pmt": pmt, "adelantado": False,
+         "i": i, "trace": trace, "tol": 1e-12, "max_iter": 80}
+    res = derive_result(r, "Mensual", date(2025, 1, 1))
+    informe = "\n".join(f"- {k}: {v}" for k, v in res.resumen.iloc[0].items())
+    explicacion = "Explicación de prueba. " * 40
+    return res.resumen, res.flujo(), res.iteraciones, informe, explicacion
+
+
+def export_cases(quick):
+    """Bloques de descarga (CSV, Excel, PDF) con el resultado de un plan de n cuotas."""
+    for n in (EXPORT_N[:2] if quick else EXPORT_N):
+        df_resumen, df_flujo, df_iter, informe, explicacion = _resultado(n)
+        yield ("export_csv", {"n": n}, lambda d=df_resumen: export_csv(d), 1)
+        yield ("export_excel", {"n": n},
+               lambda a=df_resumen, b=df_flujo, c=df_iter, e=explicacion: export_excel(a, b, c, e), 1)
+        yield ("export_pdf", {"n": n}, lambda t=informe, f=df_flujo: export_pdf(t, f), 1)
+    # Hoja larga por bloques con cada motor de Excel (throughput en celdas/s)
+    filas = EXCEL_FILAS // 5 if quick else EXCEL_FILAS
+    flujo, _ = cashflow_table(1000.0, filas, False, 0.001)
+    # Fechas por hora: 200k días se saldrían del rango de datetime64[ns]
+    flujo.insert(1, "fecha_pago", pd.date_range("2025-01-01", periods=filas, freq="h"))
+    bloques = [flujo.iloc[k:k + 50_000] for k in range(0, filas, 50_000)]
+    for motor in MOTORES_EXCEL:
+        yield ("excel_streaming", {"filas": filas, "motor": motor},
+               lambda b=bloques, m=motor: write_excel_streaming(
+                   BytesIO(), [("Flujo", iter(b), FORMATOS_FLUJO)], motor=m),
+               flujo.size)
+
+
+GRUPOS = (scalar_cases, batch_cases, calendar_cases, cashflow_cases, export_cases)
+
+
+# --- Tiempos de importación (arranque en frío de la app) ---
+def main_imports(path=os.path.join(ROOT, "main.py")):
+    """Módulos que main.py importa a nivel de módulo (lo que paga cada arranque en frío)."""
+    with open(path, encoding="utf-8") as fh:
+        tree = ast.parse(fh.read())
+    mods = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            mods += [a.name for a in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            mods.append(node.module)
+    return list(dict.fromkeys(mods))
+
+
+def import_seconds(modules):
+    """Segundos que tarda importar modules en un intérprete nuevo (ImportError si falta alguno)."""
+    code = ("import importlib, time; t = time.perf_counter()\n"
+            f"for m in {list(modules)!r}: importlib.import_module(m)\n"
+            "print(time.perf_counter() - t)")
+    r = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT)
+    if r.returncode:
+        err = (r.stderr.strip().splitlines() or ["error"])[-1]
+        raise ImportError(err.split(": ", 1)[-1])
+    return float(r.stdout.strip().splitlines()[-1])
+
+
+def importtime_top(modules, top=12):
+    """
+    Desglose tipo `python -X importtime`: las importaciones directas de modules
+    (y lo que arrastran) ordenadas por tiempo acumulado. Lista de (módulo, segundos).
+    """
+    code = "; ".join(f"import {m}" for m in modules)
+    r = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                       capture_output=True, text=True, cwd=ROOT)
+    base = subprocess.run([sys.executable, "-X", "importtime", "-c", "pass"],
+                          capture_output=True, text=True, cwd=ROOT)
+    al_iniciar = {line.rsplit("|", 1)[1].strip() for line in base.stderr.splitlines() if "|" in line}
+    filas = []
+    for line in r.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, acumulado, nombre = line[len("import time:"):].split("|")
+        # Solo nivel superior (lo que importa el script, no lo que importan ellos)
+        if nombre.startswith("  ") or nombre.strip() in al_iniciar:
+            continue
+        filas.append((nombre.strip(), int(acumulado) / 1e6))
+    return sorted(filas, key=lambda f: -f[1])[:top]
+
+
+def import_cases(quick):
+    """(nombre, params, módulos) de cada importación a medir."""
+    for m in IMPORT_MODULES:
+        yield "import", {"modulo": m}, [m]
+    mods = main_imports()
+    yield "import", {"modulo": "main.py"}, mods
+    yield "import", {"modulo": "main.py sin streamlit"}, [m for m in mods if m != "streamlit"]
+
+
+def run_imports(quick=False, repeat=None):
+    """Mide cada importación repeat veces (un proceso por vez); mismo formato que run()."""
+    repeat = repeat or (3 if quick else 7)
+    resultados = {}
+    for nombre, params, mods in import_cases(quick):
+        cid = case_id(nombre, params)
+        try:
+            lat = [int(import_seconds(mods) * 1e9) for _ in range(repeat)]
+        except ImportError as e:
+            resultados[cid] = {"nombre": nombre, "params": params, "omitido": str(e)}
+            print(f"{cid:<70} omitido ({e})")
+            continue
+        res = {"nombre": nombre, "params": params, **summarize_latencies(lat)}
+        resultados[cid] = res
+        print(f"{cid:<70} p50 {_fmt_t(res['p50_s'])}  min {_fmt_t(res['min_s'])}")
+    # Desglose del arranque: main.py completo o, si falta streamlit, el resto
+    for nombre, params, mods in list(import_cases(quick))[-2:]:
+        res = resultados[case_id(nombre, params)]
+        if "omitido" in res:
+            continue
+        desglose = importtime_top(mods)
+        print(f"\nDesglose del arranque de {params['modulo']} (python -X importtime, acumulado):")
+        for mod, seg in desglose:
+            print(f"  {mod:<40} {_fmt_t(seg)}")
+        res["desglose"] = dict(desglose)
+        break
+    return resultados
+
+
+# --- Corrida ---
+def run(quick=False, only=None, min_time=0.2):
+    """Ejecuta los casos y devuelve {case_id: resultado}. Los que fallan por falta de dependencias se omiten."""
+    resultados = {}
+    for grupo in GRUPOS:
+        for nombre, params, fn, items in grupo(quick):
+            if only and not any(o in nombre for o in only):
+                continue
+            cid = case_id(nombre, params)
+            try:
+                lat = measure(fn, min_time=min_time, max_calls=2_000 if items > 1 else 20_000)
+            except ImportError as e:
+                motivo = f"falta {e.name}" if e.name else str(e).splitlines()[0]
+                resultados[cid] = {"nombre": nombre, "params": params, "omitido": motivo}
+                print(f"{cid:<70} omitido ({motivo})")
+                continue
+            res = {"nombre": nombre, "params": params, **summarize_latencies(lat, items)}
+            resultados[cid] = res
+            print(f"{cid:<70} p50 {_fmt_t(res['p50_s'])}  p99 {_fmt_t(res['p99_s'])}  "
+                  f"{res['items_por_s']:>12,.0f}/s")
+    if not only or any("import" in o for o in only):
+        resultados.update(run_imports(quick))
+    return resultados
+
+
+def speedups(resultados):
+    """
+    Aceleración del lote sobre los bucles escalares (filas/s de cada tamaño ÷
+    filas/s del bucle): el escalar actual y el de BASE_COMMIT, con la meta.
+    """
+    refs = (
+        ("bucle escalar", case_id("solve_monthly_rate_loop", {"filas": LOOP_FILAS}), None),
+        (f"escalar base {BASE_COMMIT}",
+         case_id("solve_monthly_rate_base_loop", {"filas": LOOP_FILAS, "commit": BASE_COMMIT}), OBJETIVO_LOTE),
+    )
+    out = {}
+    for etiqueta, ref_id, objetivo in refs:
+        ref = resultados.get(ref_id, {}).get("items_por_s")
+        if not ref:
+            continue
+        for cid, res in resultados.items():
+            if res.get("nombre") == "solve_monthly_rate_batch" and "items_por_s" in res:
+                x = res["items_por_s"] / ref
+                out[f"{cid} / {ref_id}"] = x
+                meta = "" if objetivo is None else f"  (meta {objetivo}×: {'ok' if x >= objetivo else 'NO'})"
+                print(f"{cid:<70} {x:8.1f}× el {etiqueta}{meta}")
+    return out
+
+
+def _fmt_t(s):
+    for unidad, escala in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if s >= escala:
+            return f"{s / escala:7.2f} {unidad:<2}"
+    return f"{s / 1e-9:7.0f} ns"
+
+
+def metadata():
+    """Datos del entorno para interpretar la línea base (commit, versiones, máquina)."""
+    def git(*args):
+        try:
+            return subprocess.run(("git",) + args, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {
+        "commit": git("rev-parse", "--short", "HEAD"),
+        "sucio": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(actual, base, umbral):
+    """Cambio de p50 caso a caso contra la línea base; devuelve los casos que empeoraron más que umbral."""
+    peores = []
+    print(f"\n{'caso':<70} {'base p50':>11} {'actual p50':>11} {'cambio':>8}")
+    for cid, res in actual.items():
+        ref = base.get(cid)
+        if not ref or "p50_s" not in ref or "p50_s" not in res:
+            continue
+        cambio = res["p50_s"] / ref["p50_s"] - 1
+        marca = "  ← regresión" if cambio > umbral else ""
+        print(f"{cid:<70} {_fmt_t(ref['p50_s'])} {_fmt_t(res['p50_s'])} {cambio:+8.1%}{marca}")
+        if cambio > umbral:
+            peores.append(cid)
+    return peores
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmarks de solvers, tabla de flujo y descargas")
+    ap.add_argument("--quick", action="store_true", help="Barrido reducido y mediciones más cortas")
+    ap.add_argument("--only", default=None, help="Filtrar casos por nombre (lista separada por comas)")
+    ap.add_argument("--min-time", type=float, default=None, help="Segundos mínimos de medición por caso")
+    ap.add_argument("-o", "--output", default=None, help="JSON de salida (por defecto benchmarks/<commit>.json)")
+    ap.add_argument("--compare", default=None, help="JSON de una corrida anterior para comparar")
+    ap.add_argument("--threshold", type=float, default=0.25, help="Empeoramiento de p50 que cuenta como regresión")
+    args = ap.parse_args()
+
+    only = [o.strip() for o in args.only.split(",")] if args.only else None
+    min_time = args.min_time if args.min_time is not None else (0.05 if args.quick else 0.2)
+    meta = metadata()
+    meta.update({"quick": args.quick, "min_time": min_time})
+    resultados = run(quick=args.quick, only=only, min_time=min_time)
+    aceleraciones = speedups(resultados)
+
+    out = args.output or os.path.join(BENCH_DIR, f"{meta['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as fh:
+        json.dump({"meta": meta, "resultados": resultados, "aceleraciones": aceleraciones},
+                  fh, indent=2, ensure_ascii=False)
+    print(f"\nLínea base guardada en {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            base = json.load(fh)
+        peores = compare(resultados, base["resultados"], args.threshold)
+        if peores:
+            print(f"\n{len(peores)} caso(s) empeoraron más de {args.threshold:.0%} (commit base {base['meta'].get('commit')})")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
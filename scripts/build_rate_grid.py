@@ -0,0 +1,71 @@
+# --- Generador de la grilla precalculada de tasas ---
+# Uso (desde la raíz del repo):  python -m scripts.build_rate_grid
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+from core import finanzas
+from core.finanzas import GRID_DIR, interp_log_rate, solve_monthly_rate_batch
+
+
+def exact_log_rate(n, x):
+    """log(i) exacto de renta vencida con n cuotas y x = pmt·n/pv (pv = 1)."""
+    i, _, convergio = solve_monthly_rate_batch(1.0, x / n, n, False, max_iter=200)
+    if not convergio.all():
+        raise RuntimeError("El solver no convergió en algún punto de la grilla")
+    return np.log(i)
+
+
+def build(n_max, x_min, x_max, nu, nz):
+    """Arma la grilla log(i) sobre u = ln(n) ∈ [0, ln n_max] y z = ln(x-1) ∈ [ln x_min, ln x_max]."""
+    meta = {
+        "n_max": n_max,
+        "z_min": float(np.log(x_min)),
+        "z_max": float(np.log(x_max)),
+        "nu": nu,
+        "nz": nz,
+    }
+    meta["du"] = float(np.log(n_max) / (nu - 1))
+    meta["dz"] = (meta["z_max"] - meta["z_min"]) / (nz - 1)
+
+    u = np.arange(nu) * meta["du"]
+    z = meta["z_min"] + np.arange(nz) * meta["dz"]
+    n, x = np.meshgrid(np.exp(u), 1 + np.exp(z), indexing="ij")
+    grid = exact_log_rate(n, x)
+
+    # Cota de error: se mide en los centros y puntos medios de las celdas
+    # (donde la interpolación bilineal se aleja más) y se duplica por seguridad.
+    uf = np.arange(2 * nu - 1) * meta["du"] / 2
+    zf = meta["z_min"] + np.arange(2 * nz - 1) * meta["dz"] / 2
+    nf, xf = np.meshgrid(np.exp(uf), 1 + np.exp(zf), indexing="ij")
+    aprox = np.exp(interp_log_rate(grid, meta, nf, xf))
+    exacta = np.exp(exact_log_rate(nf, xf))
+    meta["cota_rel"] = float(2 * np.max(np.abs(aprox - exacta) / exacta))
+    return grid, meta
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Genera core/data/rate_grid.{npy,json}")
+    ap.add_argument("--n-max", type=int, default=1200, help="Máximo de cuotas cubierto")
+    ap.add_argument("--x-min", type=float, default=1e-6, help="Mínimo de pmt·n/pv - 1")
+    ap.add_argument("--x-max", type=float, default=1000.0, help="Máximo de pmt·n/pv - 1")
+    ap.add_argument("--nu", type=int, default=128, help="Puntos en ln(n)")
+    ap.add_argument("--nz", type=int, default=256, help="Puntos en ln(pmt·n/pv - 1)")
+    args = ap.parse_args()
+
+    # La grilla se genera con el motor exacto, sin semillas de una grilla previa
+    finanzas._grid = False
+    grid, meta = build(args.n_max, args.x_min, args.x_max, args.nu, args.nz)
+
+    os.makedirs(GRID_DIR, exist_ok=True)
+    np.save(os.path.join(GRID_DIR, "rate_grid.npy"), grid)
+    with open(os.path.join(GRID_DIR, "rate_grid.json"), "w", encoding="utf-8") as fh:
+        json.dump(meta, fh, indent=2)
+    print(f"Grilla {grid.shape} guardada en {GRID_DIR} · cota de error relativo {meta['cota_rel']:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+# --- Caché de tasas y métricas del solver ---
+# tests/test_cache.py
+
+from core.cache import cached_solve_monthly_rate_trace, rate_cache
+from core.finanzas import instrument, solve_monthly_rate_trace
+
+
+def test_aciertos_de_cache_cuentan_como_resoluciones():
+    rate_cache.clear()
+    with instrument() as stats:
+        i1, trace1 = cached_solve_monthly_rate_trace(1000.0, 100.0, 12)
+        evaluaciones = stats.evaluaciones_vp
+        i2, trace2 = cached_solve_monthly_rate_trace(1000.0, 100.0, 12)
+    assert (i1, trace1) == (i2, trace2) == solve_monthly_rate_trace(1000.0, 100.0, 12)
+    d = stats.as_dict()
+    assert d["resoluciones"] == 2 and d["aciertos_cache"] == 1
+    assert d["evaluaciones_vp"] == evaluaciones == len(trace1)       # el acierto no evalúa
+    assert rate_cache.stats()["hits"] == 1
+
+
+def test_traza_cacheada_es_una_copia():
+    rate_cache.clear()
+    _, trace = cached_solve_monthly_rate_trace(1000.0, 100.0, 12)
+    trace[0]["i"] = -1.0
+    assert cached_solve_monthly_rate_trace(1000.0, 100.0, 12)[1][0]["i"] != -1.0
@@ -0,0 +1,108 @@
+# --- Calendario de pagos: reglas de fin de mes y día hábil ---
+# tests/test_calendario.py
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.calendario import (
+    adjust_business_days,
+    day_counts,
+    month_schedule,
+    payment_dates,
+    payment_schedule,
+    xirr_flows,
+)
+
+
+SIN_FERIADOS = np.busdaycalendar()
+
+
+def _d(*fechas):
+    return np.array(fechas, dtype="datetime64[D]")
+
+
+@pytest.mark.parametrize("regla, esperado", [
+    ("acumulada", ("2025-02-28", "2025-03-28", "2025-04-28", "2025-05-28")),
+    ("mismo_dia", ("2025-02-28", "2025-03-31", "2025-04-30", "2025-05-31")),
+    ("fin_de_mes", ("2025-02-28", "2025-03-31", "2025-04-30", "2025-05-31")),
+])
+def test_reglas_desde_el_31(regla, esperado):
+    np.testing.assert_array_equal(month_schedule(np.datetime64("2025-01-31"), 4, regla=regla), _d(*esperado))
+
+
+def test_fin_de_mes_sigue_el_fin_de_mes():
+    inicio = np.datetime64("2025-04-30")
+    np.testing.assert_array_equal(month_schedule(inicio, 3, regla="fin_de_mes"),
+                                  _d("2025-05-31", "2025-06-30", "2025-07-31"))
+    np.testing.assert_array_equal(month_schedule(inicio, 3, regla="mismo_dia"),
+                                  _d("2025-05-30", "2025-06-30", "2025-07-30"))
+
+
+def test_adelantado_bisiesto_y_periodicidad():
+    np.testing.assert_array_equal(month_schedule(np.datetime64("2024-01-31"), 3, adelantado=True),
+                                  _d("2024-01-31", "2024-02-29", "2024-03-29"))
+    np.testing.assert_array_equal(payment_dates(date(2025, 1, 15), 3, False, "Trimestral"),
+                                  _d("2025-04-15", "2025-07-15", "2025-10-15"))
+
+
+@pytest.mark.parametrize("regla", ["acumulada", "mismo_dia"])
+def test_lote_igual_al_calculo_de_la_app(regla):
+    # La app sumaba DateOffset(months=paso) a la cuota anterior (acumulada) o al inicio (mismo_dia)
+    rng = np.random.default_rng(0)
+    inicios = np.datetime64("2020-01-01") + rng.integers(0, 3650, 300)
+    n = rng.integers(1, 40, 300)
+    paso = rng.choice([1, 2, 3, 6, 12], 300)
+    fechas = month_schedule(inicios, n, paso, False, regla)
+    for f, ini, k, p in zip(fechas, inicios, n, paso):
+        ts, esperado = pd.Timestamp(ini), []
+        for j in range(1, k + 1):
+            ts = ts + pd.DateOffset(months=p) if regla == "acumulada" else pd.Timestamp(ini) + pd.DateOffset(months=p * j)
+            esperado.append(ts.date())
+        np.testing.assert_array_equal(f[:k], np.array(esperado, dtype="datetime64[D]"))
+        assert np.isnat(f[k:]).all()
+
+
+def test_relleno_nat_y_fecha_faltante():
+    fechas = month_schedule(_d("2025-01-10", "NaT"), [2, 3])
+    assert fechas.shape == (2, 3)
+    np.testing.assert_array_equal(fechas[0], _d("2025-02-10", "2025-03-10", "NaT"))
+    assert np.isnat(fechas[1]).all()
+
+
+@pytest.mark.parametrize("ajuste, esperado", [
+    ("ninguno", ("2025-03-01", "2025-05-31", "2025-03-05")),
+    ("siguiente", ("2025-03-03", "2025-06-02", "2025-03-05")),
+    ("siguiente_modificado", ("2025-03-03", "2025-05-30", "2025-03-05")),
+    ("anterior", ("2025-02-28", "2025-05-30", "2025-03-05")),
+    ("anterior_modificado", ("2025-03-03", "2025-05-30", "2025-03-05")),
+])
+def test_corrimiento_a_dia_habil(ajuste, esperado):
+    # sábado 01/03, sábado 31/05 y miércoles 05/03 (hábil: no se mueve)
+    fechas = _d("2025-03-01", "2025-05-31", "2025-03-05")
+    np.testing.assert_array_equal(adjust_business_days(fechas, ajuste, SIN_FERIADOS), _d(*esperado))
+
+
+def test_feriados_del_archivo():
+    # 01/03/2025 es sábado y el lunes 3 y martes 4 son Carnaval
+    fechas = payment_schedule(np.datetime64("2025-01-01"), 3, ajuste="siguiente")
+    np.testing.assert_array_equal(fechas, _d("2025-02-03", "2025-03-05", "2025-04-01"))
+
+
+def test_reglas_desconocidas():
+    with pytest.raises(ValueError):
+        month_schedule(np.datetime64("2025-01-01"), 3, regla="30/360")
+    with pytest.raises(ValueError):
+        adjust_business_days(_d("2025-01-01"), "cercano")
+
+
+def test_dias_y_flujos_para_xirr():
+    fechas = _d(["2025-02-01", "2025-03-01"], ["2025-02-15", "NaT"])
+    inicio = _d("2025-01-01", "2025-01-15")
+    np.testing.assert_array_equal(day_counts(fechas, inicio), [[31, 59], [31, -1]])
+    montos, todas = xirr_flows([1000.0, 500.0], np.array([600.0, 520.0]), inicio, fechas)
+    np.testing.assert_array_equal(montos, [[-1000.0, 600.0, 600.0], [-500.0, 520.0, 0.0]])
+    np.testing.assert_array_equal(todas[:, 0], inicio)
+    assert np.isnat(todas[1, 2])
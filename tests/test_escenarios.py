@@ -0,0 +1,81 @@
+# --- Escenarios guardados: guardar, reemplazar y migrar la base ---
+# tests/test_escenarios.py
+
+import sqlite3
+from datetime import date, datetime
+
+import pytest
+
+from core import escenarios
+from core.escenarios import ScenarioStore
+
+
+def _datos(pv=1000.0, **extra):
+    return {"modo": "Calcular tasa (i)", "tipo_pago": "Vencido (fin de período)", "pv": pv,
+            "n": 12, "pmt": 100.0, "i_periodo": 0.0, "fecha_inicial": date(2025, 1, 31), **extra}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ScenarioStore(str(tmp_path / "escenarios.db"))
+
+
+def test_guardar_y_leer(store):
+    store.save("  Base ", _datos(), {"i": 0.02, "trace": [{"iter": 1}]})
+    e = store.get("Base")
+    assert e["pv"] == 1000.0 and e["fecha_inicial"] == date(2025, 1, 31)
+    assert e["resultado"] == {"i": 0.02}                  # sin la traza
+    assert e["TEA"] == pytest.approx(1.02 ** 12 - 1)
+    assert e["creado"] == e["actualizado"]
+
+
+def test_reemplazo_conserva_nombre_y_creado(store, monkeypatch):
+    store.save("Base", _datos())
+    creado = store.get("Base")["creado"]
+
+    class _Despues:
+        @staticmethod
+        def now():
+            return datetime(2099, 1, 1, 12, 0, 0)
+
+    monkeypatch.setattr(escenarios, "datetime", _Despues)
+    store.save("base", _datos(pv=2000.0))
+    assert store.count() == 1
+    assert store.stored_name("BASE") == "Base"
+    e = store.get("base")
+    assert e["nombre"] == "Base" and e["pv"] == 2000.0
+    assert e["creado"] == creado and e["actualizado"] == "2099-01-01T12:00:00"
+
+
+def test_guarda_el_calendario(store):
+    store.save("Fin de mes", _datos(regla_fin_de_mes="fin_de_mes", ajuste_habil="siguiente_modificado"))
+    store.save("Sin calendario", _datos())
+    e = store.get("fin de mes")
+    assert (e["regla_fin_de_mes"], e["ajuste_habil"]) == ("fin_de_mes", "siguiente_modificado")
+    e = store.get("Sin calendario")
+    assert (e["regla_fin_de_mes"], e["ajuste_habil"]) == ("acumulada", "ninguno")
+
+
+def test_nombre_guardado(store):
+    assert store.stored_name("Otro") is None
+    store.save("Caso Base", _datos())
+    assert store.stored_name(" caso base ") == "Caso Base"
+
+
+def test_migra_una_base_vieja(tmp_path):
+    path = str(tmp_path / "vieja.db")
+    with sqlite3.connect(path) as con:
+        con.execute("CREATE TABLE escenarios (id INTEGER PRIMARY KEY, nombre TEXT NOT NULL COLLATE NOCASE UNIQUE, "
+                    "modo TEXT NOT NULL, tipo_pago TEXT NOT NULL, periodicidad TEXT NOT NULL, pv REAL NOT NULL, "
+                    "n INTEGER NOT NULL, pmt REAL NOT NULL, i_periodo REAL NOT NULL, fecha_inicial TEXT, "
+                    "i REAL, TEA REAL, resultado TEXT, creado TEXT NOT NULL)")
+        con.execute("INSERT INTO escenarios (nombre, modo, tipo_pago, periodicidad, pv, n, pmt, i_periodo, creado) "
+                    "VALUES ('Viejo', 'Calcular tasa (i)', 'Vencido (fin de período)', 'Mensual', 1, 1, 1, 0, "
+                    "'2024-01-01T00:00:00')")
+    con.close()
+    store = ScenarioStore(path)
+    viejo = store.get("Viejo")
+    assert viejo["actualizado"] == "2024-01-01T00:00:00"
+    assert (viejo["regla_fin_de_mes"], viejo["ajuste_habil"]) == ("acumulada", "ninguno")
+    store.save("Nuevo", _datos())
+    assert store.page()["nombre"].tolist() == ["Nuevo", "Viejo"]
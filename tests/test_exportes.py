@@ -0,0 +1,82 @@
+# --- Descargas: Excel por bloques ---
+# tests/test_exportes.py
+
+from datetime import date
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from core.exportes import FORMATOS_FLUJO, MOTORES_EXCEL, export_excel, write_excel_streaming
+
+
+def _flujo(n):
+    return pd.DataFrame({
+        "periodo": np.arange(1, n + 1),
+        "fecha_pago": [date(2025, 1, 1)] * n,
+        "cuota": np.full(n, 100.0),
+        "vp_cuota": np.linspace(99.0, 50.0, n),
+    })
+
+
+def _libro(hojas, **kwargs):
+    buffer = BytesIO()
+    write_excel_streaming(buffer, hojas, **kwargs)
+    return load_workbook(BytesIO(buffer.getvalue()))
+
+
+@pytest.mark.parametrize("motor", MOTORES_EXCEL)
+def test_hoja_se_parte_en_el_limite_de_filas(motor):
+    # 7 filas en bloques de 3 con 3 filas por hoja: 'Flujo', 'Flujo (2)', 'Flujo (3)'
+    flujo = _flujo(7)
+    bloques = (flujo.iloc[k:k + 3] for k in range(0, 7, 3))
+    wb = _libro([("Flujo", bloques, FORMATOS_FLUJO)], max_filas=3, motor=motor)
+    assert wb.sheetnames == ["Flujo", "Flujo (2)", "Flujo (3)"]
+    periodos = []
+    for ws in wb:
+        filas = list(ws.iter_rows(values_only=True))
+        assert filas[0] == tuple(flujo.columns)          # encabezado en cada parte
+        periodos += [f[0] for f in filas[1:]]
+    assert periodos == list(range(1, 8))
+    assert [ws.max_row - 1 for ws in wb] == [3, 3, 1]
+
+
+@pytest.mark.parametrize("motor", MOTORES_EXCEL)
+def test_formatos_y_celdas_vacias(motor):
+    df = pd.DataFrame({"cuota": [1234.5, np.nan, np.inf], "nota": ["a\x01b", None, "c"]})
+    ws = _libro([("Hoja", df, {"cuota": "#,##0.00"})], motor=motor)["Hoja"]
+    assert ws["A1"].font.b
+    assert ws["A2"].value == 1234.5 and ws["A2"].number_format == "#,##0.00"
+    assert ws["A3"].value is None and ws["A4"].value is None        # NaN / inf
+    assert ws["B2"].value == "ab" and ws["B3"].value is None
+
+
+@pytest.mark.parametrize("motor", MOTORES_EXCEL)
+def test_hoja_sin_filas_y_titulo_largo(motor):
+    wb = _libro([("Un nombre de hoja demasiado largo", pd.DataFrame(columns=["x"]), {})], motor=motor)
+    assert wb.sheetnames == ["Un nombre de hoja demasiado lar"]
+    assert list(wb.active.iter_rows(values_only=True)) == [("x",)]
+
+
+def test_export_excel_hojas_y_fechas():
+    resumen = pd.DataFrame([{"fecha_inicial": date(2025, 1, 1), "precio_contado": 1000.0}])
+    wb = load_workbook(BytesIO(export_excel(resumen, _flujo(3), explicacion="texto")))
+    assert wb.sheetnames == ["Resumen", "Flujo", "Explicación IA"]
+    assert wb["Resumen"]["A2"].number_format == "DD/MM/YYYY"
+    assert wb["Flujo"]["C2"].number_format == "#,##0.00"
+
+
+def test_motor_desconocido():
+    with pytest.raises(ValueError, match="Motor de Excel"):
+        write_excel_streaming(BytesIO(), [], motor="xlwt")
+
+
+def test_motores_escriben_lo_mismo():
+    df = _flujo(5).assign(ok=[True, False, True, True, False], nota=["a", None, "b", "c", "d"])
+    formatos = {**FORMATOS_FLUJO, "periodo": "0"}
+    libros = [_libro([("Flujo", df, formatos)], motor=m)["Flujo"] for m in MOTORES_EXCEL]
+    valores = [list(ws.iter_rows(values_only=True)) for ws in libros]
+    assert valores[0] == valores[1]
+    assert [c.number_format for c in libros[0][2]] == [c.number_format for c in libros[1][2]]
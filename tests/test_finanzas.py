@@ -0,0 +1,132 @@
+# --- Solvers de tasa: lote, escalar y traza ---
+# tests/test_finanzas.py
+
+import numpy as np
+import pytest
+
+from core import finanzas
+from core.finanzas import (
+    grid_initial_guess,
+    interp_log_rate,
+    load_rate_grid,
+    solve_monthly_rate,
+    solve_monthly_rate_batch,
+    solve_monthly_rate_halley,
+    solve_monthly_rate_trace,
+)
+
+
+def _cartera(m, seed=0):
+    """Planes al azar: n entre 1 y 1500, pmt·n/pv entre 1 + 1e-8 y 500, mitad adelantado."""
+    rng = np.random.default_rng(seed)
+    n = rng.integers(1, 1501, m).astype(float)
+    ratio = np.exp(rng.uniform(np.log(1 + 1e-8), np.log(500), m))
+    pv = rng.uniform(1.0, 1e7, m)
+    return pv, pv * ratio / n, n, rng.random(m) < 0.5
+
+
+def test_batch_coincide_con_escalar():
+    pv, pmt, n, adel = _cartera(5000)
+    i, iters, convergio = solve_monthly_rate_batch(pv, pmt, n, adel)
+    esc = np.array([solve_monthly_rate(*fila) for fila in zip(pv, pmt, n, adel)])
+    assert np.array_equal(np.isnan(i), np.isnan(esc))
+    ok = ~np.isnan(esc)
+    assert convergio[ok].all()
+    assert np.max(np.abs(i[ok] - esc[ok])) < 1e-12
+    assert (iters[ok] >= 1).all()
+
+
+@pytest.mark.parametrize("adelantado", [False, True])
+def test_batch_recupera_la_tasa(adelantado):
+    rng = np.random.default_rng(1)
+    i_real = rng.uniform(1e-4, 0.3, 2000)
+    n = rng.integers(2, 600, 2000).astype(float)
+    pmt = np.full(2000, 100.0)
+    a = -np.expm1(-n * np.log1p(i_real)) / i_real * np.where(adelantado, 1 + i_real, 1.0)
+    i, _, convergio = solve_monthly_rate_batch(pmt * a, pmt, n, adelantado)
+    assert convergio.all()
+    np.testing.assert_allclose(i, i_real, rtol=1e-10, atol=1e-13)
+
+
+def test_batch_filas_sin_tasa():
+    # pmt·n < pv, adelantado con pv <= pmt, datos inválidos → NaN sin converger
+    pv = np.array([100.0, 100.0, -1.0, np.nan, 100.0])
+    pmt = np.array([10.0, 200.0, 10.0, 10.0, 10.0])
+    n = np.array([5.0, 3.0, 10.0, 10.0, 10.0])
+    adel = np.array([False, True, False, False, False])
+    i, iters, convergio = solve_monthly_rate_batch(pv, pmt, n, adel)
+    assert np.isnan(i[:4]).all() and not convergio[:4].any() and (iters[:4] == 0).all()
+    assert i[4] == 0.0 and convergio[4]           # pmt·n == pv: tasa 0
+
+
+def test_batch_bloque_rapido_igual_al_camino_por_filas(monkeypatch):
+    # Cartera dentro de la grilla: el bloque entero va por _halley_block_fast
+    rng = np.random.default_rng(4)
+    n = rng.integers(12, 1201, 3000).astype(float)
+    pv = rng.uniform(1e3, 1e6, 3000)
+    pmt, adel = pv * rng.uniform(1.01, 5.0, 3000) / n, rng.random(3000) < 0.5
+    assert finanzas._halley_block_fast(pv, pmt, n, adel, 1e-12) is not None
+    i, iters, convergio = solve_monthly_rate_batch(pv, pmt, n, adel)
+    monkeypatch.setattr(finanzas, "_halley_block_fast", lambda *args: None)
+    i_filas, iters_filas, convergio_filas = solve_monthly_rate_batch(pv, pmt, n, adel)
+    assert convergio.all() and convergio_filas.all()
+    assert np.array_equal(iters, iters_filas)
+    assert np.max(np.abs(i - i_filas)) < 1e-15
+
+
+def test_batch_respeta_la_forma():
+    i, iters, convergio = solve_monthly_rate_batch(np.full((3, 4), 1000.0), 100.0, 12)
+    assert i.shape == iters.shape == convergio.shape == (3, 4)
+    assert np.allclose(i, solve_monthly_rate(1000.0, 100.0, 12))
+
+
+# --- Motor de Halley y traza ---
+SIN_TASA = [
+    (1000.0, 50.0, 12, False),      # pmt·n < pv
+    (1000.0, 1000.0, 1, True),      # adelantado: la primera cuota ya cubre el contado
+    (-5.0, 10.0, 12, False),        # datos inválidos
+]
+
+
+@pytest.mark.parametrize("pv, pmt, n, adelantado", SIN_TASA)
+def test_sin_tasa_da_nan_en_todos_los_caminos(pv, pmt, n, adelantado):
+    assert np.isnan(solve_monthly_rate(pv, pmt, n, adelantado))
+    i, iters = solve_monthly_rate_halley(pv, pmt, n, adelantado)
+    assert np.isnan(i) and iters == 0
+    i, trace = solve_monthly_rate_trace(pv, pmt, n, adelantado)
+    assert np.isnan(i) and trace == []
+    assert np.isnan(solve_monthly_rate_batch(pv, pmt, n, adelantado)[0])
+
+
+@pytest.mark.parametrize("adelantado", [False, True])
+def test_traza_usa_el_mismo_motor(adelantado):
+    pv, pmt, n, _ = _cartera(300, seed=2)
+    for fila in zip(pv, pmt, n):
+        i, trace = solve_monthly_rate_trace(*fila, adelantado)
+        esperado, iters = solve_monthly_rate_halley(*fila, adelantado, max_iter=80)
+        assert i == esperado or (np.isnan(i) and np.isnan(esperado))
+        assert len(trace) == iters
+        for t in trace:
+            assert t["method"] in ("halley", "bisect")
+            assert t["lo"] <= t["hi"]
+
+
+def test_halley_pocas_iteraciones_y_sin_biseccion():
+    pv, pmt, n, adel = _cartera(2000, seed=3)
+    iters, bisecciones = [], 0
+    for fila in zip(pv, pmt, n, adel):
+        i, trace = solve_monthly_rate_trace(*fila)
+        if not np.isnan(i):
+            iters.append(len(trace))
+            bisecciones += sum(t["method"] == "bisect" for t in trace)
+    assert max(iters) <= 6 and np.mean(iters) < 3.5
+    assert bisecciones == 0
+
+
+@pytest.mark.parametrize("n", [0.3, 0.8, 1.0, 1.5])
+def test_semilla_escalar_con_n_fraccionario(n):
+    # n < 1 no debe dar un índice negativo (la grilla lo tomaría desde el final)
+    grid, meta = load_rate_grid()
+    pv, pmt = 100.0, 400.0
+    esperado = np.exp(interp_log_rate(grid, meta, np.array([n]), np.array([pmt * n / pv])))[0]
+    assert abs(grid_initial_guess(pv, pmt, n) - esperado) <= 1e-12 * esperado
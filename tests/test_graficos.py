@@ -0,0 +1,36 @@
+# --- Datos de los gráficos ---
+# tests/test_graficos.py
+
+import numpy as np
+import pandas as pd
+
+from core.graficos import histogram_frame
+
+
+def test_histograma_cuenta_todo_aunque_los_extremos_se_corran():
+    tea = np.random.default_rng(0).uniform(0.1, 0.9, 495)
+    desde, hasta = tea.min(), tea.max()
+    # Ida y vuelta por texto (como el resultado del lote en CSV): un ulp afuera
+    leido = tea.copy()
+    leido[tea.argmax()] = np.nextafter(hasta, np.inf)
+    leido[tea.argmin()] = np.nextafter(desde, -np.inf)
+    bloques = [pd.DataFrame({"TEA": leido[k:k + 100]}) for k in range(0, 495, 100)]
+    h = histogram_frame(bloques, "TEA", desde, hasta)
+    assert h["filas"].sum() == 495
+    assert len(h) == 50 and h["desde"].iloc[0] == desde and h["hasta"].iloc[-1] == hasta
+
+
+def test_histograma_ignora_vacios_y_un_solo_valor():
+    df = pd.DataFrame({"TEA": [0.5, np.nan, "x", 0.5]})
+    h = histogram_frame([df], "TEA", 0.5, 0.5, bins=4)
+    assert h["filas"].sum() == 2
+    assert histogram_frame([df], "TEA", np.nan, np.nan).empty
+
+
+def test_histograma_solo_filas_ok_y_sin_valores_lejanos():
+    # Filas sin converger con TEA finita y valores lejos del rango no cuentan
+    df = pd.DataFrame({"TEA": [0.2, 0.4, 5.0, 0.3, 0.2 - 1e-6], "ok": [True, True, False, False, True]})
+    h = histogram_frame([df], "TEA", 0.2, 0.4, bins=2)
+    assert h["filas"].tolist() == [1, 1]
+    leido = df.assign(ok=df["ok"].astype(str))               # ok como texto (CSV leído sin tipos)
+    assert histogram_frame([leido], "TEA", 0.2, 0.4, bins=2)["filas"].tolist() == [1, 1]
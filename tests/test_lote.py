@@ -0,0 +1,139 @@
+# --- Cálculo por lote: columnas, lectura y escritura por bloques ---
+# tests/test_lote.py
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.finanzas import solve_monthly_rate
+from core.lote import (
+    MODO_I,
+    MODO_N,
+    BlockWriter,
+    file_format,
+    iter_chunks,
+    normalize_frame,
+    price_file,
+    price_frame,
+)
+
+
+def _entrada():
+    return pd.DataFrame({
+        "id": ["A-1", "A-2", "A-3"],
+        "cliente": ["Ana", "Beto", "Caro"],
+        "precio_contado": ["1.000,50", "2000", "1500"],
+        "CANT C": [12, None, 6],
+        "monto_cuota": [100.0, 250.0, 10.0],
+        "tasa": [None, 0.02, None],
+    })
+
+
+def test_normalize_lee_alias_y_comas():
+    df = normalize_frame(_entrada())
+    assert list(df.columns) == ["pv", "n", "pmt", "adelantado", "i_periodo"]
+    assert df["pv"].tolist() == [1000.5, 2000.0, 1500.0]
+    assert not df["adelantado"].any()
+
+
+def test_price_frame_conserva_las_columnas_extra():
+    res = price_frame(normalize_frame(_entrada(), keep_columns=True))
+    assert list(res.columns[:2]) == ["id", "cliente"]
+    assert "precio_contado" not in res.columns          # los alias quedan como pv, n, …
+    assert res["id"].tolist() == ["A-1", "A-2", "A-3"]
+    assert res["modo"].tolist() == [MODO_I, MODO_N, MODO_I]
+    assert abs(res["i"][0] - solve_monthly_rate(1000.5, 100.0, 12)) < 1e-12
+    assert res["ok"].tolist() == [True, True, False]      # 10 × 6 < 1500: sin tasa
+    assert res["n_redondeado"][0] == 12 and np.isnan(res["n_redondeado"][2])
+
+
+def test_columnas_con_nombre_de_la_salida_se_renombran():
+    entrada = _entrada().assign(ok="sí", TEA=0.5, modo="x", iters=7, entrada_ok="otra")
+    res = price_frame(normalize_frame(entrada, keep_columns=True))
+    assert res["ok"].tolist() == [True, True, False] and res["iters"].dtype == np.int64
+    assert res["entrada_entrada_ok"].tolist() == ["sí"] * 3
+    assert res["entrada_ok"].tolist() == ["otra"] * 3
+    assert (res["entrada_TEA"] == 0.5).all() and (res["entrada_modo"] == "x").all()
+    assert (res["entrada_iters"] == 7).all() and res["modo"][0] == MODO_I
+
+
+def test_price_file_lleva_el_id_a_la_descarga():
+    src = io.BytesIO(_entrada().to_csv(index=False, sep=";").encode("utf-8"))
+    out = io.BytesIO()
+    resumen, preview = price_file(src, "cartera.csv", out, chunksize=2)
+    out.seek(0)
+    res = pd.read_csv(out)
+    assert res["id"].tolist() == ["A-1", "A-2", "A-3"]
+    assert preview["id"].tolist() == ["A-1", "A-2"]        # el primer bloque
+    assert resumen["filas"] == 3 and resumen["resueltas"] == 2
+    assert np.isclose(res["i"][1], 0.02)
+
+
+def test_price_file_sin_columnas_extra():
+    src = io.BytesIO(_entrada().to_csv(index=False).encode("utf-8"))
+    out = io.BytesIO()
+    price_file(src, "cartera.csv", out, keep_columns=False)
+    out.seek(0)
+    assert "id" not in pd.read_csv(out).columns
+
+
+def test_xls_se_rechaza_con_un_mensaje_claro():
+    assert file_format("cartera.XLSX") == "excel"
+    with pytest.raises(ValueError, match="xlsx"):
+        file_format("cartera.xls")
+
+
+# --- Ida y vuelta por los formatos de salida ---
+@pytest.mark.parametrize("fmt", ["csv", "jsonl", "parquet", "arrow"])
+def test_resultado_ida_y_vuelta(fmt):
+    res = price_frame(normalize_frame(_entrada(), keep_columns=True))
+    out = io.BytesIO()
+    writer = BlockWriter(out, fmt)
+    for k in range(0, len(res), 2):                       # en bloques, como price_file
+        writer.write(res.iloc[k:k + 2])
+    writer.close()
+    out.seek(0)
+    leido = pd.concat(list(iter_chunks(out, fmt, chunksize=2)), ignore_index=True)
+    assert list(leido.columns) == list(res.columns)
+    for c in ("i", "TEA", "pv", "n_redondeado"):
+        # CSV y JSON Lines pasan por texto: a lo sumo unos ulp
+        np.testing.assert_allclose(leido[c].to_numpy(float), res[c].to_numpy(float), rtol=1e-13)
+    if fmt in ("parquet", "arrow"):                       # binarios: exactos
+        np.testing.assert_array_equal(leido["i"].to_numpy(), res["i"].to_numpy())
+    assert leido["ok"].tolist() == res["ok"].tolist()
+    assert leido["id"].tolist() == res["id"].tolist()
+
+
+def test_parquet_conserva_los_tipos():
+    src = io.BytesIO(_entrada().to_csv(index=False).encode("utf-8"))
+    out = io.BytesIO()
+    price_file(src, "cartera.csv", out, chunksize=2, fmt="parquet")
+    out.seek(0)
+    leido = pd.read_parquet(out)
+    assert leido["ok"].dtype == bool and leido["iters"].dtype == np.int64
+    assert leido["i"].dtype == np.float64 and len(leido) == 3
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_bloques_con_tipos_distintos(fmt):
+    # 'nota' vacía en el primer bloque y texto después; 'cod' entero y luego texto
+    res = price_frame(normalize_frame(pd.DataFrame({
+        "nota": [None, None, "x", "y"],
+        "cod": [1, 2, "B-3", None],
+        "pv": [1000.0] * 4, "pmt": [100.0] * 4, "n": [12, 12, 24, 24],
+    }), keep_columns=True))
+    out = io.BytesIO()
+    writer = BlockWriter(out, fmt)
+    for k in (0, 2):
+        bloque = res.iloc[k:k + 2].copy()
+        bloque["cod"] = bloque["cod"].infer_objects()      # como un CSV leído por bloques
+        writer.write(bloque)
+    writer.close()
+    out.seek(0)
+    leido = pd.concat(list(iter_chunks(out, fmt, chunksize=10)), ignore_index=True)
+    assert leido["nota"].tolist()[2:] == ["x", "y"] and leido["nota"].isna()[:2].all()
+    assert leido["cod"].tolist()[:3] == ["1", "2", "B-3"] and pd.isna(leido["cod"][3])
+    assert leido["iters"].dtype == np.int64 and leido["ok"].all()
+    np.testing.assert_array_equal(leido["i"].to_numpy(), res["i"].to_numpy())
@@ -0,0 +1,41 @@
+# --- Ejecución en paralelo: pool compartido y reparto por bloques ---
+# tests/test_paralelo.py
+
+import numpy as np
+import pytest
+
+from core import paralelo
+from core.finanzas import solve_monthly_rate_batch
+
+
+@pytest.fixture
+def pool_limpio():
+    paralelo.shutdown_pool()
+    yield
+    paralelo.shutdown_pool()
+
+
+def test_bloque_alcanza_para_repartir():
+    assert paralelo.parallel_chunksize(100_000) == 100_000
+    assert paralelo.parallel_chunksize(100_000, workers=1) == 100_000
+    assert paralelo.parallel_chunksize(100_000, workers=4) == 4 * paralelo.MIN_PARALELO
+    assert paralelo.parallel_chunksize(10_000_000, workers=4) == 10_000_000
+
+
+def test_pool_se_rearma_si_cambian_los_procesos(pool_limpio):
+    p2 = paralelo.get_pool(2)
+    assert paralelo.get_pool(2) is p2
+    p3 = paralelo.get_pool(3)
+    assert p3 is not p2 and p3._max_workers == 3
+
+
+def test_repartido_igual_al_lote(pool_limpio, monkeypatch):
+    monkeypatch.setattr(paralelo, "MIN_PARALELO", 1_000)
+    rng = np.random.default_rng(0)
+    n = rng.integers(1, 400, 5_000).astype(float)
+    pv = rng.uniform(100, 1e6, 5_000)
+    pmt = pv * rng.uniform(1.01, 5, 5_000) / n
+    i, iters, conv = paralelo.solve_monthly_rate_parallel(pv, pmt, n, workers=2)
+    esperado = solve_monthly_rate_batch(pv, pmt, n)
+    np.testing.assert_array_equal(i, esperado[0])
+    np.testing.assert_array_equal(conv, esperado[2])
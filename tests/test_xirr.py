@@ -0,0 +1,68 @@
+# --- TIR con fechas: convenciones y lote ---
+# tests/test_xirr.py
+
+import numpy as np
+import pytest
+
+from core.xirr import xirr, xirr_batch, xnpv, year_fractions
+
+
+def _d(*fechas):
+    return np.array(fechas, dtype="datetime64[D]")
+
+
+def test_act_365():
+    t = year_fractions(_d("2024-01-01", "2024-07-01", "2025-01-01"))
+    np.testing.assert_allclose(t, [0.0, 182 / 365, 366 / 365])
+
+
+def test_30e_360_lleva_el_31_a_30():
+    t = year_fractions(_d("2025-01-31", "2025-02-28", "2025-03-31", "2026-01-31"), convencion="30/360")
+    # 31/01 → 30/01; 28/02 es día 28 (30E/360 no lo corre a fin de mes)
+    np.testing.assert_allclose(t, [0.0, 28 / 360, 60 / 360, 1.0])
+
+
+def test_base_por_fila_y_relleno_nat():
+    fechas = _d(["2025-01-01", "2025-04-01", "NaT"], ["2025-03-15", "2025-03-15", "2026-03-15"])
+    t = year_fractions(fechas, base=_d("2025-01-01", "2025-03-15"))
+    np.testing.assert_allclose(t, [[0.0, 90 / 365, 0.0], [0.0, 0.0, 1.0]])
+
+
+def test_convencion_desconocida():
+    with pytest.raises(ValueError):
+        year_fractions(_d("2025-01-01"), convencion="act/360")
+
+
+def test_xirr_como_excel():
+    # Ejemplo de la ayuda de XIRR de Excel (Excel muestra 0,373362535)
+    montos = [-10000, 2750, 4250, 3250, 2750]
+    fechas = _d("2008-01-01", "2008-03-01", "2008-10-30", "2009-02-15", "2009-04-01")
+    assert xirr(montos, fechas) == pytest.approx(0.373362535, abs=1e-8)
+
+
+@pytest.mark.parametrize("convencion", ["act/365", "30/360"])
+def test_xirr_anula_el_van(convencion):
+    montos = np.array([-1000.0] + [90.0] * 12)
+    fechas = _d("2025-01-31", *(f"2025-{m:02d}-28" for m in range(2, 13)), "2026-01-31")
+    r = xirr(montos, fechas, convencion=convencion)
+    van, _ = xnpv(r, montos, year_fractions(fechas, convencion=convencion))
+    assert abs(van) < 1e-8
+
+
+def test_lote_igual_a_uno_por_uno_con_relleno():
+    planes = [
+        ([-1000, 300, 400, 500], ["2025-01-01", "2025-06-01", "2026-01-01", "2026-06-01"]),
+        ([-500, 520], ["2025-01-01", "2025-12-31"]),
+        ([100, 50, 40], ["2025-01-01", "2025-02-01", "2025-03-01"]),        # sin cambio de signo: sin tasa
+    ]
+    ancho = max(len(m) for m, _ in planes)
+    montos = np.zeros((len(planes), ancho))
+    fechas = np.full((len(planes), ancho), np.datetime64("NaT"), dtype="datetime64[D]")
+    for k, (m, f) in enumerate(planes):
+        montos[k, :len(m)] = m
+        fechas[k, :len(f)] = _d(*f)
+    r, _, convergio = xirr_batch(montos, fechas)
+    for k, (m, f) in enumerate(planes[:2]):
+        assert convergio[k]
+        assert r[k] == pytest.approx(xirr(m, _d(*f)), abs=1e-12)
+    assert np.isnan(r[2]) and not convergio[2]